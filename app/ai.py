@@ -1,22 +1,197 @@
-from openai import OpenAI
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from . import models
 from .config import get_settings
+from .database import SessionLocal
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+
+SYSTEM_PROMPT = "You are a hazard report analyst tool. Your task is to concisely summarize events and provide actionable suggestions where necessary."
+USER_PROMPT = "Based on the following event information, write one or two summarizing the situation. do not use any special symbols and do not state tat it is a summary. export only the raw text. keep it short:\n\n{event}"
+
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class OpenAIBackend:
+    """Completion backend that calls the OpenAI chat API.
+
+    The client (and the ``openai`` package) is loaded on the first completion.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def complete(self, model: str, messages: List[dict], max_tokens: int) -> str:
+        completion = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens
+        )
+        return completion.choices[0].message.content
+
+
+class StubBackend:
+    """Offline completion backend for local runs and tests; echoes the start of the prompt."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def close(self) -> None:
+        pass
+
+    def complete(self, model: str, messages: List[dict], max_tokens: int) -> str:
+        self.calls += 1
+        text = messages[-1]["content"].split("\n\n", 1)[-1]
+        return " ".join(text.split()[:max_tokens])
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "stub": StubBackend,
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so near-identical summaries share a cache key.
+
+    Timestamps are dropped and whitespace and case are folded, since neither
+    changes the summary the model would write.
+    """
+    prompt = _TIMESTAMP.sub("", prompt)
+    return _WHITESPACE.sub(" ", prompt).strip().casefold()
+
+
+def cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+class DescriptionCache:
+    """LRU cache with TTL for generated descriptions, optionally backed by a database table."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600, persistent: bool = False,
+                 session_factory=SessionLocal):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.persistent = persistent
+        self.session_factory = session_factory
+        self.stats = {"hits": 0, "persistent_hits": 0, "misses": 0}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+
+        value = self._load(key) if self.persistent else None
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["persistent_hits"] += 1
+                self._remember(key, value)
+        return value
+
+    def set(self, key: str, model: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+        if self.persistent:
+            self._store(key, model, value)
+
+    def _remember(self, key: str, value: str) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            entry = db.get(models.AICacheEntry, key)
+            if entry is None:
+                return None
+            created_at = entry.created_at
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            if created_at < datetime.now(timezone.utc) - timedelta(seconds=self.ttl):
+                return None
+            return entry.response
+        finally:
+            db.close()
+
+    def _store(self, key: str, model: str, value: str) -> None:
+        db = self.session_factory()
+        try:
+            db.merge(models.AICacheEntry(key=key, model=model, response=value, created_at=datetime.now(timezone.utc)))
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["persistent_hits"] + self.stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "persistent": self.persistent,
+            "hit_rate": (lookups - self.stats["misses"]) / lookups if lookups else 0.0,
+            **self.stats
+        }
+
+
+backend = BACKENDS[settings.ai_backend]()
+description_cache = DescriptionCache(
+    max_size=settings.ai_cache_size,
+    ttl_seconds=settings.ai_cache_ttl_seconds,
+    persistent=settings.ai_cache_persistent
+)
+
 
 def generate_event_description(event: str):
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a hazard report analyst tool. Your task is to concisely summarize events and provide actionable suggestions where necessary."
-            },
-            {
-                "role": "user",
-                "content": f"Based on the following event information, write one or two summarizing the situation. do not use any special symbols and do not state tat it is a summary. export only the raw text. keep it short:\n\n{event}"
-            }
+    key = cache_key(settings.ai_model, event)
+    cached = description_cache.get(key)
+    if cached is not None:
+        return cached
+
+    description = backend.complete(
+        settings.ai_model,
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT.format(event=event)}
         ],
         max_tokens=30
     )
-    return completion.choices[0].message.content
+    description_cache.set(key, settings.ai_model, description)
+    return description
@@ -0,0 +1,163 @@
+"""Location alert levels computed from live report data.
+
+Every location keeps a decayed, severity-weighted score of the reports around
+it, stored as ``(alert_score, alert_updated_at)``. A new report decays the score
+of each location within ``alert_radius_km`` up to the report's time and adds the
+report's weight, scaled by proximity. Decay is the exponential time similarity
+of ``HybridCorrelator``, so a score is only meaningful together with its
+timestamp; ``current_score`` decays it to the moment it is read.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models, queries
+from .config import get_settings
+from .correlation import HybridCorrelator
+
+settings = get_settings()
+
+correlator = HybridCorrelator(
+    max_distance_km=settings.alert_radius_km,
+    max_time_hours=settings.alert_decay_hours
+)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; SQLite hands timestamps back naive."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def report_weight(severity) -> float:
+    """Contribution of one report at its own location: 1 + severity."""
+    try:
+        return 1.0 + max(float(severity), 0.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def level_for(score: float) -> int:
+    """Number of ``alert_level_thresholds`` the score reaches."""
+    return sum(1 for threshold in settings.alert_level_thresholds if score >= threshold)
+
+
+def decayed(score: Optional[float], updated_at: Optional[datetime], at: datetime) -> float:
+    if not score or updated_at is None:
+        return 0.0
+    updated_at = as_utc(updated_at)
+    if at <= updated_at:
+        return score
+    return score * correlator.calculate_time_similarity(updated_at, at)
+
+
+def current_score(score: Optional[float], updated_at: Optional[datetime],
+                  now: Optional[datetime] = None) -> Tuple[float, int]:
+    """Score decayed to ``now`` and the alert level it maps to."""
+    score = decayed(score, updated_at, now or datetime.now(timezone.utc))
+    return score, level_for(score)
+
+
+def apply(connection: Connection, reports: Iterable, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) reports from the alert scores around them.
+
+    ``reports`` are objects with ``location_id``, ``created_at`` and
+    ``severity``. Runs on the caller's connection, inside its transaction; the
+    affected location rows are locked (where the backend supports it) so
+    concurrent writers do not lose each other's updates.
+    """
+    reports = [report for report in reports if report.location_id is not None and report.created_at is not None]
+    if not reports:
+        return
+    Location = models.Location
+    origins = {
+        location_id: (latitude, longitude)
+        for location_id, latitude, longitude in connection.execute(
+            select(Location.id, Location.latitude, Location.longitude)
+            .where(Location.id.in_({report.location_id for report in reports}))
+        )
+        if latitude is not None and longitude is not None
+    }
+
+    contributions = []
+    affected = set()
+    for origin in {origins[report.location_id] for report in reports if report.location_id in origins}:
+        affected.update(connection.scalars(
+            select(Location.id).where(queries.within_geohash_cover(origin[0], origin[1], correlator.max_distance))
+        ))
+    for report in reports:
+        origin = origins.get(report.location_id)
+        if origin is not None:
+            contributions.append((origin, as_utc(report.created_at), sign * report_weight(report.severity)))
+    if not affected:
+        return
+
+    # location_id -> [score, updated_at, latitude, longitude]
+    state = {}
+    # One locking statement in id order: concurrent bulk writers queue up instead of deadlocking
+    for location_id, latitude, longitude, score, updated_at in connection.execute(
+        select(Location.id, Location.latitude, Location.longitude,
+               Location.alert_score, Location.alert_updated_at)
+        .where(Location.id.in_(sorted(affected)))
+        .order_by(Location.id)
+        .with_for_update()
+    ):
+        state[location_id] = [score or 0.0, updated_at and as_utc(updated_at), latitude, longitude]
+
+    changed = set()
+    for (latitude, longitude), created_at, weight in contributions:
+        for location_id, entry in state.items():
+            proximity = correlator.calculate_location_similarity(latitude, longitude, entry[2], entry[3])
+            if proximity <= 0:
+                continue
+            score, updated_at = entry[0], entry[1]
+            if updated_at is None or created_at >= updated_at:
+                entry[0] = max(decayed(score, updated_at, created_at) + weight * proximity, 0.0)
+                entry[1] = created_at
+            else:
+                # Late (or removed) report: decay its contribution up to the stored timestamp instead
+                late = weight * correlator.calculate_time_similarity(created_at, updated_at)
+                entry[0] = max(score + late * proximity, 0.0)
+            changed.add(location_id)
+    if not changed:
+        return
+
+    table = Location.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.id == bindparam("location_id"))
+        .values(
+            alert_score=bindparam("score"),
+            alert_updated_at=bindparam("updated_at"),
+            alert_level=bindparam("level")
+        ),
+        [
+            {"location_id": location_id, "score": state[location_id][0],
+             "updated_at": state[location_id][1], "level": level_for(state[location_id][0])}
+            for location_id in sorted(changed)
+        ]
+    )
+
+
+def score_reports(db: Session, reports: Iterable) -> None:
+    """Score reports written without the ORM flush hooks (bulk inserts)."""
+    apply(db.connection(), reports, 1)
+
+
+@event.listens_for(models.Report, "after_insert")
+def score_report(mapper, connection, target):
+    apply(connection, [target], 1)
+
+
+@event.listens_for(models.Report, "after_delete")
+def unscore_report(mapper, connection, target):
+    apply(connection, [target], -1)
+
+
+def alert_levels():
+    """Stored alert state of every location; decay with ``current_score`` on read."""
+    Location = models.Location
+    return select(Location.id, Location.alert_score, Location.alert_updated_at).order_by(Location.id)
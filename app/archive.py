@@ -0,0 +1,76 @@
+"""Gzip-compressed NDJSON archives of rows removed from the database.
+
+One file per table and month, ``<archive_dir>/<table>/<YYYY-MM>.ndjson.gz``,
+written by ``app.retention``. Report lines use the export NDJSON format,
+so ``GET /export/reports?archived=true`` streams them back.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .config import get_settings
+
+settings = get_settings()
+
+Month = Tuple[int, int]
+
+
+def month_bounds(month: Month) -> Tuple[datetime, datetime]:
+    """``[start, end)`` of a month, in UTC."""
+    year, number = month
+    start = datetime(year, number, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc) if number == 12 else start.replace(month=number + 1)
+    return start, end
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class Archive:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, table: str, month: Month) -> Path:
+        return self.root / table / f"{month[0]:04d}-{month[1]:02d}.ndjson.gz"
+
+    def months(self, table: str) -> List[Month]:
+        directory = self.root / table
+        if not directory.is_dir():
+            return []
+        months = []
+        for path in directory.glob("*.ndjson.gz"):
+            year, _, number = path.name[:-len(".ndjson.gz")].partition("-")
+            months.append((int(year), int(number)))
+        return sorted(months)
+
+    def write(self, table: str, month: Month, chunks: Iterable[str]) -> Path:
+        """Write one month from NDJSON text chunks; the file appears only once complete."""
+        path = self.path(table, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        with gzip.open(partial, "wt", encoding="utf-8") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(partial, path)
+        return path
+
+    def read(self, table: str, since: Optional[datetime] = None,
+             until: Optional[datetime] = None) -> Iterator[dict]:
+        """Rows of the archived months overlapping ``[since, until)``, oldest month first.
+
+        Rows are not filtered by time; callers check their own timestamps.
+        """
+        for month in self.months(table):
+            start, end = month_bounds(month)
+            if (since is not None and end <= as_utc(since)) or (until is not None and start >= as_utc(until)):
+                continue
+            with gzip.open(self.path(table, month), "rt", encoding="utf-8") as lines:
+                for line in lines:
+                    yield json.loads(line)
+
+
+archive = Archive(settings.archive_dir)
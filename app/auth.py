@@ -1,55 +1,248 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Annotated, Optional
+from collections import OrderedDict
+from typing import Annotated, Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from . import models, schemas
-from .database import get_db
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+from . import models, schemas, shared_state
+from .database import get_session
 from .config import get_settings
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, size-limited thread pool so it never blocks the event loop.
 
+    At most ``workers`` hashes run at once; up to ``max_queue`` more may wait, after
+    which callers get a 503 instead of piling up behind a login burst.
+    """
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+    def __init__(self, workers: int = 2, max_queue: int = 64):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.stats = {"completed": 0, "rejected": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
 
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._waiting += 1
+        enqueued = time.perf_counter()
+        # "waiting" until the job starts or its caller gives up, whichever comes first
+        state = {"phase": "waiting"}
 
-def get_user(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+        def job():
+            waited = time.perf_counter() - enqueued
+            with self._lock:
+                if state["phase"] == "abandoned":
+                    return None
+                state["phase"] = "started"
+                self._waiting -= 1
+                self._active += 1
+                self.stats["wait_seconds"] += waited
+                self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self.stats["completed"] += 1
 
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            # Cancelled (client gone) before the job started: it will not run, so free its slot here
+            with self._lock:
+                if state["phase"] == "waiting":
+                    state["phase"] = "abandoned"
+                    self._waiting -= 1
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user(db, email)
+    def metrics(self) -> dict:
+        completed = self.stats["completed"]
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_queue": self.max_queue,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "avg_wait_seconds": self.stats["wait_seconds"] / completed if completed else 0.0,
+            **self.stats
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue
+)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.run(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash(password):
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def get_user(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
 
+class CurrentUser:
+    """Read-only snapshot of the authenticated user, safe to share between requests."""
+
+    __slots__ = ("id", "email", "name", "phone", "is_active", "userType")
+
+    def __init__(self, id: int, email: str, is_active: bool, userType: str,
+                 name: Optional[str] = None, phone: Optional[str] = None):
+        self.id = id
+        self.email = email
+        self.is_active = is_active
+        self.userType = userType
+        self.name = name
+        self.phone = phone
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "CurrentUser":
+        return cls(user.id, user.email, user.is_active, user.userType, user.name, user.phone)
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["CurrentUser"]:
+        if "id" not in payload or "is_active" not in payload or "iat" not in payload:
+            return None
+        return cls(payload["id"], payload["sub"], payload["is_active"], payload.get("userType"))
+
+
+class UserCache:
+    """Short-TTL LRU cache of authenticated users keyed by token subject."""
+
+    def __init__(self, ttl_seconds: float = 30, max_size: int = 10000, token_lifetime_seconds: float = 1800):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.token_lifetime = token_lifetime_seconds
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._changed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is not None:
+                user, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(subject)
+                    self.stats["hits"] += 1
+                    return user
+                del self._entries[subject]
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, subject: str, user: CurrentUser) -> None:
+        with self._lock:
+            self._entries[subject] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        """Drop a user and distrust token claims issued before now."""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(subject, None)
+            self._changed[subject] = now
+            self.stats["invalidations"] += 1
+            # Tokens older than their lifetime are rejected anyway
+            for key in [k for k, changed in self._changed.items() if now - changed > self.token_lifetime]:
+                del self._changed[key]
+
+    def changed_since(self, subject: str, issued_at: Optional[float]) -> bool:
+        changed = self._changed.get(subject)
+        return changed is not None and (issued_at is None or issued_at <= changed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            **self.stats
+        }
+
+
+user_cache = UserCache(
+    ttl_seconds=settings.user_cache_ttl_seconds,
+    max_size=settings.user_cache_size,
+    token_lifetime_seconds=settings.access_token_expire_minutes * 60
+)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    emails = [target.email, *(inspect(target).attrs.email.history.deleted or ())]
+    for email in emails:
+        user_cache.invalidate(email)
+    shared_state.publish_on_commit(object_session(target), shared_state.USER_CHANGED, emails=emails)
+
+
+def invalidate_shared_user(fields: dict) -> None:
+    for email in fields["emails"]:
+        user_cache.invalidate(email)
+
+
+shared_state.shared_state.on(shared_state.USER_CHANGED, invalidate_shared_user)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_session)]
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,22 +259,42 @@ async def get_current_user(
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user(db, email=token_data.email)
-    if user is None:
+
+    user = user_cache.get(token_data.email)
+    if user is not None:
+        return user
+
+    # Signed claims are trusted unless the user changed after the token was issued
+    user = CurrentUser.from_claims(payload)
+    if user is not None and not user_cache.changed_since(token_data.email, payload.get("iat")):
+        return user
+
+    db_user = await get_user(db, email=token_data.email)
+    if db_user is None:
         raise credentials_exception
+    user = CurrentUser.from_user(db_user)
+    user_cache.set(token_data.email, user)
     return user
 
 
 async def get_current_active_user(
-    current_user: Annotated[models.User, Depends(get_current_user)]
+    current_user: Annotated["CurrentUser", Depends(get_current_user)]
 ):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def token_claims(user: models.User) -> dict:
+    """Claims for a new access token; includes signed user fields when enabled."""
+    claims = {"sub": user.email}
+    if settings.token_user_claims:
+        claims.update({"id": user.id, "is_active": user.is_active, "userType": user.userType})
+    return claims
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         name = user.name,
@@ -90,6 +303,6 @@ def create_user(db: Session, user: schemas.UserCreate):
         userType=user.userType
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user 
\ No newline at end of file
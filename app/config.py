@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List
 
 
 class Settings(BaseSettings):
@@ -10,6 +11,82 @@ class Settings(BaseSettings):
     openai_api_key: str
     organization_id: str
 
+    # "async" uses asyncpg/aiosqlite; "sync" runs the sync driver in the threadpool
+    database_mode: str = "async"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    # Apply the Alembic migrations at startup (single worker / local runs);
+    # otherwise run ``alembic upgrade head`` before starting the workers
+    database_auto_migrate: bool = False
+
+    # Password hashing (bcrypt cost factor and its dedicated thread pool)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+
+    # Authentication fast path
+    user_cache_ttl_seconds: float = 30
+    user_cache_size: int = 10000
+    token_user_claims: bool = False  # embed id/is_active/userType in tokens
+
+    # AI description generation
+    ai_model: str = "gpt-4o-mini"
+    ai_backend: str = "openai"  # "openai" or "stub" for offline runs
+    ai_cache_size: int = 1024
+    ai_cache_ttl_seconds: float = 3600
+    ai_cache_persistent: bool = False
+
+    # Background AI description generation
+    description_workers: int = 2
+    description_queue_size: int = 1000
+    description_max_attempts: int = 5
+    resummarize_interval_seconds: float = 60.0
+    resummarize_max_reports: int = 10
+    resummarize_max_prompt_chars: int = 4000
+
+    # Optional text component of correlation (0 disables it)
+    correlation_text_weight: float = 0.0
+    text_vector_cache_size: int = 50000
+
+    # Near-duplicate report detection (MinHash LSH in front of correlation)
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.8
+    dedup_window_hours: float = 6
+    dedup_radius_km: float = 1.0
+
+    # Location alert levels: nearby report weight decayed over alert_decay_hours;
+    # the level is the number of thresholds the score reaches
+    alert_radius_km: float = 5.0
+    alert_decay_hours: float = 24
+    alert_level_thresholds: List[float] = [2.0, 5.0, 10.0, 20.0]
+
+    # Correlation of nearby reports is serialized per grid cell: striped
+    # in-process locks, plus Postgres advisory locks across workers
+    correlation_lock_stripes: int = 1024
+    correlation_advisory_locks: bool = True
+
+    # Sharing correlation state between workers (uvicorn --workers / WEB_CONCURRENCY):
+    # "memory" for a single worker, "postgres" to broadcast changes over LISTEN/NOTIFY
+    # and reread events around each report under the correlation lock
+    state_backend: str = "memory"
+    state_channel: str = "hazard_state"
+
+    # Event push channel (SSE / WebSocket). "local" serves a single worker;
+    # "postgres" fans out across workers with LISTEN/NOTIFY
+    push_backend: str = "local"
+    push_channel: str = "hazard_events"
+    push_queue_size: int = 100
+    push_heartbeat_seconds: float = 15
+
+    # POST /reports/bulk
+    bulk_reports_max: int = 1000
+
+    # Report retention (python -m app.retention): whole months older than
+    # retention_months are archived to archive_dir as gzip NDJSON and leave the
+    # database. On Postgres, monthly partitions are kept partition_months_ahead ahead
+    retention_months: int = 12
+    archive_dir: str = "archive"
+    partition_months_ahead: int = 3
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,29 @@
+import math
+import threading
+import zlib
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Callable, Iterable, List, Optional, Set
 
-from sqlalchemy import event
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
-from . import models, ai
+from . import models, ai, queries, push, shared_state, text_similarity
+from .cell_locks import Cell, lock_in_database
+from .dedup import DuplicateIndex
+from .description_worker import build_update_prompt
+from .spatial_index import ActiveEventIndex, IndexEntry, haversine_km, to_epoch
 import numpy as np
 
+EARTH_RADIUS_KM = 6371
+# Past this many cells (reports near the poles, huge batches) correlation locks one global cell
+MAX_LOCK_CELLS = 256
+GLOBAL_CELL: Cell = (1 << 31, 1 << 31)
+
+DEFAULT_WEIGHTS = {
+    'location': 0.4,
+    'tags': 0.3,
+    'time': 0.3
+}
+
 
 class HybridCorrelator:
     def __init__(self, 
@@ -16,24 +34,26 @@ class HybridCorrelator:
         self.max_distance = max_distance_km
         self.max_time_window = timedelta(hours=max_time_hours)
         self.min_tag_similarity = min_tag_similarity
-        self.weights = weights or {
-            'location': 0.4,
-            'tags': 0.3,
-            'time': 0.3
-        }
+        # An optional 'text' weight adds description/content cosine similarity
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.vocabulary = TagVocabulary()
+        self.vectorizer = text_similarity.description_vectors.vectorizer
+
+    @property
+    def uses_text(self) -> bool:
+        return bool(self.weights.get('text'))
+
+    @classmethod
+    def with_text_weight(cls, text_weight: float, **kwargs) -> "HybridCorrelator":
+        """Correlator whose default weights are scaled down to make room for ``text_weight``."""
+        weights = {name: weight * (1 - text_weight) for name, weight in DEFAULT_WEIGHTS.items()}
+        weights['text'] = text_weight
+        return cls(weights=weights, **kwargs)
 
     def calculate_location_similarity(self, lat1: float, lon1: float, 
                                    lat2: float, lon2: float) -> float:
         """Calculate location similarity score based on Haversine distance."""
-        R = 6371  # Earth's radius in kilometers
-
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        distance = R * c
+        distance = haversine_km(lat1, lon1, lat2, lon2)
 
         # Convert distance to similarity score (0-1)
         similarity = max(0, 1 - (distance / self.max_distance))
@@ -58,7 +78,7 @@ class HybridCorrelator:
         # Convert time difference to similarity score (1.0 to 0.0)
         # Using exponential decay to give higher weight to more recent events
         hours_diff = time_diff.total_seconds() / 3600
-        similarity = np.exp(-hours_diff / (self.max_time_window.total_seconds() / 3600))
+        similarity = math.exp(-hours_diff / (self.max_time_window.total_seconds() / 3600))
         return similarity
 
     def get_correlation_score(self, report1: models.Report, report2: models.Report) -> float:
@@ -84,74 +104,439 @@ class HybridCorrelator:
             time_similarity * self.weights['time']
         )
 
+        if self.uses_text:
+            score += self.weights['text'] * text_similarity.cosine(
+                self.vectorizer.transform(report1.content),
+                self.vectorizer.transform(report2.content)
+            )
+
         return score
 
+    def score_many(self, report: models.Report, candidates: "CandidateBatch") -> np.ndarray:
+        """Score a report against every candidate in one vectorized pass."""
+        return self.score_point(
+            report.location.latitude,
+            report.location.longitude,
+            to_epoch(report.created_at),
+            self.vocabulary.encode(report.tags),
+            candidates,
+            self.vectorizer.transform(report.content) if self.uses_text else None
+        )
+
+    def score_point(self, latitude: float, longitude: float, timestamp: float,
+                    tag_bits: np.ndarray, candidates: "CandidateBatch",
+                    text_vector: Optional[text_similarity.SparseVector] = None) -> np.ndarray:
+        """Vectorized equivalent of get_correlation_score for a batch of candidates.
+
+        The text term needs both ``text_vector`` and ``candidates.text_vectors``;
+        without them it contributes nothing.
+        """
+        # Location similarity (haversine)
+        lat1, lon1 = math.radians(latitude), math.radians(longitude)
+        lat2 = np.radians(candidates.latitudes)
+        lon2 = np.radians(candidates.longitudes)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        location_similarity = np.maximum(0.0, 1 - distance / self.max_distance)
+
+        # Tag similarity (Jaccard over bitmasks)
+        intersection = popcount(candidates.tag_bits & tag_bits)
+        union = popcount(candidates.tag_bits | tag_bits)
+        if tag_bits.any():
+            has_tags = candidates.tag_bits.any(axis=1)
+            tag_similarity = np.where(has_tags, intersection / np.maximum(union, 1), 0.0)
+        else:
+            tag_similarity = np.zeros(len(candidates))
+
+        # Time similarity (exponential decay inside the window)
+        window_hours = self.max_time_window.total_seconds() / 3600
+        hours_diff = np.abs(candidates.timestamps - timestamp) / 3600
+        time_similarity = np.where(hours_diff <= window_hours, np.exp(-hours_diff / window_hours), 0.0)
+
+        scores = (
+            location_similarity * self.weights['location'] +
+            tag_similarity * self.weights['tags'] +
+            time_similarity * self.weights['time']
+        )
+        if self.uses_text and text_vector is not None and candidates.text_vectors is not None:
+            # Cosine similarity as one sparse matrix-vector product
+            scores += self.weights['text'] * candidates.text_vectors.dot(text_vector)
+        return scores
+
+
+    def score_matrix(self, queries: "CandidateBatch", candidates: "CandidateBatch") -> np.ndarray:
+        """Score every query against every candidate, as a ``(queries, candidates)`` matrix.
+
+        Pairs beyond ``max_distance`` or the time window score 0: online they
+        never reach scoring because the event index filters them out. The
+        optional text term is not included.
+        """
+        lat1 = np.radians(queries.latitudes)[:, None]
+        lon1 = np.radians(queries.longitudes)[:, None]
+        lat2 = np.radians(candidates.latitudes)[None, :]
+        lon2 = np.radians(candidates.longitudes)[None, :]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        location_similarity = np.maximum(0.0, 1 - distance / self.max_distance)
+
+        shape = (len(queries), len(candidates))
+        left = queries.tag_bits[:, None, :]
+        right = candidates.tag_bits[None, :, :]
+        intersection = popcount((left & right).reshape(-1, left.shape[-1])).reshape(shape)
+        union = popcount((left | right).reshape(-1, left.shape[-1])).reshape(shape)
+        has_tags = queries.tag_bits.any(axis=1)[:, None] & candidates.tag_bits.any(axis=1)[None, :]
+        tag_similarity = np.where(has_tags, intersection / np.maximum(union, 1), 0.0)
+
+        window_hours = self.max_time_window.total_seconds() / 3600
+        hours_diff = np.abs(candidates.timestamps[None, :] - queries.timestamps[:, None]) / 3600
+        time_similarity = np.exp(-hours_diff / window_hours)
+
+        scores = (
+            location_similarity * self.weights['location'] +
+            tag_similarity * self.weights['tags'] +
+            time_similarity * self.weights['time']
+        )
+        scores[(distance > self.max_distance) | (hours_diff > window_hours)] = 0.0
+        return scores
+
+
+class TagVocabulary:
+    """Assigns each tag a bit position so tag sets can be compared as bitmasks.
+
+    Tags beyond ``size`` are folded onto existing bits by hash, which can only
+    make the Jaccard estimate for those tags slightly optimistic.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+        self.words = (size + 63) // 64
+        self._bits = {}
+        self._lock = threading.Lock()
+
+    def bit(self, tag: str) -> int:
+        position = self._bits.get(tag)
+        if position is None:
+            with self._lock:
+                position = self._bits.get(tag)
+                if position is None:
+                    if len(self._bits) < self.size:
+                        position = len(self._bits)
+                    else:
+                        position = zlib.crc32(tag.encode()) % self.size
+                    self._bits[tag] = position
+        return position
+
+    def encode(self, tags: List[str]) -> np.ndarray:
+        bits = np.zeros(self.words, dtype=np.uint64)
+        for tag in tags or []:
+            position = self.bit(tag)
+            bits[position // 64] |= np.uint64(1 << (position % 64))
+        return bits
+
+
+class CandidateBatch:
+    """Column arrays describing a set of candidate events."""
+
+    def __init__(self, event_ids: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray,
+                 timestamps: np.ndarray, tag_bits: np.ndarray,
+                 text_vectors: Optional[text_similarity.SparseRows] = None):
+        self.event_ids = event_ids
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.timestamps = timestamps
+        self.tag_bits = tag_bits
+        self.text_vectors = text_vectors
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
+
+    @classmethod
+    def from_entries(cls, entries: List[IndexEntry], vocabulary: TagVocabulary) -> "CandidateBatch":
+        tag_bits = np.zeros((len(entries), vocabulary.words), dtype=np.uint64)
+        for i, entry in enumerate(entries):
+            if entry.tag_bits is None:
+                entry.tag_bits = vocabulary.encode(entry.tags)
+            tag_bits[i] = entry.tag_bits
+        return cls(
+            np.fromiter((e.event_id for e in entries), dtype=np.int64, count=len(entries)),
+            np.fromiter((e.latitude for e in entries), dtype=np.float64, count=len(entries)),
+            np.fromiter((e.longitude for e in entries), dtype=np.float64, count=len(entries)),
+            np.fromiter((e.timestamp for e in entries), dtype=np.float64, count=len(entries)),
+            tag_bits
+        )
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Count set bits per row of a 2-D uint64 array."""
+    bits = np.ascontiguousarray(bits)
+    return _POPCOUNT_TABLE[bits.view(np.uint8)].reshape(len(bits), -1).sum(axis=1)
+
 
 class EventCorrelationService:
-    def __init__(self, correlation_threshold: float = 0.6):
-        self.correlator = HybridCorrelator()
+    def __init__(self, correlation_threshold: float = 0.6,
+                 describe: Optional[Callable[[int, str], bool]] = None,
+                 mark_dirty: Optional[Callable[[int, str], bool]] = None,
+                 text_weight: float = 0.0,
+                 deduplicator: Optional[DuplicateIndex] = None,
+                 publish: Optional[Callable[[push.PushMessage], bool]] = None,
+                 advisory_locks: bool = True,
+                 share: Optional[Callable[..., bool]] = None,
+                 sync_regions: bool = False):
+        self.correlator = HybridCorrelator.with_text_weight(text_weight) if text_weight else HybridCorrelator()
         self.threshold = correlation_threshold
+        self.describe = describe
+        self.mark_dirty = mark_dirty
+        self.deduplicator = deduplicator
+        self.publish = publish
+        self.advisory_locks = advisory_locks
+        # Broadcasts index/dedup changes to other workers (shared_state.publish)
+        self.share = share
+        # Reread events around each report under the advisory lock, for several workers
+        self.sync_regions = sync_regions
+        self.index = ActiveEventIndex(
+            cell_km=self.correlator.max_distance,
+            max_age=self.correlator.max_time_window
+        )
 
-    def find_matching_event(self, db: Session, report: models.Report) -> Optional[models.Event]:
-        """Find the best matching event for a report."""
-        # Get recent events within time window
+    def rebuild_index(self, db: Session) -> None:
+        """Load the latest report of every active event into the index.
+
+        May fill in missing latest-report columns; the caller commits. Never
+        commits itself, since correlation calls it holding transaction-scoped locks.
+        """
+        queries.refresh_event_positions(db)
+        self.index.rebuild(self.fetch_candidates(db))
+        if self.deduplicator is not None:
+            self.deduplicator.clear()
+            since = datetime.utcnow() - timedelta(seconds=self.deduplicator.window)
+            for report_id, event_id, latitude, longitude, created_at, content in queries.recent_report_rows(db, since):
+                self.deduplicator.add(report_id, event_id, latitude, longitude, created_at, content)
+
+    def ensure_index(self, db: Session) -> None:
+        """Rebuild a cleared index (``/reload``, an index reset) before correlation takes its locks."""
+        if not self.index.built:
+            self.rebuild_index(db)
+
+    def fetch_candidates(self, db: Session) -> List[queries.CandidateRow]:
+        """Fetch ``(event_id, lat, lon, created_at, tags)`` for every active event."""
         time_threshold = datetime.utcnow() - self.correlator.max_time_window
-        
-        # Get all events with their most recent reports
-        recent_events = (
-            db.query(models.Event)
-            .select_from(models.Event)
-            .join(models.event_reports)
-            .join(models.Report)
-            .filter(models.Report.created_at >= time_threshold)
-            .distinct()
-            .all()
+        return queries.recent_event_rows(db, time_threshold)
+
+    def index_event(self, event: models.Event) -> None:
+        """Move an event in the index to the position of its newest report."""
+        self.index.upsert(
+            event.id,
+            event.last_lat,
+            event.last_lon,
+            event.last_report_at,
+            event.last_tags
         )
+        if self.share is not None:
+            self.share(
+                shared_state.EVENT_INDEXED,
+                event_id=event.id,
+                latitude=event.last_lat,
+                longitude=event.last_lon,
+                created_at=event.last_report_at.isoformat(),
+                tags=list(event.last_tags or [])
+            )
+
+    def unindex_event(self, event_id: int) -> None:
+        self.index.remove(event_id)
+        if self.share is not None:
+            self.share(shared_state.EVENT_REMOVED, event_id=event_id)
 
-        best_match = None
-        highest_score = 0
-
-        for event in recent_events:
-            # Get the most recent report from this event
-            latest_report = (
-                db.query(models.Report)
-                .join(models.event_reports)
-                .filter(models.event_reports.c.event_id == event.id)
-                .order_by(models.Report.created_at.desc())
-                .first()
+    def remember_report(self, report: models.Report, event: models.Event, signature=None) -> None:
+        """Add a correlated report to the near-duplicate index."""
+        self.deduplicator.add(report.id, event.id, report.location.latitude, report.location.longitude,
+                              report.created_at, report.content, signature)
+        if self.share is not None:
+            self.share(
+                shared_state.REPORT_SEEN,
+                report_id=report.id,
+                event_id=event.id,
+                latitude=report.location.latitude,
+                longitude=report.location.longitude,
+                created_at=report.created_at.isoformat(),
+                content=(report.content or "")[:push.MAX_TEXT_CHARS]
             )
-            
-            if latest_report:
-                score = self.correlator.get_correlation_score(report, latest_report)
-                
-                if score > highest_score and score >= self.threshold:
-                    highest_score = score
-                    best_match = event
 
-        return best_match
+    def sync_region(self, db: Session, cells: Set[Cell]) -> None:
+        """Reload the active events in ``cells`` from the database into the index.
+
+        Other workers' changes are committed before they release the cell
+        locks, so after this the index is current for the locked area.
+        """
+        since = datetime.utcnow() - self.correlator.max_time_window
+        bbox = None if GLOBAL_CELL in cells else self.index.cell_bounds(cells)
+        for row in queries.recent_event_rows(db, since, bbox):
+            self.index.upsert(*row)
+
+    def refresh_events(self, db: Session, event_ids: List[int]) -> None:
+        """Recompute the latest-report columns of events after reports were removed."""
+        queries.refresh_event_positions(db, event_ids)
+        db.commit()
+        for event_id in event_ids:
+            self.unindex_event(event_id)
+            event = db.get(models.Event, event_id)
+            if event is not None and event.last_report_at is not None:
+                self.index_event(event)
+
+    def lock_cells(self, locations: Iterable[models.Location]) -> Set[Cell]:
+        """Grid cells a correlation pass for reports at ``locations`` may read or write.
+
+        Every cell within the correlation radius of each location is included,
+        so two reports close enough to correlate always share at least one cell.
+        """
+        cells = set()
+        for location in locations:
+            lat_cells, lon_cells = self.index.cell_ranges(
+                location.latitude, location.longitude, self.correlator.max_distance
+            )
+            if len(cells) + len(lat_cells) * len(lon_cells) > MAX_LOCK_CELLS:
+                return {GLOBAL_CELL}
+            cells.update((lat_cell, lon_cell) for lat_cell in lat_cells for lon_cell in lon_cells)
+        return cells
+
+    def lock_in_database(self, db: Session, reports: Iterable[models.Report]) -> None:
+        """Serialize correlation of nearby reports across workers for the rest of the transaction.
+
+        Uses Postgres advisory locks; a no-op on other backends, where a
+        single worker's in-process locks are the only protection.
+        """
+        if not self.advisory_locks:
+            return
+        cells = self.lock_cells({report.location for report in reports})
+        if lock_in_database(db, cells) and self.sync_regions:
+            self.sync_region(db, cells)
+
+    def notify(self, kind: str, event: models.Event, report: Optional[models.Report] = None) -> None:
+        """Push a committed change to subscribers."""
+        if self.publish is not None:
+            self.publish(push.event_message(kind, event, report))
+
+    def request_description(self, db: Session, event: models.Event, event_summary: str) -> None:
+        """Hand the event summary to the background describer, or generate inline without one."""
+        if self.describe is not None:
+            self.describe(event.id, event_summary)
+            return
+        event.description = ai.generate_event_description(event_summary)
+        db.commit()
+        self.notify(push.EVENT_UPDATED, event)
+
+    def request_update(self, db: Session, event: models.Event, report_line: str) -> None:
+        """Mark the event for incremental re-summarization, or update inline without a worker."""
+        if self.mark_dirty is not None:
+            self.mark_dirty(event.id, report_line)
+            return
+        event_summary = build_update_prompt(event.location.name, event.tags, event.description, [report_line])
+        event.description = ai.generate_event_description(event_summary)
+        db.commit()
+        self.notify(push.EVENT_UPDATED, event)
+
+    @staticmethod
+    def record_latest_report(event: models.Event, report: models.Report) -> None:
+        """Keep the event's denormalized latest-report columns current."""
+        if event.last_report_at is not None and to_epoch(event.last_report_at) > to_epoch(report.created_at):
+            return
+        event.last_report_at = report.created_at
+        event.last_lat = report.location.latitude
+        event.last_lon = report.location.longitude
+        event.last_tags = report.tags
+
+    def find_matching_event(self, db: Session, report: models.Report) -> Optional[models.Event]:
+        """Find the best matching event for a report."""
+        if not self.index.built:
+            self.rebuild_index(db)
+        self.index.prune()
+
+        # Only events whose latest report is within range in space and time
+        candidates = self.index.candidates(
+            report.location.latitude,
+            report.location.longitude,
+            report.created_at,
+            self.correlator.max_distance,
+            self.correlator.max_time_window
+        )
+
+        if not candidates:
+            return None
+
+        batch = CandidateBatch.from_entries(candidates, self.correlator.vocabulary)
+        if self.correlator.uses_text:
+            batch.text_vectors = text_similarity.description_vectors.rows(db, batch.event_ids.tolist())
+        scores = self.correlator.score_many(report, batch)
+        best = int(np.argmax(scores))
+        if scores[best] <= 0 or scores[best] < self.threshold:
+            return None
+
+        best_match = int(batch.event_ids[best])
+
+        event = db.get(models.Event, best_match)
+        if event is None:
+            self.unindex_event(best_match)
+        return event
+
+    def find_duplicate(self, db: Session, report: models.Report, signature) -> Optional[models.Event]:
+        """Event of a recent near-identical report close by, if any."""
+        self.deduplicator.prune(report.created_at)
+        duplicate = self.deduplicator.find(
+            report.location.latitude,
+            report.location.longitude,
+            report.created_at,
+            signature
+        )
+        return db.get(models.Event, duplicate.event_id) if duplicate is not None else None
+
+    def corroborate(self, db: Session, event: models.Event, report: models.Report) -> None:
+        """Attach a near-duplicate report without scoring or re-summarizing the event."""
+        report.events.append(event)
+        self.record_latest_report(event, report)
+        event.tags = list(set(event.tags + report.tags))
+        event.corroboration_count = (event.corroboration_count or 0) + 1
+        db.commit()
+        self.index_event(event)
+        self.notify(push.REPORT_ADDED, event, report)
 
     def create_or_update_event(self, db: Session, report: models.Report) -> models.Event:
+        """Attach the report to an event, checking for near-duplicates first."""
+        self.ensure_index(db)
+        self.lock_in_database(db, [report])
+        if self.deduplicator is None:
+            return self.correlate(db, report)
+
+        signature = self.deduplicator.hasher.signature(report.content)
+        event = self.find_duplicate(db, report, signature)
+        if event is not None:
+            self.corroborate(db, event, report)
+        else:
+            event = self.correlate(db, report)
+        self.remember_report(report, event, signature)
+        return event
+
+    def correlate(self, db: Session, report: models.Report) -> models.Event:
         """Create a new event or update existing one based on the report."""
         matching_event = self.find_matching_event(db, report)
 
         if matching_event:
-            # Update existing event
-            matching_event.reports.append(report)
-            
-            # Create a summary of the event for AI description generation
-            event_summary = f"Location: {matching_event.location.name}\n"
-            event_summary += f"Time: {report.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            event_summary += f"Tags: {', '.join(matching_event.tags)}\n"
-            event_summary += "Reports:\n"
-            for r in matching_event.reports:
-                event_summary += f"- {r.content} (Severity: {r.severity}, Time: {r.created_at.strftime('%Y-%m-%d %H:%M:%S')})\n"
-            
-            # Generate new description
-            matching_event.description = ai.generate_event_description(event_summary)
-            
+            # Update existing event. Appending from the report side avoids loading
+            # every report of a hot event just to add one more.
+            report.events.append(matching_event)
+            self.record_latest_report(matching_event, report)
+
+            # Only the new report goes into the next (debounced) re-summarization
+            line = report_line(report)
+
             # Update tags if new ones are present
             matching_event.tags = list(set(matching_event.tags + report.tags))
             db.commit()
+            self.index_event(matching_event)
+            self.notify(push.REPORT_ADDED, matching_event, report)
+
+            self.request_update(db, matching_event, line)
             return matching_event
         else:
             # Create new event
@@ -161,17 +546,129 @@ class EventCorrelationService:
                 location_id=report.location_id,
                 reports=[report]
             )
+            self.record_latest_report(new_event, report)
             
             # Create initial summary for AI description
-            event_summary = f"Location: {report.location.name}\n"
-            event_summary += f"Time: {report.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            event_summary += f"Tags: {', '.join(report.tags)}\n"
-            event_summary += f"Initial Report: {report.content} (Severity: {report.severity})\n"
-            
-            # Generate initial description
-            new_event.description = ai.generate_event_description(event_summary)
-            
+            event_summary = initial_summary(report)
+
+            # The report content is the placeholder description until the AI one is ready
             db.add(new_event)
             db.commit()
             db.refresh(new_event)
-            return new_event 
\ No newline at end of file
+            self.index_event(new_event)
+            self.notify(push.EVENT_CREATED, new_event, report)
+
+            self.request_description(db, new_event, event_summary)
+            return new_event
+
+    def cluster_batch(self, reports: List[models.Report]) -> List[List[models.Report]]:
+        """Group a batch of reports among themselves, oldest first.
+
+        Each report joins the best-scoring cluster (compared with the cluster's
+        newest member) when it clears the threshold, or starts a new one.
+        """
+        clusters: List[List[models.Report]] = []
+        latitudes, longitudes, timestamps, tag_bits, texts = [], [], [], [], []
+        for report in sorted(reports, key=lambda r: (to_epoch(r.created_at), r.id)):
+            point = (
+                report.location.latitude,
+                report.location.longitude,
+                to_epoch(report.created_at),
+                self.correlator.vocabulary.encode(report.tags),
+                self.correlator.vectorizer.transform(report.content) if self.correlator.uses_text else None
+            )
+            best = -1
+            if clusters:
+                heads = CandidateBatch(
+                    np.arange(len(clusters)),
+                    np.array(latitudes),
+                    np.array(longitudes),
+                    np.array(timestamps),
+                    np.array(tag_bits),
+                    text_similarity.SparseRows.from_vectors(texts) if self.correlator.uses_text else None
+                )
+                scores = self.correlator.score_point(*point[:4], heads, point[4])
+                best = int(np.argmax(scores))
+                if scores[best] <= 0 or scores[best] < self.threshold:
+                    best = -1
+            if best < 0:
+                clusters.append([report])
+                latitudes.append(point[0])
+                longitudes.append(point[1])
+                timestamps.append(point[2])
+                tag_bits.append(point[3])
+                texts.append(point[4])
+            else:
+                clusters[best].append(report)
+                latitudes[best], longitudes[best], timestamps[best], tag_bits[best], texts[best] = point
+        return clusters
+
+    def correlate_batch(self, db: Session, reports: List[models.Report]) -> List[models.Event]:
+        """Correlate a batch of freshly inserted reports in a single transaction.
+
+        The batch is clustered internally first; each cluster is then matched
+        against existing events through its newest report, so the database sees
+        one association insert and one commit however many reports arrive.
+        Report locations must already be loaded into the session.
+        """
+        self.ensure_index(db)
+        self.lock_in_database(db, reports)
+        updated: List[tuple] = []
+        created: List[tuple] = []
+        for cluster in self.cluster_batch(reports):
+            event = self.find_matching_event(db, cluster[-1])
+            if event is not None:
+                updated.append((event, cluster))
+            else:
+                # The first report is the placeholder description until the AI one is ready
+                event = models.Event(description=cluster[0].content, location_id=cluster[0].location_id)
+                db.add(event)
+                created.append((event, cluster))
+            event.tags = list(set(event.tags or []).union(*(report.tags for report in cluster)))
+            for report in cluster:
+                self.record_latest_report(event, report)
+
+        # New events need their ids before the association rows can be written
+        db.flush()
+        links = [
+            {"event_id": event.id, "report_id": report.id, "report_created_at": report.created_at}
+            for event, cluster in updated + created
+            for report in cluster
+        ]
+        if links:
+            db.execute(insert(models.event_reports), links)
+        db.commit()
+
+        for event, cluster in updated:
+            self.index_event(event)
+            for report in cluster:
+                self.notify(push.REPORT_ADDED, event, report)
+                self.request_update(db, event, report_line(report))
+        for event, cluster in created:
+            self.index_event(event)
+            self.notify(push.EVENT_CREATED, event, cluster[0])
+            for report in cluster[1:]:
+                self.notify(push.REPORT_ADDED, event, report)
+            summary = initial_summary(cluster[0])
+            if len(cluster) > 1:
+                summary += "Additional Reports:\n" + "\n".join(report_line(report) for report in cluster[1:]) + "\n"
+            self.request_description(db, event, summary)
+        if self.deduplicator is not None:
+            for event, cluster in updated + created:
+                for report in cluster:
+                    self.remember_report(report, event)
+        return [event for event, _ in updated + created]
+
+
+def report_line(report: models.Report) -> str:
+    """One line describing a report, as fed into incremental re-summarization."""
+    return f"- {report.content} (Severity: {report.severity}, Time: {report.created_at.strftime('%Y-%m-%d %H:%M:%S')})"
+
+
+def initial_summary(report: models.Report) -> str:
+    """Prompt describing the first report of a new event."""
+    event_summary = f"Location: {report.location.name}\n"
+    event_summary += f"Time: {report.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    event_summary += f"Tags: {', '.join(report.tags)}\n"
+    event_summary += f"Initial Report: {report.content} (Severity: {report.severity})\n"
+    return event_summary 
\ No newline at end of file
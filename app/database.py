@@ -1,24 +1,171 @@
-from sqlalchemy import create_engine
+import threading
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from .config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,
-    connect_args={} if settings.database_url.startswith('postgresql') else {"check_same_thread": False}
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines are created on first use, not at import: importing the app (tests,
+# CLIs, the import-time benchmark) opens no connections and runs no DDL.
+_engines = {}
+_engines_lock = threading.Lock()
 
 Base = declarative_base()
 
 
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)."""
+    scheme, _, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def asyncpg_dsn(url: str) -> str:
+    """Plain ``postgresql://`` DSN for connecting with asyncpg directly (LISTEN/NOTIFY)."""
+    return async_database_url(url).replace("+asyncpg", "", 1)
+
+
+def _engine(kind: str, factory):
+    engine = _engines.get(kind)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(kind)
+            if engine is None:
+                engine = _engines[kind] = factory()
+    return engine
+
+
+def get_engine():
+    """The sync engine, created on first use."""
+    return _engine("sync", lambda: create_engine(
+        settings.database_url,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        connect_args={} if settings.database_url.startswith('postgresql') else {"check_same_thread": False}
+    ))
+
+
+def get_async_engine():
+    """The async engine (``database_mode=async``), created on first use."""
+    return _engine("async", lambda: create_async_engine(
+        async_database_url(settings.database_url),
+        **({
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+            "pool_timeout": 30,
+            "pool_recycle": 1800
+        } if settings.database_url.startswith('postgresql') else {})
+    ))
+
+
+async def dispose_engines() -> None:
+    """Close the pooled connections of every engine created so far."""
+    with _engines_lock:
+        engines = dict(_engines)
+        _engines.clear()
+    for kind, engine in engines.items():
+        if kind == "async":
+            await engine.dispose()
+        else:
+            await run_in_threadpool(engine.dispose)
+
+
+class LazySessionmaker(sessionmaker):
+    """``sessionmaker`` that binds to its engine when the first session is made."""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self.engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        self.kw["bind"] = self.engine_factory()
+        return super().__call__(**local_kw)
+
+
+class LazyAsyncSessionmaker(async_sessionmaker):
+    """``async_sessionmaker`` that binds to its engine when the first session is made."""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self.engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        self.kw["bind"] = self.engine_factory()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = LazySessionmaker(get_engine, autocommit=False, autoflush=False)
+
+AsyncSessionLocal = None
+
+if settings.database_mode == "async":
+    AsyncSessionLocal = LazyAsyncSessionmaker(get_async_engine, autoflush=False, expire_on_commit=False)
+
+
+class SyncSessionAdapter:
+    """Exposes a sync Session through the AsyncSession API used by the endpoints.
+
+    Every database call runs in the threadpool, so ``database_mode=sync`` keeps
+    the event loop free without a second copy of the endpoint code.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -26,5 +173,44 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_session():
+    """Request-scoped session: an AsyncSession in async mode, a threadpool-backed adapter otherwise."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = SyncSessionAdapter(SessionLocal(expire_on_commit=False))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+MIGRATIONS_CONFIG = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def migration_config():
+    """Alembic config for running migrations from inside the app (keeps the app's logging)."""
+    from alembic.config import Config
+
+    config = Config(str(MIGRATIONS_CONFIG))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def migrate(revision: str = "head") -> None:
+    """Upgrade the schema with the Alembic revisions in ``migrations/``.
+
+    The same as ``alembic upgrade head``. Run it once before starting the
+    workers rather than from every worker.
+    """
+    from alembic import command
+
+    command.upgrade(migration_config(), revision)
+
+
 def drop_tables():
-    Base.metadata.drop_all(engine)
\ No newline at end of file
+    Base.metadata.drop_all(get_engine())
+    # Forget the applied revisions too, so the next migrate recreates the schema
+    with get_engine().begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
@@ -0,0 +1,165 @@
+import re
+import threading
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+from .spatial_index import haversine_km, to_epoch
+
+MERSENNE_PRIME = (1 << 61) - 1
+NON_WORD = re.compile(r"\W+")
+
+
+class MinHasher:
+    """MinHash signatures over character shingles of normalized text.
+
+    Character shingles keep short crowd reports comparable when only a word or
+    two differ. The fraction of equal signature slots estimates the Jaccard
+    similarity of the shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # Coefficients below 2**32 keep a * hash + b inside 64 bits
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def shingles(self, text: Optional[str]) -> np.ndarray:
+        normalized = NON_WORD.sub(" ", (text or "").lower()).strip()
+        if not normalized:
+            return np.zeros(0, dtype=np.uint64)
+        size = min(self.shingle_size, len(normalized))
+        hashes = {
+            zlib.crc32(normalized[i:i + size].encode())
+            for i in range(len(normalized) - size + 1)
+        }
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, text: Optional[str]) -> Optional[np.ndarray]:
+        hashes = self.shingles(text)
+        if not len(hashes):
+            return None
+        return ((self.a * hashes[None, :] + self.b) % np.uint64(MERSENNE_PRIME)).min(axis=1)
+
+
+def estimated_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    return float(np.count_nonzero(left == right)) / len(left)
+
+
+class DedupEntry:
+    __slots__ = ("report_id", "event_id", "latitude", "longitude", "timestamp", "signature", "keys")
+
+    def __init__(self, report_id: int, event_id: int, latitude: float, longitude: float,
+                 timestamp: float, signature: np.ndarray, keys: List[bytes]):
+        self.report_id = report_id
+        self.event_id = event_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timestamp = timestamp
+        self.signature = signature
+        self.keys = keys
+
+
+class DuplicateIndex:
+    """LSH index of recent report signatures over a sliding time window.
+
+    Signatures are split into ``bands`` of ``rows`` slots; reports sharing any
+    band are candidates, and a candidate is a duplicate when it is within the
+    radius and time window and its estimated Jaccard similarity reaches the
+    threshold.
+    """
+
+    def __init__(self, threshold: float = 0.8, window: timedelta = timedelta(hours=6),
+                 radius_km: float = 1.0, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.threshold = threshold
+        self.window = window.total_seconds()
+        self.radius_km = radius_km
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.stats = {"checked": 0, "duplicates": 0}
+        self._buckets: Dict[bytes, Dict[int, DedupEntry]] = {}
+        self._entries: Deque[DedupEntry] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            bytes([band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def add(self, report_id: int, event_id: int, latitude: float, longitude: float,
+            created_at: datetime, content: Optional[str],
+            signature: Optional[np.ndarray] = None) -> None:
+        if signature is None:
+            signature = self.hasher.signature(content)
+        if signature is None:
+            return
+        entry = DedupEntry(report_id, event_id, latitude, longitude, to_epoch(created_at),
+                           signature, self._keys(signature))
+        with self._lock:
+            self._entries.append(entry)
+            for key in entry.keys:
+                self._buckets.setdefault(key, {})[report_id] = entry
+
+    def prune(self, now: datetime) -> int:
+        """Drop entries older than the window, oldest first."""
+        oldest = to_epoch(now) - self.window
+        removed = 0
+        with self._lock:
+            while self._entries and self._entries[0].timestamp < oldest:
+                entry = self._entries.popleft()
+                for key in entry.keys:
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        bucket.pop(entry.report_id, None)
+                        if not bucket:
+                            del self._buckets[key]
+                removed += 1
+        return removed
+
+    def find(self, latitude: float, longitude: float, created_at: datetime,
+             signature: Optional[np.ndarray]) -> Optional[DedupEntry]:
+        """Return the most similar recent near-duplicate, if any."""
+        self.stats["checked"] += 1
+        if signature is None:
+            return None
+        timestamp = to_epoch(created_at)
+        best, best_similarity = None, self.threshold
+        with self._lock:
+            candidates = {}
+            for key in self._keys(signature):
+                candidates.update(self._buckets.get(key, {}))
+            for entry in candidates.values():
+                if abs(entry.timestamp - timestamp) > self.window:
+                    continue
+                similarity = estimated_jaccard(signature, entry.signature)
+                if similarity < best_similarity:
+                    continue
+                if haversine_km(latitude, longitude, entry.latitude, entry.longitude) <= self.radius_km:
+                    best, best_similarity = entry, similarity
+        if best is not None:
+            self.stats["duplicates"] += 1
+        return best
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "threshold": self.threshold,
+            "window_seconds": self.window,
+            **self.stats
+        }
@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from . import models, ai
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def build_update_prompt(location_name: str, tags: List[str], description: str,
+                        report_lines: List[str], omitted: int = 0, max_chars: int = 4000) -> str:
+    """Build an incremental summary prompt from the previous description and new reports only.
+
+    The newest report lines are kept first; older ones are dropped once the prompt
+    would exceed ``max_chars``.
+    """
+    header = f"Location: {location_name}\n"
+    header += f"Tags: {', '.join(tags or [])}\n"
+    header += f"Current summary: {(description or '')[:max_chars // 2]}\n"
+    header += "New reports:\n"
+
+    budget = max_chars - len(header)
+    kept = []
+    for line in reversed(report_lines):
+        if len(line) + 1 > budget:
+            break
+        kept.append(line)
+        budget -= len(line) + 1
+    omitted += len(report_lines) - len(kept)
+
+    prompt = header + "".join(f"{line}\n" for line in reversed(kept))
+    if omitted:
+        prompt += f"(and {omitted} earlier reports)\n"
+    return prompt
+
+
+class DescriptionJob:
+    __slots__ = ("summary", "lines", "omitted")
+
+    def __init__(self, summary: Optional[str] = None):
+        self.summary = summary
+        self.lines: List[str] = []
+        self.omitted = 0
+
+    def add_line(self, line: str, max_lines: int) -> None:
+        self.lines.append(line)
+        if len(self.lines) > max_lines:
+            del self.lines[0]
+            self.omitted += 1
+
+    def merge(self, other: "DescriptionJob", max_lines: int) -> None:
+        if other.summary is not None:
+            self.summary = other.summary
+            self.lines = []
+            self.omitted = 0
+        self.omitted += other.omitted
+        for line in other.lines:
+            self.add_line(line, max_lines)
+
+
+class DescriptionWorker:
+    """Bounded pool of asyncio workers that fill in ``Event.description`` off the request path.
+
+    Each event is always routed to the same worker, so updates for one event are
+    applied in order. Reports appended to an existing event only mark it dirty;
+    the event is re-summarized at most once per ``resummarize_interval`` seconds,
+    or sooner once ``resummarize_max_reports`` new reports have piled up, from its
+    previous description plus the new reports.
+
+    Nothing is dropped when a queue is full: new-event jobs wait in an overflow
+    map until their queue has room, and refresh jobs go back to the dirty set
+    to be retried on the next flush.
+    """
+
+    def __init__(self,
+                 generate: Optional[Callable[[str], str]] = None,
+                 session_factory=SessionLocal,
+                 workers: int = 2,
+                 max_queue: int = 1000,
+                 max_attempts: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 resummarize_interval: float = 60.0,
+                 resummarize_max_reports: int = 10,
+                 max_prompt_chars: int = 4000,
+                 on_stored: Optional[Callable[[models.Event], None]] = None):
+        self.generate = generate
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.resummarize_interval = resummarize_interval
+        self.resummarize_max_reports = resummarize_max_reports
+        self.max_prompt_chars = max_prompt_chars
+        # Called with each event after its new description is committed
+        self.on_stored = on_stored
+        self.stats = {"enqueued": 0, "coalesced": 0, "deferred": 0, "completed": 0, "retries": 0, "failed": 0,
+                      "marked_dirty": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Dict[int, DescriptionJob] = {}
+        self._dirty: Dict[int, DescriptionJob] = {}
+        # New-event jobs waiting for room in their queue
+        self._overflow: Dict[int, DescriptionJob] = {}
+        self._last_run: Dict[int, float] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def max_lines(self) -> int:
+        return max(self.resummarize_max_reports * 5, 50)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        size = max(1, self.max_queue // self.workers)
+        self._queues = [asyncio.Queue(maxsize=size) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._run(queue)) for queue in self._queues]
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+        self._pending.clear()
+        self._dirty.clear()
+        self._overflow.clear()
+        self._last_run.clear()
+        self._loop = None
+
+    def _call(self, fn, *args) -> bool:
+        """Run ``fn`` on the worker's event loop. Safe to call from any thread."""
+        loop = self._loop
+        if loop is None:
+            return False
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
+        return True
+
+    def submit(self, event_id: int, summary: str) -> bool:
+        """Queue a full description job for an event.
+
+        Returns False when the worker is not running, in which case the event
+        keeps its current description.
+        """
+        return self._call(self._enqueue, event_id, DescriptionJob(summary))
+
+    def mark_dirty(self, event_id: int, report_line: str) -> bool:
+        """Record a new report for an event whose description needs refreshing."""
+        return self._call(self._mark_dirty, event_id, report_line)
+
+    def _mark_dirty(self, event_id: int, report_line: str) -> None:
+        job = self._dirty.get(event_id)
+        if job is None:
+            job = self._dirty[event_id] = DescriptionJob()
+        job.add_line(report_line, self.max_lines)
+        self.stats["marked_dirty"] += 1
+        if len(job.lines) + job.omitted >= self.resummarize_max_reports:
+            self._enqueue(event_id, self._dirty.pop(event_id))
+
+    def _flush_due(self) -> None:
+        now = time.monotonic()
+        due = [event_id for event_id in self._dirty
+               if now - self._last_run.get(event_id, 0.0) >= self.resummarize_interval]
+        for event_id in due:
+            self._enqueue(event_id, self._dirty.pop(event_id))
+
+        # Debounce timestamps only matter while they can still delay a flush
+        stale = [event_id for event_id, last_run in self._last_run.items()
+                 if now - last_run >= self.resummarize_interval
+                 and event_id not in self._dirty and event_id not in self._pending]
+        for event_id in stale:
+            del self._last_run[event_id]
+
+    async def _flush_loop(self) -> None:
+        tick = min(max(self.resummarize_interval / 4, 0.05), 1.0)
+        while True:
+            await asyncio.sleep(tick)
+            self._drain_overflow()
+            self._flush_due()
+
+    def _enqueue(self, event_id: int, job: DescriptionJob) -> None:
+        pending = self._pending.get(event_id)
+        if pending is not None:
+            pending.merge(job, self.max_lines)
+            self.stats["coalesced"] += 1
+            return
+        waiting = self._overflow.get(event_id)
+        if waiting is not None:
+            # Keep the order: the new-event job still waiting goes first
+            waiting.merge(job, self.max_lines)
+            self.stats["coalesced"] += 1
+            return
+        queue = self._queues[event_id % len(self._queues)]
+        if queue.full():
+            self.stats["deferred"] += 1
+            if job.summary is not None:
+                self._overflow[event_id] = job
+            else:
+                # Back to the dirty set; the next _flush_due retries it
+                dirty = self._dirty.pop(event_id, None)
+                if dirty is not None:
+                    job.merge(dirty, self.max_lines)
+                self._dirty[event_id] = job
+            return
+        self._pending[event_id] = job
+        self._last_run[event_id] = time.monotonic()
+        queue.put_nowait(event_id)
+        self.stats["enqueued"] += 1
+
+    def _drain_overflow(self) -> None:
+        for event_id in list(self._overflow):
+            if not self._queues[event_id % len(self._queues)].full():
+                self._enqueue(event_id, self._overflow.pop(event_id))
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            event_id = await queue.get()
+            # A slot just freed up
+            self._drain_overflow()
+            try:
+                job = self._pending.pop(event_id, None)
+                if job is not None:
+                    await self._process(event_id, job)
+            except Exception:
+                logger.exception("Description job for event %s crashed", event_id)
+            finally:
+                queue.task_done()
+
+    async def _process(self, event_id: int, job: DescriptionJob) -> None:
+        generate = self.generate or ai.generate_event_description
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                prompt = await asyncio.to_thread(self._prompt, event_id, job)
+                if prompt is None:
+                    return
+                description = await asyncio.to_thread(generate, prompt)
+                await asyncio.to_thread(self._store, event_id, description)
+                self.stats["completed"] += 1
+                return
+            except Exception:
+                if attempt == self.max_attempts:
+                    self.stats["failed"] += 1
+                    logger.exception("Giving up on description for event %s", event_id)
+                    return
+                self.stats["retries"] += 1
+                # Exponential backoff with jitter
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _prompt(self, event_id: int, job: DescriptionJob) -> Optional[str]:
+        if job.summary is not None:
+            prompt = job.summary + "".join(f"{line}\n" for line in job.lines)
+            return prompt[:self.max_prompt_chars]
+        db = self.session_factory()
+        try:
+            event = db.get(models.Event, event_id)
+            if event is None:
+                return None
+            return build_update_prompt(
+                event.location.name if event.location else "",
+                event.tags,
+                event.description,
+                job.lines,
+                job.omitted,
+                self.max_prompt_chars
+            )
+        finally:
+            db.close()
+
+    def _store(self, event_id: int, description: str) -> None:
+        db = self.session_factory()
+        try:
+            event = db.get(models.Event, event_id)
+            if event is not None:
+                event.description = description
+                db.commit()
+                if self.on_stored is not None:
+                    self.on_stored(event)
+        finally:
+            db.close()
+
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth(),
+            "queue_capacity": self.max_queue,
+            "dirty_events": len(self._dirty),
+            "overflow_events": len(self._overflow),
+            **self.stats
+        }
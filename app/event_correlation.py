@@ -1,22 +1,111 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models
 from typing import List
+from datetime import datetime, timedelta
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from . import push, shared_state, text_similarity
+from .cell_locks import CellLocks
 from .correlation import EventCorrelationService
+from .dedup import DuplicateIndex
+from .config import get_settings
+from .database import asyncpg_dsn
+from .description_worker import DescriptionWorker
+
+settings = get_settings()
+
+
+def push_backend():
+    """Backend named by ``push_backend``: in-process, or Postgres LISTEN/NOTIFY across workers."""
+    if settings.push_backend == "postgres":
+        return push.PostgresBackend(asyncpg_dsn(settings.database_url), channel=settings.push_channel)
+    return push.LocalBackend()
+
+
+# Pushes event changes to SSE/WebSocket subscribers
+push_hub = push.PushHub(backend=push_backend(), max_queue=settings.push_queue_size)
+
+
+def publish_description(event: models.Event) -> None:
+    push_hub.publish(push.event_message(push.EVENT_UPDATED, event))
+
+
+# Generates AI descriptions in the background once reports are committed
+description_worker = DescriptionWorker(
+    workers=settings.description_workers,
+    max_queue=settings.description_queue_size,
+    max_attempts=settings.description_max_attempts,
+    resummarize_interval=settings.resummarize_interval_seconds,
+    resummarize_max_reports=settings.resummarize_max_reports,
+    max_prompt_chars=settings.resummarize_max_prompt_chars,
+    on_stored=publish_description
+)
 
 # Initialize the correlation service with default settings
 correlation_service = EventCorrelationService(
-    correlation_threshold=0.6  # Adjust this threshold based on testing
+    correlation_threshold=0.6,  # Adjust this threshold based on testing
+    text_weight=settings.correlation_text_weight,
+    deduplicator=DuplicateIndex(
+        threshold=settings.dedup_threshold,
+        window=timedelta(hours=settings.dedup_window_hours),
+        radius_km=settings.dedup_radius_km
+    ) if settings.dedup_enabled else None,
+    describe=description_worker.submit,
+    mark_dirty=description_worker.mark_dirty,
+    publish=push_hub.publish,
+    advisory_locks=settings.correlation_advisory_locks,
+    share=shared_state.shared_state.publish if settings.state_backend != "memory" else None,
+    sync_regions=settings.state_backend == "postgres"
 )
 
+# Serializes correlation of nearby reports within this process
+correlation_locks = CellLocks(stripes=settings.correlation_lock_stripes)
+
+
+def apply_indexed_event(fields: dict) -> None:
+    correlation_service.index.upsert(
+        fields["event_id"],
+        fields["latitude"],
+        fields["longitude"],
+        datetime.fromisoformat(fields["created_at"]),
+        fields["tags"]
+    )
+
+
+def apply_removed_event(fields: dict) -> None:
+    correlation_service.index.remove(fields["event_id"])
+
+
+def apply_seen_report(fields: dict) -> None:
+    if correlation_service.deduplicator is not None:
+        correlation_service.deduplicator.add(
+            fields["report_id"],
+            fields["event_id"],
+            fields["latitude"],
+            fields["longitude"],
+            datetime.fromisoformat(fields["created_at"]),
+            fields["content"]
+        )
+
+
+def apply_index_reset(fields: dict) -> None:
+    """Events were rewritten wholesale (``python -m app.recluster``); reload them on next use."""
+    correlation_service.index.clear()
+    if correlation_service.deduplicator is not None:
+        correlation_service.deduplicator.clear()
+
+
+# Changes made by other workers; applied to the local copies only, never re-broadcast
+shared_state.shared_state.on(shared_state.EVENT_INDEXED, apply_indexed_event)
+shared_state.shared_state.on(shared_state.EVENT_REMOVED, apply_removed_event)
+shared_state.shared_state.on(shared_state.REPORT_SEEN, apply_seen_report)
+shared_state.shared_state.on(shared_state.INDEX_RESET, apply_index_reset)
+
 
 def get_text_similarity(text1: str, text2: str) -> float:
-    """Calculate text similarity between two descriptions using TF-IDF and cosine similarity."""
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([text1, text2])
-    return cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+    """Calculate text similarity between two descriptions as the cosine of their hashed term vectors."""
+    vectorizer = text_similarity.description_vectors.vectorizer
+    return text_similarity.cosine(vectorizer.transform(text1), vectorizer.transform(text2))
 
 
 def calculate_location_proximity(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -72,6 +161,28 @@ def find_matching_event(db: Session, report: models.Report, similarity_threshold
     return best_match if highest_similarity >= similarity_threshold else None
 
 
-def create_or_update_event(db: Session, report: models.Report) -> models.Event:
-    """Create a new event or update existing one based on the report."""
-    return correlation_service.create_or_update_event(db, report) 
\ No newline at end of file
+async def create_or_update_event(db: AsyncSession, report: models.Report) -> models.Event:
+    """Create a new event or update existing one based on the report.
+
+    Reports close enough to correlate are processed one at a time, so
+    simultaneous reports of one hazard end up in the same event.
+    """
+    location = await db.get(models.Location, report.location_id)
+    async with correlation_locks.hold(correlation_service.lock_cells([location])):
+        return await db.run_sync(correlation_service.create_or_update_event, report)
+
+
+async def refresh_events(db: AsyncSession, event_ids: List[int]) -> None:
+    """Recompute the latest-report columns and index entries of the given events."""
+    await db.run_sync(correlation_service.refresh_events, event_ids)
+
+
+async def correlate_batch(db: AsyncSession, reports: List[models.Report]) -> List[models.Event]:
+    """Cluster a batch of new reports and attach them to new or existing events.
+
+    Report locations must already be loaded into the session.
+    """
+    # Served from the identity map: the locations are already loaded
+    locations = [await db.get(models.Location, location_id) for location_id in {r.location_id for r in reports}]
+    async with correlation_locks.hold(correlation_service.lock_cells(locations)):
+        return await db.run_sync(correlation_service.correlate_batch, reports)
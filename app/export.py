@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models, queries
+from .archive import archive, as_utc
+from .database import SessionLocal
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+REPORT_COLUMNS = [
+    models.Report.id,
+    models.Report.content,
+    models.Report.tags,
+    models.Report.severity,
+    models.Report.location_id,
+    models.Report.user_id,
+    models.Report.created_at
+]
+
+EVENT_COLUMNS = [
+    models.Event.id,
+    models.Event.description,
+    models.Event.tags,
+    models.Event.location_id,
+    models.Event.created_at,
+    models.Event.last_report_at
+]
+
+
+def export_statement(db: Session, model, columns: List, filters: queries.ListFilters):
+    """Plain column select (no ORM objects) over ``model`` with the list filters applied."""
+    stmt = queries.apply_filters(select(*columns), model, filters, db.get_bind().dialect.name)
+    return stmt.order_by(model.id)
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(names: List[str], batch) -> str:
+    return "".join(
+        json.dumps({name: _value(value) for name, value in zip(names, row)}) + "\n"
+        for row in batch
+    )
+
+
+def _csv(names: List[str], batch) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([
+            ";".join(value) if isinstance(value, list) else _value(value)
+            for value in row
+        ])
+    return buffer.getvalue()
+
+
+def ndjson_chunks(result) -> Iterator[str]:
+    """Encode a (streamed) result as NDJSON text chunks, one per partition."""
+    names = list(result.keys())
+    for batch in result.partitions():
+        yield _ndjson(names, batch)
+
+
+def _location_ids_in_bbox(bbox) -> set:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    db = SessionLocal()
+    try:
+        return set(db.scalars(
+            select(models.Location.id)
+            .where(models.Location.latitude.between(min_lat, max_lat))
+            .where(models.Location.longitude.between(min_lon, max_lon))
+        ))
+    finally:
+        db.close()
+
+
+def archived_reports(filters: queries.ListFilters) -> Iterator[tuple]:
+    """Archived report rows (``REPORT_COLUMNS`` order) matching the list filters."""
+    names = [column.name for column in REPORT_COLUMNS]
+    since = as_utc(filters.since) if filters.since is not None else None
+    until = as_utc(filters.until) if filters.until is not None else None
+    tags = set(filters.tags) if filters.tags else None
+    locations = _location_ids_in_bbox(filters.bbox) if filters.bbox is not None else None
+    for row in archive.read("reports", since, until):
+        created_at = as_utc(datetime.fromisoformat(row["created_at"]))
+        if (since is not None and created_at < since) or (until is not None and created_at >= until):
+            continue
+        if filters.location_id is not None and row["location_id"] != filters.location_id:
+            continue
+        if tags is not None and not tags.intersection(row["tags"] or []):
+            continue
+        if locations is not None and row["location_id"] not in locations:
+            continue
+        yield tuple(row[name] for name in names)
+
+
+def stream_rows(model, columns: List, filters: queries.ListFilters, fmt: str,
+                archived: Optional[Iterable[tuple]] = None) -> Iterator[str]:
+    """Stream ``export_statement`` as NDJSON or CSV text chunks.
+
+    Runs on its own session with a server-side cursor, so only one batch of
+    rows is held in memory at a time. Starlette iterates sync generators in
+    the threadpool, so this works in either database mode. ``archived`` rows
+    (same columns) are streamed first; they are older than the live ones.
+    """
+    db = SessionLocal()
+    try:
+        stmt = export_statement(db, model, columns, filters)
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+        names = list(result.keys())
+        encode = _csv if fmt == "csv" else _ndjson
+        if fmt == "csv":
+            yield _csv(names, [names])
+        if archived is not None:
+            archived = iter(archived)
+            while True:
+                batch = list(islice(archived, EXPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                yield encode(names, batch)
+        for batch in result.partitions():
+            yield encode(names, batch)
+    finally:
+        db.close()
@@ -0,0 +1,91 @@
+import math
+from typing import List, Optional, Set
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9
+MAX_COVER_CELLS = 32
+
+
+def encode(latitude: float, longitude: float, precision: int = PRECISION) -> str:
+    """Encode a coordinate as a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple:
+    """Return the (lat, lon) size in degrees of a cell at ``precision``."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cover(latitude: float, longitude: float, radius_km: float,
+          max_cells: int = MAX_COVER_CELLS) -> List[str]:
+    """Return geohash prefixes whose cells together cover the circle's bounding box.
+
+    Uses the finest precision that needs at most ``max_cells`` prefixes.
+    """
+    dlat = radius_km / 111.32
+    dlon = radius_km / (111.32 * max(math.cos(math.radians(latitude)), 1e-6))
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    west, east = longitude - dlon, longitude + dlon
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+
+    for precision in range(PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(north / lat_step) - math.floor(south / lat_step) + 1
+        cols = math.floor(east / lon_step) - math.floor(west / lon_step) + 1
+        if rows * cols > max_cells and precision > 1:
+            continue
+        cells: Set[str] = set()
+        for row in range(rows):
+            lat = min(south + row * lat_step, north)
+            for col in range(cols):
+                lon = min(west + col * lon_step, east)
+                cells.add(encode(lat, _wrap(lon), precision))
+            cells.add(encode(lat, _wrap(east), precision))
+        for col in range(cols):
+            cells.add(encode(north, _wrap(min(west + col * lon_step, east)), precision))
+        cells.add(encode(north, _wrap(east), precision))
+        return sorted(cells)
+    return [""]
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest geohash of the same length sorting after every hash that starts with ``prefix``.
+
+    ``None`` when no such bound exists (the prefix is all ``z``).
+    """
+    chars = list(prefix)
+    while chars:
+        position = BASE32.index(chars[-1])
+        if position + 1 < len(BASE32):
+            chars[-1] = BASE32[position + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def _wrap(longitude: float) -> float:
+    return (longitude + 180.0) % 360.0 - 180.0
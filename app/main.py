@@ -1,20 +1,88 @@
-from typing import Annotated, List
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Annotated, List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
-from . import models, schemas, auth, event_correlation, ai
-from .database import engine, get_db, drop_tables
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from datetime import timedelta, datetime, timezone
+from . import models, schemas, auth, event_correlation, ai, queries, export, text_similarity, rollups, alerts
+from . import retention, shared_state
+from .database import get_session, drop_tables, migrate, dispose_engines, SessionLocal
 from .config import get_settings
 from fastapi.middleware.cors import CORSMiddleware
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Hazard Reporting System")
+def warm_correlation_index():
+    db = SessionLocal()
+    try:
+        service = event_correlation.correlation_service
+        service.rebuild_index(db)
+        db.commit()
+        if service.correlator.uses_text:
+            # Computes the description vectors of every active event up front
+            text_similarity.description_vectors.rows(db, [row[0] for row in service.fetch_candidates(db)])
+    finally:
+        db.close()
+
+
+def backfill_location_geohashes():
+    db = SessionLocal()
+    try:
+        if queries.backfill_geohashes(db):
+            db.commit()
+    finally:
+        db.close()
+
+
+def ensure_report_partitions():
+    db = SessionLocal()
+    try:
+        retention.ensure_partitions(db)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the per-worker services. Nothing here runs at import.
+
+    Runs in each worker process. The schema comes from the Alembic revisions
+    (``alembic upgrade head``), applied once before the workers start; set
+    ``database_auto_migrate`` to apply them here instead on single-worker setups.
+    The database engines and the AI client are created on first use.
+    """
+    if settings.database_auto_migrate:
+        await run_in_threadpool(migrate)
+    await run_in_threadpool(ensure_report_partitions)
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    if workers > 1 and settings.state_backend == "memory":
+        logger.warning("Running %s workers with state_backend=memory: correlation state is not shared", workers)
+    # Shared state starts first so changes other workers make while this one warms up are not missed
+    await shared_state.shared_state.start()
+    try:
+        await run_in_threadpool(warm_correlation_index)
+        await run_in_threadpool(backfill_location_geohashes)
+        await event_correlation.description_worker.start()
+        await event_correlation.push_hub.start()
+        yield
+    finally:
+        await event_correlation.push_hub.stop()
+        await event_correlation.description_worker.stop()
+        await shared_state.shared_state.stop()
+        await run_in_threadpool(ai.backend.close)
+        await dispose_engines()
+
+
+app = FastAPI(title="Hazard Reporting System", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,28 +93,50 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+
 @app.get("/health")
-async def health_check():
+async def health_check(db: AsyncSession = Depends(get_session)):
+    try:
+        await db.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception:
+        database = "disconnected"
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "database": "connected" if engine.connect() else "disconnected"
+        "database": database
     }
 
+@app.get("/metrics")
+async def metrics():
+    deduplicator = event_correlation.correlation_service.deduplicator
+    return {
+        "description_queue": event_correlation.description_worker.metrics(),
+        "description_cache": ai.description_cache.metrics(),
+        "password_hashing": auth.password_hasher.metrics(),
+        "user_cache": auth.user_cache.metrics(),
+        "text_vectors": text_similarity.description_vectors.metrics(),
+        "dedup": deduplicator.metrics() if deduplicator is not None else None,
+        "push": event_correlation.push_hub.metrics(),
+        "correlation_locks": event_correlation.correlation_locks.metrics(),
+        "shared_state": shared_state.shared_state.metrics()
+    }
+
+
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = auth.get_user(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_session)):
+    db_user = await auth.get_user(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return auth.create_user(db=db, user=user)
+    return await auth.create_user(db=db, user=user)
 
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,106 +144,421 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token = auth.create_access_token(
-        data={"sub": user.email},
-        expires_delta=timedelta(minutes=30)
+        data=auth.token_claims(user),
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @app.get("/users/me/", response_model=schemas.User)
 async def read_users_me(
-    current_user: Annotated[models.User, Depends(auth.get_current_active_user)]
+    current_user: Annotated[auth.CurrentUser, Depends(auth.get_current_active_user)],
+    db: AsyncSession = Depends(get_session)
 ):
+    # Users authenticated from token claims carry no profile fields
+    if current_user.name is None:
+        return await db.get(models.User, current_user.id)
     return current_user
 
 
 @app.post("/locations/", response_model=schemas.Location)
 async def create_location(
     location: schemas.LocationCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
     print("Creating location")
     db_location = models.Location(**location.model_dump())
     db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
+    await db.commit()
+    await db.refresh(db_location)
     return db_location
 
 
 @app.get("/locations/", response_model=List[schemas.Location])
 async def list_locations(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    return db.query(models.Location).all()
+    now = datetime.now(timezone.utc)
+    locations = []
+    for location in (await db.scalars(select(models.Location))).all():
+        score, level = alerts.current_score(location.alert_score, location.alert_updated_at, now)
+        locations.append(schemas.Location(
+            id=location.id, name=location.name, latitude=location.latitude, longitude=location.longitude,
+            alert_level=level, alert_score=score
+        ))
+    return locations
+
+
+@app.get("/locations/alerts", response_model=List[schemas.LocationAlert])
+async def location_alerts(
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Current alert level of every location, decayed from the stored scores."""
+    now = datetime.now(timezone.utc)
+    alert_levels = []
+    for location_id, stored_score, updated_at in await db.execute(alerts.alert_levels()):
+        score, level = alerts.current_score(stored_score, updated_at, now)
+        alert_levels.append(schemas.LocationAlert(location_id=location_id, alert_level=level, alert_score=score))
+    return alert_levels
 
 
 @app.post("/reports/", response_model=schemas.Report)
 async def create_report(
     report: schemas.ReportCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
     db_report = models.Report(
         **report.model_dump(),
         user_id=current_user.id
     )
     db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
+    await db.commit()
+    await db.refresh(db_report)
 
-    event_correlation.create_or_update_event(db, db_report)
+    await event_correlation.create_or_update_event(db, db_report)
     
     return db_report
 
 
+@app.post("/reports/bulk", response_model=List[schemas.Report])
+async def create_reports_bulk(
+    reports: List[schemas.ReportCreate],
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    if len(reports) > settings.bulk_reports_max:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_reports_max} reports per request")
+    if not reports:
+        return []
+
+    # Loading the locations up front also lets correlation resolve report.location without queries
+    location_ids = {report.location_id for report in reports}
+    locations = (await db.scalars(select(models.Location).where(models.Location.id.in_(location_ids)))).all()
+    missing = location_ids - {location.id for location in locations}
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Unknown location ids: {sorted(missing)}")
+
+    # One multi-row INSERT ... RETURNING. Ids follow the VALUES order; sort_by_parameter_order
+    # would guarantee that too but makes SQLite fall back to one statement per row.
+    db_reports = sorted((await db.scalars(
+        insert(models.Report).returning(models.Report),
+        [dict(report.model_dump(), user_id=current_user.id) for report in reports]
+    )).all(), key=lambda report: report.id)
+    # Bulk inserts skip the ORM flush hooks, so count them explicitly before committing
+    await db.run_sync(rollups.count_reports, db_reports)
+    await db.run_sync(alerts.score_reports, db_reports)
+    await event_correlation.correlate_batch(db, db_reports)
+    return db_reports
+
+
+def list_filters(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    location_id: Optional[int] = None,
+    tags: Optional[List[str]] = Query(None),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat")
+) -> queries.ListFilters:
+    try:
+        box = queries.parse_bbox(bbox) if bbox else None
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return queries.ListFilters(since=since, until=until, location_id=location_id, tags=tags, bbox=box)
+
+
+async def fetch_page(db: AsyncSession, stmt, model, filters: queries.ListFilters,
+                     cursor: Optional[str], limit: int, response: Response) -> list:
+    stmt = queries.apply_filters(stmt, model, filters, db.get_bind().dialect.name)
+    try:
+        stmt = queries.paginate(stmt, model, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = list((await db.scalars(stmt)).all())
+    next_cursor = queries.next_cursor(rows, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
 @app.get("/reports/", response_model=List[schemas.Report])
 async def list_reports(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    filters: queries.ListFilters = Depends(list_filters),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    return db.query(models.Report).all()
+    return await fetch_page(db, select(models.Report), models.Report, filters, cursor, limit, response)
+
+
+async def serialize_events(db: AsyncSession, events: List[models.Event],
+                           mode: schemas.ReportsMode, reports_limit: int) -> List[schemas.Event]:
+    """Build event responses with their reports fetched in a single extra query."""
+    embedded = {event.id: [] for event in events}
+    counts = {}
+    if mode != schemas.ReportsMode.none and events:
+        stmt = queries.embedded_reports(list(embedded), reports_limit, full=mode == schemas.ReportsMode.full)
+        for row in (await db.execute(stmt)).mappings():
+            counts[row["event_id"]] = row["total"]
+            if mode == schemas.ReportsMode.full:
+                embedded[row["event_id"]].append(schemas.ReportSimple.model_validate(row))
+            else:
+                embedded[row["event_id"]].append(row["id"])
+
+    return [
+        schemas.Event(
+            **schemas.EventSimple.model_validate(event).model_dump(),
+            created_at=event.created_at,
+            reports=embedded[event.id] if mode == schemas.ReportsMode.full else None,
+            report_ids=embedded[event.id] if mode == schemas.ReportsMode.ids else None,
+            report_count=counts.get(event.id, 0) if mode != schemas.ReportsMode.none else None
+        )
+        for event in events
+    ]
 
 
-@app.get("/events/", response_model=List[schemas.Event])
+@app.get("/events/", response_model=List[schemas.Event], response_model_exclude_none=True)
 async def list_events(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    reports: schemas.ReportsMode = schemas.ReportsMode.full,
+    reports_limit: int = Query(50, ge=1, le=queries.MAX_PAGE_SIZE),
+    filters: queries.ListFilters = Depends(list_filters),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    events = await fetch_page(db, select(models.Event), models.Event, filters, cursor, limit, response)
+    return await serialize_events(db, events, reports, reports_limit)
+
+
+@app.get("/events/nearby", response_model=List[schemas.NearbyEvent], response_model_exclude_none=True)
+async def get_nearby_events(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=500),
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    reports: schemas.ReportsMode = schemas.ReportsMode.none,
+    reports_limit: int = Query(50, ge=1, le=queries.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    rows = (await db.execute(queries.nearby_events(lat, lon, radius_km, since))).all()
+    matches = queries.refine_by_distance(rows, lat, lon, radius_km, limit)
+    events = await serialize_events(db, [event for event, _ in matches], reports, reports_limit)
+    return [
+        schemas.NearbyEvent(**event.model_dump(), distance_km=round(distance, 3))
+        for event, (_, distance) in zip(events, matches)
+    ]
+
+
+def parse_push_filters(tags: Optional[List[str]], bbox: Optional[str]) -> dict:
+    """Subscription filters from the query parameters; raises ValueError on a malformed bbox."""
+    return {"bbox": queries.parse_bbox(bbox) if bbox else None, "tags": tags}
+
+
+def push_filters(
+    tags: Optional[List[str]] = Query(None),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat")
+) -> dict:
+    try:
+        return parse_push_filters(tags, bbox)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.get("/events/stream")
+async def stream_events(
+    filters: dict = Depends(push_filters),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    return db.query(models.Event).all()
+    """Server-sent events: event.created, report.added and event.updated deltas.
+
+    A ``resync`` event means messages were dropped because the client fell
+    behind; refetch ``GET /events/`` before applying further deltas.
+    """
+    subscription = event_correlation.push_hub.subscribe(**filters)
 
+    async def messages():
+        try:
+            while True:
+                message = await subscription.get(timeout=settings.push_heartbeat_seconds)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {message.kind}\ndata: {message.data}\n\n"
+        finally:
+            event_correlation.push_hub.unsubscribe(subscription)
 
-@app.get("/events/{event_id}", response_model=schemas.Event)
+    return StreamingResponse(messages(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def websocket_user(token: str) -> Optional[auth.CurrentUser]:
+    """Authenticate a WebSocket from its ``token`` query parameter (browsers cannot set headers)."""
+    sessions = get_session()
+    db = await sessions.__anext__()
+    try:
+        return await auth.get_current_active_user(await auth.get_current_user(token, db))
+    except HTTPException:
+        return None
+    finally:
+        await sessions.aclose()
+
+
+@app.websocket("/events/ws")
+async def events_websocket(
+    websocket: WebSocket,
+    token: str,
+    tags: Optional[List[str]] = Query(None),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat")
+):
+    """WebSocket variant of ``/events/stream``: one JSON text frame per message.
+
+    A bad token or malformed filters close the socket with code 1008.
+    """
+    # HTTPException is no response on a WebSocket, so filters are checked here
+    try:
+        filters = parse_push_filters(tags, bbox)
+    except ValueError:
+        filters = None
+    if filters is None or await websocket_user(token) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    subscription = event_correlation.push_hub.subscribe(**filters)
+
+    async def send():
+        while True:
+            message = await subscription.get()
+            await websocket.send_text(message.data)
+
+    sender = asyncio.create_task(send())
+    try:
+        # Incoming frames are ignored; reading is how a disconnect is noticed
+        while not sender.done():
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        event_correlation.push_hub.unsubscribe(subscription)
+
+
+@app.get("/events/{event_id}", response_model=schemas.Event, response_model_exclude_none=True)
 async def get_event(
     event_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    reports: schemas.ReportsMode = schemas.ReportsMode.full,
+    reports_limit: int = Query(50, ge=1, le=queries.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    event = await db.get(models.Event, event_id)
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return event
+    return (await serialize_events(db, [event], reports, reports_limit))[0]
+
+def export_response(name: str, model, columns, filters: queries.ListFilters, fmt: schemas.ExportFormat,
+                    archived=None) -> StreamingResponse:
+    return StreamingResponse(
+        export.stream_rows(model, columns, filters, fmt.value, archived),
+        media_type=export.MEDIA_TYPES[fmt.value],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'}
+    )
+
+
+@app.get("/export/reports")
+def export_reports(
+    format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+    archived: bool = False,
+    filters: queries.ListFilters = Depends(list_filters),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    """Stream reports; with ``archived``, include those the retention job moved to the archive."""
+    return export_response("reports", models.Report, export.REPORT_COLUMNS, filters, format,
+                           export.archived_reports(filters) if archived else None)
+
+
+@app.get("/export/events")
+def export_events(
+    format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+    filters: queries.ListFilters = Depends(list_filters),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    return export_response("events", models.Event, export.EVENT_COLUMNS, filters, format)
+
 
 @app.delete("/reports/{report_id}", response_model=schemas.Report)
-async def delete_report(report_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_user)):
-    report = db.query(models.Report).filter(models.Report.id == report_id).first()
+async def delete_report(report_id: int, db: AsyncSession = Depends(get_session), current_user: auth.CurrentUser = Depends(auth.get_current_active_user)):
+    report = await db.get(models.Report, report_id)
     if report is None:
         raise HTTPException(status_code=404, detail="Report not found")
-    db.delete(report)
-    db.commit()
+    event_ids = (await db.scalars(
+        select(models.event_reports.c.event_id).where(
+            models.event_reports.c.report_id == report_id,
+            models.event_reports.c.report_created_at == report.created_at
+        )
+    )).all()
+    await db.delete(report)
+    await db.commit()
+    await event_correlation.refresh_events(db, list(event_ids))
+    return report
 
 
-@app.get("/reload")
-async def update_reload(
-        db: Session = Depends(get_db),
+@app.get("/stats/locations", response_model=List[schemas.LocationStat])
+async def stats_locations(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    drop_tables()
+    return (await db.execute(rollups.location_counts(since, until, limit=limit))).mappings().all()
 
-"""@app.get("/events/location/", response_model=List[schemas.Event])
-async def get_nearby_events(
-    db: Session = Depends(get_db),
-        current_user: models.User = Depends(auth.get_current_active_user
+
+@app.get("/stats/tags", response_model=List[schemas.TagStat])
+async def stats_tags(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    location_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
 ):
-    current_location = current_user.location
-    """
\ No newline at end of file
+    return (await db.execute(rollups.tag_counts(since, until, location_id, limit))).mappings().all()
+
+
+@app.get("/stats/severity", response_model=List[schemas.SeverityStat])
+async def stats_severity(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    location_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    return (await db.execute(rollups.severity_counts(since, until, location_id, tag))).mappings().all()
+
+
+@app.get("/stats/hourly", response_model=List[schemas.HourStat])
+async def stats_hourly(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    location_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+    current_user: auth.CurrentUser = Depends(auth.get_current_active_user)
+):
+    return (await db.execute(rollups.hourly_counts(since, until, location_id, tag))).mappings().all()
+
+
+@app.get("/reload")
+async def update_reload():
+    await run_in_threadpool(drop_tables)
+    event_correlation.correlation_service.index.clear()
+    if event_correlation.correlation_service.deduplicator is not None:
+        event_correlation.correlation_service.deduplicator.clear()
@@ -1,15 +1,27 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Table, ARRAY, DateTime, Text
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Table, ARRAY, JSON, DateTime, Text, Index
+from sqlalchemy import and_, event
+from sqlalchemy.orm import foreign, relationship
 from sqlalchemy.sql import func
+from . import geohash
 from .database import Base
 
+# Postgres stores tags as a native array; SQLite (local runs) falls back to JSON
+TagList = ARRAY(String).with_variant(JSON(), "sqlite")
+
 
-# Association table for Event-Report many-to-many relationship
+# Association table for Event-Report many-to-many relationship. The primary
+# key serves event -> reports; the reverse index serves report -> events.
+# report_created_at copies the report's created_at (the relationships below
+# fill it in), so both tables can be partitioned on the same month.
 event_reports = Table(
     'event_reports',
     Base.metadata,
-    Column('event_id', Integer, ForeignKey('events.id')),
-    Column('report_id', Integer, ForeignKey('reports.id'))
+    Column('event_id', Integer, ForeignKey('events.id'), primary_key=True),
+    Column('report_id', Integer, ForeignKey('reports.id'), primary_key=True),
+    Column('report_created_at', DateTime(timezone=True), nullable=False),
+    Index("ix_event_reports_report_id_event_id", "report_id", "event_id")
 )
 
 
@@ -35,28 +47,84 @@ class Location(Base):
     name = Column(String, index=True)
     latitude = Column(Float)
     longitude = Column(Float)
+    # Decayed severity-weighted score of nearby reports as of alert_updated_at
+    # (see app.alerts); alert_level is its level at that moment
     alert_level = Column(Integer, default=0)
+    alert_score = Column(Float, default=0.0, server_default="0")
+    alert_updated_at = Column(DateTime(timezone=True))
+    # Maintained from latitude/longitude; prefix scans serve radius queries
+    geohash = Column(String(geohash.PRECISION))
+
+    __table_args__ = (
+        # Bounding-box filters on the list endpoints
+        Index("ix_locations_lat_lon", "latitude", "longitude"),
+        Index("ix_locations_geohash", "geohash"),
+    )
 
     # Relationships
     reports = relationship("Report", back_populates="location")
     events = relationship("Event", back_populates="location")
 
 
+@event.listens_for(Location, "before_insert")
+@event.listens_for(Location, "before_update")
+def set_location_geohash(mapper, connection, target):
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = geohash.encode(target.latitude, target.longitude)
+
+
 class Report(Base):
+    """A single hazard report.
+
+    On Postgres, ``reports`` and ``event_reports`` are partitioned by
+    ``created_at`` month (migration 0004, partitions managed by
+    ``app.retention``). Their primary keys and the link's foreign key then
+    include ``created_at``, as partitioning requires; the ORM still
+    identifies reports by ``id``.
+    """
     __tablename__ = "reports"
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(String)
-    tags = Column(ARRAY(String))
+    tags = Column(TagList)
     severity = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side so links copy exactly the stored value (SQLite compares the text)
+    created_at = Column(DateTime(timezone=True), nullable=False,
+                        default=lambda: datetime.now(timezone.utc), server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"))
     location_id = Column(Integer, ForeignKey("locations.id"))
 
+    __table_args__ = (
+        # Keyset pagination, time-range and per-location filters, tag overlap
+        Index("ix_reports_created_at_id", "created_at", "id"),
+        Index("ix_reports_location_created_at", "location_id", "created_at"),
+        Index("ix_reports_tags", "tags", postgresql_using="gin"),
+    )
+    # Return created_at from the INSERT so flush hooks (rollups) can read it
+    __mapper_args__ = {"eager_defaults": True}
+
     # Relationships
     user = relationship("User", back_populates="reports")
     location = relationship("Location", back_populates="reports")
-    events = relationship("Event", secondary=event_reports, back_populates="reports")
+    events = relationship(
+        "Event",
+        secondary=event_reports,
+        primaryjoin=lambda: report_link(),
+        secondaryjoin=lambda: Event.id == foreign(event_reports.c.event_id),
+        back_populates="reports"
+    )
+
+
+def report_link():
+    """Join from ``event_reports`` to ``reports``.
+
+    Matching on ``created_at`` too lets Postgres prune both partitioned
+    tables, and makes the ORM copy it into new links.
+    """
+    return and_(
+        Report.id == foreign(event_reports.c.report_id),
+        Report.created_at == foreign(event_reports.c.report_created_at)
+    )
 
 
 class Event(Base):
@@ -64,10 +132,67 @@ class Event(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     description = Column(Text)
-    tags = Column(ARRAY(String))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    tags = Column(TagList)
+    # Set client-side like Report.created_at: SQLite compares the stored text when paginating
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        server_default=func.now())
     location_id = Column(Integer, ForeignKey("locations.id"))
 
+    # Denormalized copy of the latest report so correlation can skip the join
+    last_report_at = Column(DateTime(timezone=True))
+    last_lat = Column(Float)
+    last_lon = Column(Float)
+    last_tags = Column(TagList)
+
+    # Near-duplicate reports attached without a correlation pass
+    corroboration_count = Column(Integer, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_events_created_at_id", "created_at", "id"),
+        Index("ix_events_location_created_at", "location_id", "created_at"),
+        Index("ix_events_tags", "tags", postgresql_using="gin"),
+        # Active-event window; covers the candidate columns for index-only scans (Postgres)
+        Index("ix_events_last_report_at", "last_report_at",
+              postgresql_include=["id", "last_lat", "last_lon", "last_tags"]),
+    )
+
     # Relationships
     location = relationship("Location", back_populates="events")
-    reports = relationship("Report", secondary=event_reports, back_populates="events") 
\ No newline at end of file
+    reports = relationship(
+        "Report",
+        secondary=event_reports,
+        primaryjoin=lambda: Event.id == foreign(event_reports.c.event_id),
+        secondaryjoin=lambda: report_link(),
+        back_populates="events"
+    )
+
+
+class ReportRollup(Base):
+    """Report counts per location, hour, tag and severity, maintained incrementally.
+
+    Each report adds one to the row of every one of its tags, plus one to the
+    row with ``tag == ALL_TAGS`` so report totals are not inflated by tags.
+    """
+    __tablename__ = "report_rollups"
+
+    ALL_TAGS = ""
+
+    location_id = Column(Integer, primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    tag = Column(String, primary_key=True)
+    severity = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_report_rollups_hour", "hour"),
+        Index("ix_report_rollups_tag_hour", "tag", "hour"),
+    )
+
+
+class AICacheEntry(Base):
+    __tablename__ = "ai_cache"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String)
+    response = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
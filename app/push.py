@@ -0,0 +1,335 @@
+"""Push channel for event changes (SSE and WebSocket subscribers).
+
+The correlation service publishes one ``PushMessage`` per change. The hub
+hands it to its backend, which delivers it back to every hub that shares
+the backend. ``LocalBackend`` is for a single worker. ``PostgresBackend``
+fans out across workers over LISTEN/NOTIFY. Each subscriber has a bounded
+queue. When a slow client lets its queue fill up, the queued messages are
+replaced by a single ``resync`` message, and the client is expected to
+refetch ``GET /events/``. Messages too large for a NOTIFY payload carry
+``"truncated": true``; clients fetch ``GET /events/{id}`` for the rest.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+EVENT_CREATED = "event.created"
+EVENT_UPDATED = "event.updated"
+REPORT_ADDED = "report.added"
+RESYNC = "resync"
+
+# Longer descriptions/contents are cut; clients fetch the full event when they need it
+MAX_TEXT_CHARS = 1000
+# NOTIFY payloads must be shorter than 8000 bytes. Messages that do not fit are
+# rebuilt with shorter texts, then without texts and with as many tags as fit,
+# marked ``"truncated": true``
+MAX_PAYLOAD_BYTES = 7999
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _text(value: Optional[str], limit: int) -> Optional[str]:
+    return value[:limit] if value is not None and limit else None
+
+
+def _encode(payload: dict) -> str:
+    # Non-ASCII text as UTF-8 (up to 4 bytes a character) rather than 6-byte \uXXXX escapes
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _fits(data: str) -> bool:
+    return len(data.encode("utf-8")) <= MAX_PAYLOAD_BYTES
+
+
+class PushMessage:
+    """A JSON-encoded change plus the fields subscribers filter on.
+
+    The payload is encoded once, when the message is published, and not
+    again for each subscriber.
+    """
+    __slots__ = ("kind", "latitude", "longitude", "tags", "data")
+
+    def __init__(self, kind: str, latitude: Optional[float], longitude: Optional[float],
+                 tags: Iterable[str], data: str):
+        self.kind = kind
+        self.latitude = latitude
+        self.longitude = longitude
+        self.tags = frozenset(tags)
+        self.data = data
+
+    @classmethod
+    def from_json(cls, data: str) -> "PushMessage":
+        payload = json.loads(data)
+        event = payload.get("event") or {}
+        return cls(payload["type"], event.get("latitude"), event.get("longitude"), event.get("tags") or [], data)
+
+
+def _payload(kind: str, event: models.Event, report: Optional[models.Report], text_chars: int,
+             tags: Optional[List[str]] = None) -> dict:
+    payload = {
+        "type": kind,
+        "event": {
+            "id": event.id,
+            "description": _text(event.description, text_chars),
+            "tags": list(event.tags or []) if tags is None else tags,
+            "location_id": event.location_id,
+            "latitude": event.last_lat,
+            "longitude": event.last_lon,
+            "created_at": _isoformat(event.created_at),
+            "last_report_at": _isoformat(event.last_report_at),
+            "corroboration_count": event.corroboration_count or 0
+        }
+    }
+    if report is not None:
+        payload["report"] = {
+            "id": report.id,
+            "content": _text(report.content, text_chars),
+            "tags": list(report.tags or []) if tags is None else [],
+            "severity": report.severity,
+            "location_id": report.location_id,
+            "created_at": _isoformat(report.created_at)
+        }
+    return payload
+
+
+def event_message(kind: str, event: models.Event, report: Optional[models.Report] = None) -> PushMessage:
+    """Message for a change to ``event``. Its position is that of its latest report.
+
+    The encoded message always fits in a NOTIFY payload (``MAX_PAYLOAD_BYTES``).
+    """
+    tags = event.tags or []
+    for text_chars in (MAX_TEXT_CHARS, MAX_TEXT_CHARS // 10):
+        data = _encode(_payload(kind, event, report, text_chars))
+        if _fits(data):
+            return PushMessage(kind, event.last_lat, event.last_lon, tags, data)
+
+    # Only the tags are left: keep as many as fit, and let clients refetch the event
+    kept: List[str] = []
+    data = _encode(dict(_payload(kind, event, report, 0, kept), truncated=True))
+    budget = MAX_PAYLOAD_BYTES - len(data.encode("utf-8"))
+    for tag in tags:
+        size = len(_encode(tag).encode("utf-8")) + 2  # plus the ", " separator
+        if size > budget:
+            break
+        kept.append(tag)
+        budget -= size
+    data = _encode(dict(_payload(kind, event, report, 0, kept), truncated=True))
+    return PushMessage(kind, event.last_lat, event.last_lon, tags, data)
+
+
+RESYNC_MESSAGE = PushMessage(RESYNC, None, None, (), json.dumps({"type": RESYNC}))
+
+
+class Subscription:
+    """One connected client: its filters and a bounded queue of pending messages."""
+
+    def __init__(self, bbox: Optional[Tuple[float, float, float, float]] = None,
+                 tags: Optional[Iterable[str]] = None, max_queue: int = 100):
+        self.bbox = bbox
+        self.tags: Optional[Set[str]] = set(tags) if tags else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def matches(self, message: PushMessage) -> bool:
+        if self.tags is not None and not self.tags & message.tags:
+            return False
+        if self.bbox is not None:
+            if message.latitude is None or message.longitude is None:
+                return False
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            if not (min_lat <= message.latitude <= max_lat and min_lon <= message.longitude <= max_lon):
+                return False
+        return True
+
+    def offer(self, message: PushMessage) -> bool:
+        """Queue a message without waiting. Returns False if the client had fallen behind."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.dropped += 1
+        self.queue.put_nowait(RESYNC_MESSAGE)
+        return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[PushMessage]:
+        """Next message, or None once ``timeout`` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBackend:
+    """Delivers messages straight back to this process's hub."""
+
+    name = "local"
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[PushMessage], None]] = None
+
+    async def start(self, deliver: Callable[[PushMessage], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    def send(self, message: PushMessage) -> None:
+        if self._deliver is not None:
+            self._deliver(message)
+
+
+class PostgresBackend:
+    """Fans messages out to every worker through Postgres LISTEN/NOTIFY.
+
+    Messages sent by this process are delivered when they come back on
+    the channel, so each worker sees every message once, in NOTIFY order.
+    Messages are anything with ``kind`` and a JSON ``data`` string;
+    ``decode`` rebuilds them from received payloads.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, channel: str = "hazard_events", max_outbox: int = 1000,
+                 decode: Callable[[str], object] = PushMessage.from_json):
+        self.dsn = dsn
+        self.channel = channel
+        self.max_outbox = max_outbox
+        self.decode = decode
+        self.stats = {"notified": 0, "received": 0, "dropped": 0}
+        self._deliver: Optional[Callable[[object], None]] = None
+        self._listener = None
+        self._sender = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[object], None]) -> None:
+        import asyncpg
+
+        self._deliver = deliver
+        self._outbox = asyncio.Queue(maxsize=self.max_outbox)
+        self._listener = await asyncpg.connect(self.dsn)
+        self._sender = await asyncpg.connect(self.dsn)
+        await self._listener.add_listener(self.channel, self._on_notify)
+        self._task = asyncio.create_task(self._send_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for connection in (self._listener, self._sender):
+            if connection is not None:
+                await connection.close()
+        self._listener = self._sender = None
+        self._deliver = None
+
+    def send(self, message) -> None:
+        try:
+            self._outbox.put_nowait(message.data)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Push outbox full, dropping %s message", message.kind)
+
+    async def _send_loop(self) -> None:
+        # One sender keeps NOTIFYs in publish order on a single connection
+        while True:
+            data = await self._outbox.get()
+            try:
+                await self._sender.execute("SELECT pg_notify($1, $2)", self.channel, data)
+                self.stats["notified"] += 1
+            except Exception:
+                self.stats["dropped"] += 1
+                logger.exception("Failed to publish message on %s", self.channel)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.stats["received"] += 1
+        if self._deliver is not None:
+            self._deliver(self.decode(payload))
+
+
+class PushHub:
+    """Routes published messages to the matching subscribers of this process.
+
+    ``publish`` may be called from any thread. Subscribers are served on the
+    event loop that started the hub.
+    """
+
+    def __init__(self, backend=None, max_queue: int = 100):
+        self.backend = backend or LocalBackend()
+        self.max_queue = max_queue
+        self.stats = {"published": 0, "delivered": 0, "resyncs": 0}
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.backend.start(self._dispatch)
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+        await self.backend.stop()
+        self._subscribers.clear()
+
+    def subscribe(self, bbox: Optional[Tuple[float, float, float, float]] = None,
+                  tags: Optional[List[str]] = None) -> Subscription:
+        subscription = Subscription(bbox, tags, self.max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, message: PushMessage) -> bool:
+        """Send a message to subscribers here and, through the backend, in other workers.
+
+        Returns False if the hub is not running, in which case the message is dropped.
+        """
+        loop = self._loop
+        if loop is None:
+            return False
+        self.stats["published"] += 1
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.backend.send(message)
+        else:
+            loop.call_soon_threadsafe(self.backend.send, message)
+        return True
+
+    def _dispatch(self, message: PushMessage) -> None:
+        for subscription in list(self._subscribers):
+            if subscription.matches(message):
+                if subscription.offer(message):
+                    self.stats["delivered"] += 1
+                else:
+                    self.stats["resyncs"] += 1
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "backend": self.backend.name,
+            "subscribers": len(self._subscribers),
+            "queue_capacity": self.max_queue,
+            **self.stats,
+            **getattr(self.backend, "stats", {})
+        }
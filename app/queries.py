@@ -0,0 +1,306 @@
+import base64
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import ARRAY, String, and_, cast, exists, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session
+from . import geohash, models
+from .spatial_index import haversine_km
+
+# (event_id, latitude, longitude, created_at, tags)
+CandidateRow = Tuple[int, float, float, datetime, List[str]]
+
+
+def latest_report_rows(db: Session, since: Optional[datetime] = None,
+                       event_ids: Optional[Iterable[int]] = None) -> List[CandidateRow]:
+    """Fetch the latest report of each event in a single statement.
+
+    Postgres uses ``DISTINCT ON (event_id)``; other backends rank reports with
+    ``ROW_NUMBER()`` and keep the first row per event.
+    """
+    event_reports = models.event_reports
+    columns = [
+        event_reports.c.event_id,
+        models.Location.latitude,
+        models.Location.longitude,
+        models.Report.created_at,
+        models.Report.tags
+    ]
+    newest_first = (models.Report.created_at.desc(), models.Report.id.desc())
+
+    def restrict(stmt):
+        stmt = (
+            stmt.select_from(models.Report)
+            .join(event_reports, models.report_link())
+            .join(models.Location, models.Location.id == models.Report.location_id)
+        )
+        if since is not None:
+            stmt = stmt.where(models.Report.created_at >= since, event_reports.c.report_created_at >= since)
+        if event_ids is not None:
+            stmt = stmt.where(event_reports.c.event_id.in_(list(event_ids)))
+        return stmt
+
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = (
+            restrict(select(*columns))
+            .distinct(event_reports.c.event_id)
+            .order_by(event_reports.c.event_id, *newest_first)
+        )
+    else:
+        rank = func.row_number().over(partition_by=event_reports.c.event_id, order_by=newest_first)
+        ranked = restrict(select(*columns, rank.label("rank"))).subquery()
+        stmt = select(*[ranked.c[column.name] for column in columns]).where(ranked.c.rank == 1)
+
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def recent_event_rows(db: Session, since: datetime,
+                      bbox: Optional[Tuple[float, float, float, float]] = None) -> List[CandidateRow]:
+    """Fetch active events from their denormalized latest-report columns, without a join.
+
+    With ``bbox`` (``min_lon, min_lat, max_lon, max_lat``), only events whose latest report lies inside it.
+    """
+    stmt = (
+        select(
+            models.Event.id,
+            models.Event.last_lat,
+            models.Event.last_lon,
+            models.Event.last_report_at,
+            models.Event.last_tags
+        )
+        .where(models.Event.last_report_at >= since)
+    )
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        stmt = stmt.where(models.Event.last_lat.between(min_lat, max_lat),
+                          models.Event.last_lon.between(min_lon, max_lon))
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def recent_report_rows(db: Session, since: datetime) -> List[Tuple[int, int, float, float, datetime, str]]:
+    """``(report_id, event_id, lat, lon, created_at, content)`` of reports since ``since``, oldest first."""
+    event_reports = models.event_reports
+    stmt = (
+        select(
+            models.Report.id,
+            event_reports.c.event_id,
+            models.Location.latitude,
+            models.Location.longitude,
+            models.Report.created_at,
+            models.Report.content
+        )
+        .join(event_reports, models.report_link())
+        .join(models.Location, models.Location.id == models.Report.location_id)
+        # On both tables so Postgres prunes the partitions of each
+        .where(models.Report.created_at >= since, event_reports.c.report_created_at >= since)
+        .order_by(models.Report.created_at)
+    )
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def refresh_event_positions(db: Session, event_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute the denormalized latest-report columns from the reports table.
+
+    With no ``event_ids`` only events that have never been populated are refreshed.
+    Events left without any report are cleared. The caller commits.
+    """
+    if event_ids is None:
+        event_ids = db.scalars(
+            select(models.Event.id).where(models.Event.last_report_at.is_(None))
+        ).all()
+    event_ids = list(event_ids)
+    if not event_ids:
+        return 0
+
+    positions = {
+        event_id: {
+            "id": event_id,
+            "last_lat": latitude,
+            "last_lon": longitude,
+            "last_report_at": created_at,
+            "last_tags": tags
+        }
+        for event_id, latitude, longitude, created_at, tags in latest_report_rows(db, event_ids=event_ids)
+    }
+    empty = {"last_lat": None, "last_lon": None, "last_report_at": None, "last_tags": None}
+    values = [positions.get(event_id, dict(empty, id=event_id)) for event_id in event_ids]
+    db.execute(update(models.Event), values)
+    return len(values)
+
+
+MAX_PAGE_SIZE = 500
+
+
+class ListFilters:
+    """Server-side filters shared by the report and event list endpoints."""
+
+    def __init__(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 location_id: Optional[int] = None, tags: Optional[List[str]] = None,
+                 bbox: Optional[Tuple[float, float, float, float]] = None):
+        self.since = since
+        self.until = until
+        self.location_id = location_id
+        self.tags = tags
+        self.bbox = bbox
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse ``min_lon,min_lat,max_lon,max_lat``."""
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(row_id)
+
+
+def tags_overlap(column, tags: List[str], dialect_name: str):
+    """True when the tag column shares at least one tag with ``tags``.
+
+    Postgres compares its native arrays; SQLite (local runs) looks inside the JSON list.
+    """
+    if dialect_name == "postgresql":
+        return column.op("&&")(cast(array(tags), ARRAY(String)))
+    if dialect_name == "sqlite":
+        values = func.json_each(column).table_valued("value")
+        return exists(select(values.c.value).where(values.c.value.in_(tags)))
+    raise NotImplementedError(f"Tag filters are not supported on {dialect_name}")
+
+
+def apply_filters(stmt, model, filters: ListFilters, dialect_name: str):
+    """Apply list filters to a select over ``Report`` or ``Event``."""
+    if filters.since is not None:
+        stmt = stmt.where(model.created_at >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(model.created_at < filters.until)
+    if filters.location_id is not None:
+        stmt = stmt.where(model.location_id == filters.location_id)
+    if filters.tags:
+        stmt = stmt.where(tags_overlap(model.tags, filters.tags, dialect_name))
+    if filters.bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = filters.bbox
+        stmt = (
+            stmt.join(models.Location, models.Location.id == model.location_id)
+            .where(models.Location.latitude.between(min_lat, max_lat))
+            .where(models.Location.longitude.between(min_lon, max_lon))
+        )
+    return stmt
+
+
+def paginate(stmt, model, cursor: Optional[str], limit: int):
+    """Keyset pagination on ``(created_at, id)``, newest first.
+
+    Selects one extra row so the caller can tell whether another page exists.
+    Compares the stored column, so the ``(created_at, id)`` index serves it.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """Trim the look-ahead row and return the cursor for the following page, if any."""
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def embedded_reports(event_ids: List[int], limit: int, full: bool = True):
+    """Newest ``limit`` reports of each event, with each event's total, in one statement."""
+    event_reports = models.event_reports
+    columns = [models.Report.id]
+    if full:
+        columns += [
+            models.Report.content,
+            models.Report.tags,
+            models.Report.severity,
+            models.Report.location_id,
+            models.Report.user_id
+        ]
+    rank = func.row_number().over(
+        partition_by=event_reports.c.event_id,
+        order_by=(models.Report.created_at.desc(), models.Report.id.desc())
+    )
+    total = func.count().over(partition_by=event_reports.c.event_id)
+    ranked = (
+        select(event_reports.c.event_id, *columns, rank.label("rank"), total.label("total"))
+        .select_from(models.Report)
+        .join(event_reports, models.report_link())
+        .where(event_reports.c.event_id.in_(event_ids))
+        .subquery()
+    )
+    return select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.event_id, ranked.c.rank)
+
+
+def within_geohash_cover(latitude: float, longitude: float, radius_km: float):
+    """Index-backed prefilter: locations whose geohash falls in a cell covering the circle.
+
+    Each prefix becomes a ``>= prefix AND < successor`` range rather than ``LIKE 'prefix%'``,
+    which every backend can answer from a plain B-tree index.
+    """
+    column = models.Location.geohash
+    ranges = []
+    for prefix in geohash.cover(latitude, longitude, radius_km):
+        upper = geohash.prefix_upper_bound(prefix)
+        ranges.append(and_(column >= prefix, column < upper) if upper is not None else column >= prefix)
+    return or_(*ranges)
+
+
+def nearby_events(latitude: float, longitude: float, radius_km: float, since: Optional[datetime] = None):
+    """Candidate events (with their location's coordinates) around a point.
+
+    Rows still need exact distance refinement; see ``refine_by_distance``.
+    """
+    stmt = (
+        select(models.Event, models.Location.latitude, models.Location.longitude)
+        .join(models.Location, models.Location.id == models.Event.location_id)
+        .where(within_geohash_cover(latitude, longitude, radius_km))
+    )
+    if since is not None:
+        stmt = stmt.where(models.Event.last_report_at >= since)
+    return stmt
+
+
+def refine_by_distance(rows, latitude: float, longitude: float, radius_km: float,
+                       limit: Optional[int] = None) -> List[Tuple[object, float]]:
+    """Keep ``(item, lat, lon)`` rows inside the radius as ``(item, distance)``, nearest first."""
+    matches = []
+    for item, item_lat, item_lon in rows:
+        distance = haversine_km(latitude, longitude, item_lat, item_lon)
+        if distance <= radius_km:
+            matches.append((item, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches[:limit] if limit is not None else matches
+
+
+def backfill_geohashes(db: Session, batch_size: int = 10000) -> int:
+    """Populate ``Location.geohash`` for rows created before the column existed. The caller commits."""
+    updated = 0
+    while True:
+        rows = db.execute(
+            select(models.Location.id, models.Location.latitude, models.Location.longitude)
+            .where(models.Location.geohash.is_(None))
+            .where(models.Location.latitude.is_not(None))
+            .where(models.Location.longitude.is_not(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        db.execute(update(models.Location), [
+            {"id": row_id, "geohash": geohash.encode(latitude, longitude)}
+            for row_id, latitude, longitude in rows
+        ])
+        updated += len(rows)
@@ -0,0 +1,503 @@
+"""Offline re-clustering of historical reports into events.
+
+Incremental correlation is greedy and depends on arrival order. This job
+re-derives every event from scratch with a DBSCAN-style pass over the
+``HybridCorrelator`` similarity, then rewrites ``events`` / ``event_reports``
+in a single transaction.
+
+Two reports are neighbors when they lie within ``max_distance`` and
+``max_time_window`` of each other and score at least ``threshold``. Reports
+with at least ``min_samples`` neighbors (counting themselves) are core points;
+core points that are neighbors share a cluster, other reports join their best
+core neighbor's cluster or become single-report events.
+
+Time is split into partitions that are clustered in parallel processes. Each
+worker loads two time windows of margin on both sides so core status is exact
+for everything its own reports can touch; the parent process unions the
+per-partition results. Per-cluster data lives in NumPy columns indexed by
+cluster label; event text and coordinates are read back only for each
+cluster's first and latest report while the events are written.
+
+With the postgres state backend, running API workers are told to reload
+their event index once the rewrite commits. With the memory backend there is
+no channel to them, so restart them afterwards.
+
+Usage: python -m app.recluster [--partition-hours 168] [--workers 4] [--dry-run]
+"""
+import argparse
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models, shared_state
+from .correlation import CandidateBatch, HybridCorrelator
+from .database import SessionLocal
+from .spatial_index import KM_PER_DEGREE, to_epoch
+
+# Rows fetched per round trip, and rows per write statement
+CHUNK_SIZE = 10000
+# Reports scored against a neighborhood at once (bounds the score matrix size)
+QUERY_BLOCK = 256
+
+
+def _find(parent, item: int) -> int:
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]
+        item = parent[item]
+    return item
+
+
+def _union(parent, a: int, b: int) -> None:
+    a, b = _find(parent, a), _find(parent, b)
+    if a != b:
+        parent[max(a, b)] = min(a, b)
+
+
+def _roots(parent: np.ndarray, items: np.ndarray) -> np.ndarray:
+    """Vectorized find: follow parent pointers until every item reaches its root."""
+    roots = parent[items]
+    while True:
+        following = parent[roots]
+        if np.array_equal(following, roots):
+            return roots
+        roots = following
+
+
+def _load_partition(start, end, margin: timedelta, vocabulary) -> Tuple[np.ndarray, CandidateBatch]:
+    """Stream the partition's reports plus ``margin`` on both sides into column arrays."""
+    ids, latitudes, longitudes, timestamps, tag_bits = [], [], [], [], []
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(models.Report.id, models.Location.latitude, models.Location.longitude,
+                   models.Report.created_at, models.Report.tags)
+            .join(models.Location, models.Location.id == models.Report.location_id)
+            .where(models.Report.created_at >= start - margin)
+            .where(models.Report.created_at < end + margin)
+            .where(models.Location.latitude.is_not(None))
+            .execution_options(yield_per=CHUNK_SIZE)
+        )
+        for report_id, latitude, longitude, created_at, tags in rows:
+            ids.append(report_id)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+            timestamps.append(to_epoch(created_at))
+            tag_bits.append(vocabulary.encode(tags))
+    finally:
+        db.close()
+    batch = CandidateBatch(
+        np.array(ids, dtype=np.int64),
+        np.array(latitudes, dtype=np.float64),
+        np.array(longitudes, dtype=np.float64),
+        np.array(timestamps, dtype=np.float64),
+        np.array(tag_bits, dtype=np.uint64).reshape(len(ids), vocabulary.words)
+    )
+    return batch.event_ids, batch
+
+
+def _subset(batch: CandidateBatch, positions: np.ndarray) -> CandidateBatch:
+    return CandidateBatch(
+        positions,
+        batch.latitudes[positions],
+        batch.longitudes[positions],
+        batch.timestamps[positions],
+        batch.tag_bits[positions]
+    )
+
+
+class GridBlocks:
+    """Reports grouped into (lat cell, lon cell, time bucket) blocks.
+
+    Cells are ``max_distance`` wide and buckets one time window long, so every
+    neighbor of a report lies in the adjacent buckets and cells.
+    """
+
+    def __init__(self, batch: CandidateBatch, cell_km: float, window_seconds: float):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cell_km = cell_km
+        lat_cells = np.floor(batch.latitudes / self.cell_deg).astype(np.int64)
+        lon_cells = np.floor(batch.longitudes / self.cell_deg).astype(np.int64)
+        buckets = np.floor(batch.timestamps / window_seconds).astype(np.int64)
+        order = np.lexsort((buckets, lon_cells, lat_cells))
+        keys = np.stack([lat_cells[order], lon_cells[order], buckets[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        self.blocks: Dict[Tuple[int, int, int], np.ndarray] = {
+            tuple(int(v) for v in keys[group[0]]): order[group]
+            for group in np.split(np.arange(len(order)), boundaries) if len(group)
+        }
+
+    def neighborhood(self, key: Tuple[int, int, int]) -> np.ndarray:
+        """Positions in every block that can hold a neighbor of a report in ``key``."""
+        lat_cell, lon_cell, bucket = key
+        # Longitude cells shrink toward the poles, so reach further east and west there
+        widest = min((abs(lat_cell) + 2) * self.cell_deg, 89.9)
+        reach = math.ceil(self.cell_km / (KM_PER_DEGREE * math.cos(math.radians(widest))) / self.cell_deg)
+        parts = [
+            self.blocks[(lat_cell + dlat, lon_cell + dlon, bucket + dt)]
+            for dlat in (-1, 0, 1)
+            for dlon in range(-reach, reach + 1)
+            for dt in (-1, 0, 1)
+            if (lat_cell + dlat, lon_cell + dlon, bucket + dt) in self.blocks
+        ]
+        return np.concatenate(parts)
+
+
+def _scored_blocks(grid: GridBlocks, batch: CandidateBatch, correlator: HybridCorrelator,
+                   queries: np.ndarray, candidates: np.ndarray):
+    """Yield ``(query positions, candidate positions, scores)`` block by block.
+
+    ``queries`` and ``candidates`` are boolean masks over the partition.
+    """
+    for key, positions in grid.blocks.items():
+        positions = positions[queries[positions]]
+        if not len(positions):
+            continue
+        around = grid.neighborhood(key)
+        around = around[candidates[around]]
+        if not len(around):
+            continue
+        others = _subset(batch, around)
+        for i in range(0, len(positions), QUERY_BLOCK):
+            chunk = positions[i:i + QUERY_BLOCK]
+            scores = correlator.score_matrix(_subset(batch, chunk), others)
+            # A report always neighbors itself, whatever its tags
+            scores[chunk[:, None] == around[None, :]] = 1.0
+            yield chunk, around, scores
+
+
+def cluster_partition(task: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster the reports created in ``[start, end)``.
+
+    Returns ``(report_ids, roots)`` pairs that each join two reports of the same
+    cluster. Noise reports are left out.
+    """
+    start, end, threshold, min_samples = task
+    correlator = HybridCorrelator()
+    window = correlator.max_time_window
+    ids, batch = _load_partition(start, end, 2 * window, correlator.vocabulary)
+    if not len(ids):
+        return ids, ids
+    grid = GridBlocks(batch, correlator.max_distance, window.total_seconds())
+
+    # Core status is exact for reports whose whole neighborhood was loaded
+    known = (batch.timestamps >= to_epoch(start - window)) & (batch.timestamps < to_epoch(end + window))
+    own = (batch.timestamps >= to_epoch(start)) & (batch.timestamps < to_epoch(end))
+    everything = np.ones(len(ids), dtype=bool)
+    counts = np.zeros(len(ids), dtype=np.int64)
+    for chunk, _, scores in _scored_blocks(grid, batch, correlator, known, everything):
+        counts[chunk] = (scores >= threshold).sum(axis=1)
+    core = known & (counts >= min_samples)
+
+    # Link core neighbors. Each row is hooked onto the smallest root it touches,
+    # so only a handful of distinct unions remain per block.
+    parent = np.arange(len(ids), dtype=np.int64)
+    for chunk, around, scores in _scored_blocks(grid, batch, correlator, core, core):
+        rows, cols = np.nonzero(scores >= threshold)
+        roots = _roots(parent, around)[cols]
+        lowest = np.minimum.reduceat(roots, np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]))
+        pairs = np.unique(np.stack([np.repeat(lowest, np.bincount(rows)[np.unique(rows)]), roots]), axis=1)
+        for a, b in pairs.T.tolist():
+            _union(parent, a, b)
+
+    # Border points join their best-scoring core neighbor
+    border_of = np.full(len(ids), -1, dtype=np.int64)
+    for chunk, around, scores in _scored_blocks(grid, batch, correlator, own & ~core, core):
+        scores[scores < threshold] = -1.0
+        best = scores.argmax(axis=1)
+        matched = scores[np.arange(len(chunk)), best] >= threshold
+        border_of[chunk[matched]] = around[best[matched]]
+
+    # Emit every member of a component, not only this partition's own reports:
+    # a component can span the boundary and its other side may pick another root.
+    members = np.flatnonzero(core)
+    roots = _roots(parent, members)
+    borders = np.flatnonzero(border_of >= 0)
+    left = np.concatenate([members, borders])
+    right = np.concatenate([roots, _roots(parent, border_of[borders])])
+    linked = left != right
+    return ids[left[linked]], ids[right[linked]]
+
+
+def partitions(db: Session, partition_hours: float) -> Tuple[List[Tuple], int]:
+    """Split the report time range into ``[start, end)`` partitions; also return the max report id."""
+    first, last, max_id = db.execute(
+        select(func.min(models.Report.created_at), func.max(models.Report.created_at), func.max(models.Report.id))
+    ).one()
+    if first is None:
+        return [], 0
+    step = timedelta(hours=partition_hours)
+    bounds = []
+    start = first
+    while start <= last:
+        bounds.append((start, start + step))
+        start += step
+    return bounds, max_id
+
+
+class Clusters:
+    """Per-cluster columns, indexed by cluster label (the cluster's root report id).
+
+    Every array has one slot per report id up to ``max_id``, so memory stays a
+    few numbers per report whatever the cluster sizes. Slots that are not a
+    root, or ids without a report, keep ``size`` 0.
+    """
+
+    def __init__(self, labels: np.ndarray):
+        self.labels = labels
+        self.size = np.zeros(len(labels), dtype=np.int64)
+        # First report: earliest created_at, lowest id among ties
+        self.first_at = np.full(len(labels), np.inf)
+        self.first_id = np.full(len(labels), -1, dtype=np.int64)
+        # Latest report: newest created_at, highest id among ties (as queries.latest_report_rows)
+        self.latest_at = np.full(len(labels), -np.inf)
+        self.latest_id = np.full(len(labels), -1, dtype=np.int64)
+        # Old event each cluster keeps, or -1 for a new event
+        self.owner = np.full(len(labels), -1, dtype=np.int64)
+        # Tag union of clusters with more than one report: (label, tag index) pairs sorted by label
+        self.tag_names: List[str] = []
+        self.tag_pairs = np.zeros((2, 0), dtype=np.int64)
+        self._tag_chunks: List[np.ndarray] = []
+
+    def add(self, report_ids: np.ndarray, stamps: np.ndarray) -> None:
+        labels = self.labels[report_ids]
+        np.add.at(self.size, labels, 1)
+        self._keep(self.first_at, self.first_id, labels, stamps, report_ids, np.minimum)
+        self._keep(self.latest_at, self.latest_id, labels, stamps, report_ids, np.maximum)
+
+    @staticmethod
+    def _keep(best_at: np.ndarray, best_id: np.ndarray, labels: np.ndarray, stamps: np.ndarray,
+              report_ids: np.ndarray, pick) -> None:
+        """Fold a chunk into the running per-label extreme of ``(stamp, id)`` under ``pick``."""
+        before = best_at[labels]
+        pick.at(best_at, labels, stamps)
+        # A better stamp replaces the id; ties on the best stamp pick among ids
+        moved = best_at[labels] != before
+        best_id[labels[moved]] = -1 if pick is np.maximum else np.iinfo(np.int64).max
+        hits = stamps == best_at[labels]
+        pick.at(best_id, labels[hits], report_ids[hits])
+
+    def vote(self, previous: np.ndarray) -> None:
+        """Give each cluster the old event most of its reports belonged to.
+
+        Larger clusters choose first; an event claimed already goes to the
+        cluster's next choice, and a cluster left without one gets a new event.
+        """
+        reports = np.flatnonzero(previous >= 0)
+        pairs, counts = np.unique(np.stack([self.labels[reports], previous[reports]]), axis=1, return_counts=True)
+        order = np.lexsort((-counts, pairs[0], -self.size[pairs[0]]))
+        claimed = set()
+        for label, event_id in pairs[:, order].T.tolist():
+            if self.owner[label] < 0 and event_id not in claimed:
+                claimed.add(event_id)
+                self.owner[label] = event_id
+
+    def add_tags(self, report_ids: np.ndarray, tags: List[Optional[List[str]]]) -> None:
+        """Collect tags of reports in clusters of several; a single report's event copies its own."""
+        positions = {name: i for i, name in enumerate(self.tag_names)}
+        labels = self.labels[report_ids]
+        pairs = []
+        for label, size, report_tags in zip(labels.tolist(), self.size[labels].tolist(), tags):
+            if size < 2:
+                continue
+            for tag in report_tags or []:
+                if tag not in positions:
+                    positions[tag] = len(self.tag_names)
+                    self.tag_names.append(tag)
+                pairs.append((label, positions[tag]))
+        if pairs:
+            self._tag_chunks.append(np.unique(np.array(pairs, dtype=np.int64).T, axis=1))
+
+    def finish_tags(self) -> None:
+        self.tag_pairs = np.unique(np.concatenate([self.tag_pairs, *self._tag_chunks], axis=1), axis=1)
+        self._tag_chunks = []
+
+    def tags_of(self, label: int) -> List[str]:
+        pair_labels = self.tag_pairs[0]
+        lo, hi = np.searchsorted(pair_labels, label), np.searchsorted(pair_labels, label, side="right")
+        return sorted(self.tag_names[i] for i in self.tag_pairs[1, lo:hi].tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.size))
+
+
+def summarize(db: Session, parent: np.ndarray, previous: np.ndarray, max_id: int) -> Clusters:
+    """Stream every report up to ``max_id`` and fold it into its cluster's columns.
+
+    Reports ingested after the snapshot are left to live correlation.
+    """
+    clusters = Clusters(_roots(parent, np.arange(max_id + 1, dtype=np.int64)))
+    rows = db.execute(
+        select(models.Report.id, models.Report.created_at)
+        .where(models.Report.id <= max_id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        clusters.add(np.array([report_id for report_id, _ in chunk], dtype=np.int64),
+                     np.array([to_epoch(created_at) for _, created_at in chunk], dtype=np.float64))
+    clusters.vote(previous)
+
+    # Tags only matter for clusters of several: a second, narrower pass
+    rows = db.execute(
+        select(models.Report.id, models.Report.tags)
+        .where(models.Report.id <= max_id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        clusters.add_tags(np.array([report_id for report_id, _ in chunk], dtype=np.int64),
+                          [tags for _, tags in chunk])
+    clusters.finish_tags()
+    return clusters
+
+
+def report_details(db: Session, report_ids: np.ndarray) -> Dict[int, Tuple]:
+    """``id -> (content, tags, location_id, created_at, latitude, longitude)`` of the given reports."""
+    rows = db.execute(
+        select(models.Report.id, models.Report.content, models.Report.tags, models.Report.location_id,
+               models.Report.created_at, models.Location.latitude, models.Location.longitude)
+        .outerjoin(models.Location, models.Location.id == models.Report.location_id)
+        .where(models.Report.id.in_(report_ids.tolist()))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def rewrite(db: Session, clusters: Clusters, max_id: int) -> Tuple[int, int, int]:
+    """Replace events and the links of reports up to ``max_id`` in one transaction.
+
+    Each cluster keeps the old event chosen by ``Clusters.vote`` (and with it
+    the existing description) or gets a new one. Content, tags and
+    coordinates are read back only for each cluster's first and latest
+    report, a chunk of clusters at a time. Links of reports ingested after
+    the snapshot are kept, and so are their events.
+    Returns ``(kept, created, deleted)`` event counts.
+    """
+    existing = np.fromiter(db.scalars(select(models.Event.id).execution_options(yield_per=CHUNK_SIZE)), dtype=np.int64)
+    event_of = np.full(len(clusters.labels), -1, dtype=np.int64)  # cluster label -> event id
+    kept = created = 0
+
+    db.execute(delete(models.event_reports).where(models.event_reports.c.report_id <= max_id))
+    labels = np.flatnonzero(clusters.size)
+    for i in range(0, len(labels), CHUNK_SIZE):
+        chunk = labels[i:i + CHUNK_SIZE]
+        details = report_details(db, np.union1d(clusters.first_id[chunk], clusters.latest_id[chunk]))
+        updates, inserts = [], []
+        for label in chunk.tolist():
+            content, first_tags, location_id = details[int(clusters.first_id[label])][:3]
+            _, latest_tags, _, latest_at, latitude, longitude = details[int(clusters.latest_id[label])]
+            values = {
+                "tags": clusters.tags_of(label) if clusters.size[label] > 1 else sorted(set(first_tags or [])),
+                "location_id": location_id,
+                "last_report_at": latest_at,
+                "last_lat": latitude,
+                "last_lon": longitude,
+                "last_tags": latest_tags
+            }
+            owner = int(clusters.owner[label])
+            if owner >= 0:
+                event_of[label] = owner
+                updates.append(dict(values, id=owner))
+            else:
+                # The first report is the placeholder description, as for live events
+                inserts.append(dict(values, description=content))
+        if updates:
+            db.execute(update(models.Event), updates)
+        if inserts:
+            event_ids = db.scalars(
+                insert(models.Event).returning(models.Event.id, sort_by_parameter_order=True), inserts
+            ).all()
+            event_of[chunk[clusters.owner[chunk] < 0]] = event_ids
+        kept += len(updates)
+        created += len(inserts)
+    write_links(db, clusters.labels, event_of, max_id)
+
+    # Old events no cluster kept, unless reports ingested since link to them
+    stale = np.setdiff1d(existing, clusters.owner[clusters.owner >= 0]).tolist()
+    still_linked = select(models.event_reports.c.event_id).where(models.event_reports.c.event_id == models.Event.id)
+    deleted = 0
+    for i in range(0, len(stale), CHUNK_SIZE):
+        deleted += db.execute(
+            delete(models.Event)
+            .where(models.Event.id.in_(stale[i:i + CHUNK_SIZE]))
+            .where(~still_linked.exists())
+        ).rowcount
+    # Running workers drop their event index and reload it from the new events
+    shared_state.publish_in_transaction(db, shared_state.INDEX_RESET)
+    db.commit()
+    return kept, created, deleted
+
+
+def write_links(db: Session, labels: np.ndarray, event_of: np.ndarray, max_id: int) -> None:
+    """Stream the reports again and link each to its cluster's event, a chunk at a time."""
+    rows = db.execute(
+        select(models.Report.id, models.Report.created_at)
+        .where(models.Report.id <= max_id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        event_ids = event_of[labels[[report_id for report_id, _ in chunk]]].tolist()
+        db.execute(insert(models.event_reports), [
+            {"event_id": event_id, "report_id": report_id, "report_created_at": created_at}
+            for event_id, (report_id, created_at) in zip(event_ids, chunk)
+        ])
+
+
+def recluster(partition_hours: float = 168, workers: Optional[int] = None, threshold: float = 0.6,
+              min_samples: int = 2, dry_run: bool = False) -> None:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        bounds, max_id = partitions(db, partition_hours)
+        if not bounds:
+            print("No reports to cluster")
+            return
+        print(f"Clustering reports up to id {max_id} in {len(bounds)} partitions")
+
+        parent = np.arange(max_id + 1, dtype=np.int64)
+        tasks = [(start, end, threshold, min_samples) for start, end in bounds]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for done, (report_ids, roots) in enumerate(pool.map(cluster_partition, tasks), 1):
+                for report_id, root in zip(report_ids.tolist(), roots.tolist()):
+                    _union(parent, report_id, root)
+                print(f"  partition {done}/{len(tasks)}: {len(report_ids)} clustered reports")
+
+        previous = np.full(max_id + 1, -1, dtype=np.int64)
+        for event_id, report_id in db.execute(
+            select(models.event_reports.c.event_id, models.event_reports.c.report_id)
+            .execution_options(yield_per=CHUNK_SIZE)
+        ):
+            if report_id is not None and report_id <= max_id:
+                previous[report_id] = event_id
+
+        clusters = summarize(db, parent, previous, max_id)
+        del parent, previous
+        multi = int(np.count_nonzero(clusters.size > 1))
+        print(f"{len(clusters)} events ({multi} with more than one report)")
+        if dry_run:
+            return
+        kept, created, deleted = rewrite(db, clusters, max_id)
+        print(f"Kept {kept}, created {created}, deleted {deleted} events "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--partition-hours", type=float, default=168)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--min-samples", type=int, default=2)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    recluster(args.partition_hours, args.workers, args.threshold, args.min_samples, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
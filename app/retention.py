@@ -0,0 +1,197 @@
+"""Monthly report partitions, retention and archival.
+
+``python -m app.retention`` is meant to run daily (cron or a scheduled task):
+
+- On Postgres, it creates the ``reports`` / ``event_reports`` partitions for
+  the next ``partition_months_ahead`` months. Workers also do this at startup.
+- It archives every month older than ``retention_months`` to ``archive_dir``
+  (see ``app.archive``) and removes it from the database. On Postgres, the
+  month's partitions are detached, archived and dropped; elsewhere its rows
+  are deleted.
+
+Archived reports stay readable via ``GET /export/reports?archived=true``.
+Events and rollups are kept: the archived reports still count in the
+dashboard stats, and their alert scores decayed long ago.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+from . import export, models, queries
+from .archive import Month, archive, as_utc, month_bounds
+from .config import get_settings
+from .database import SessionLocal
+
+settings = get_settings()
+
+PARTITIONED_TABLES = ("reports", "event_reports")
+# Held while partitions are created or detached, so workers starting together take turns
+PARTITION_LOCK = 7_260_002
+
+LINK_COLUMNS = [
+    models.event_reports.c.event_id,
+    models.event_reports.c.report_id,
+    models.event_reports.c.report_created_at
+]
+
+
+def add_months(month: Month, count: int) -> Month:
+    year, number = divmod(month[0] * 12 + month[1] - 1 + count, 12)
+    return year, number + 1
+
+
+def month_of(value: datetime) -> Month:
+    value = as_utc(value)
+    return value.year, value.month
+
+
+def partition_name(table: str, month: Month) -> str:
+    return f"{table}_{month[0]:04d}_{month[1]:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('reports')")) == "p"
+
+
+def partition_months(db: Session, attached: bool = True) -> List[Month]:
+    """Months with a ``reports`` partition; with ``attached=False``, detached leftovers instead."""
+    names = db.scalars(text(
+        "SELECT c.relname FROM pg_class c "
+        "WHERE c.relname ~ '^reports_[0-9]{4}_[0-9]{2}$' AND c.relkind = 'r' "
+        "AND EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid) = :attached"
+    ), {"attached": attached})
+    return sorted((int(name[8:12]), int(name[13:15])) for name in names)
+
+
+def ensure_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """Create the missing partitions from the current month to ``months_ahead`` months ahead."""
+    if not is_partitioned(db):
+        return []
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK})
+    existing = set(partition_months(db))
+    current = month_of(datetime.now(timezone.utc))
+    created = []
+    for month in (add_months(current, offset) for offset in range(months_ahead + 1)):
+        if month in existing:
+            continue
+        start, end = month_bounds(month)
+        for table in PARTITIONED_TABLES:
+            db.execute(text(
+                f"CREATE TABLE {partition_name(table, month)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(partition_name(table, month))
+    db.commit()
+    return created
+
+
+def expired_months(db: Session, cutoff: Month) -> List[Month]:
+    """Months before ``cutoff`` that still have data in the database."""
+    if is_partitioned(db):
+        months = partition_months(db) + partition_months(db, attached=False)
+        return sorted({month for month in months if month < cutoff})
+    months = []
+    oldest = db.scalar(select(func.min(models.Report.created_at)))
+    while oldest is not None and month_of(oldest) < cutoff:
+        months.append(month_of(oldest))
+        # Skip ahead to the next month that has reports
+        oldest = db.scalar(
+            select(func.min(models.Report.created_at))
+            .where(models.Report.created_at >= month_bounds(months[-1])[1])
+        )
+    return months
+
+
+def archive_month(db: Session, month: Month) -> int:
+    """Archive one month of reports and links, then remove it from the database.
+
+    Safe to rerun after a failure: archives are rewritten from whatever is
+    still in the database, and nothing is removed until both files exist.
+    Returns the number of archived reports.
+    """
+    partitioned = is_partitioned(db)
+    if partitioned:
+        if month in partition_months(db):
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK})
+            # Links first: the link partition references the report partition
+            for table in reversed(PARTITIONED_TABLES):
+                db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition_name(table, month)}"))
+            db.commit()
+        columns = ", ".join(column.name for column in export.REPORT_COLUMNS)
+        reports = text(f"SELECT {columns} FROM {partition_name('reports', month)} ORDER BY id")
+        links = text(f"SELECT event_id, report_id, report_created_at FROM {partition_name('event_reports', month)}")
+    else:
+        start, end = month_bounds(month)
+        filters = queries.ListFilters(since=start, until=end)
+        reports = export.export_statement(db, models.Report, export.REPORT_COLUMNS, filters)
+        links = (
+            select(*LINK_COLUMNS)
+            .where(models.event_reports.c.report_created_at >= start)
+            .where(models.event_reports.c.report_created_at < end)
+        )
+
+    streamed = {"stream_results": True, "yield_per": export.EXPORT_BATCH_SIZE}
+    count = 0
+
+    def counted(result):
+        nonlocal count
+        for chunk in export.ndjson_chunks(result):
+            count += chunk.count("\n")
+            yield chunk
+
+    archive.write("reports", month, counted(db.execute(reports.execution_options(**streamed))))
+    archive.write("event_reports", month, export.ndjson_chunks(db.execute(links.execution_options(**streamed))))
+
+    if partitioned:
+        for table in reversed(PARTITIONED_TABLES):
+            db.execute(text(f"DROP TABLE {partition_name(table, month)}"))
+    else:
+        db.execute(
+            delete(models.event_reports)
+            .where(models.event_reports.c.report_created_at >= start)
+            .where(models.event_reports.c.report_created_at < end)
+        )
+        db.execute(delete(models.Report).where(models.Report.created_at >= start, models.Report.created_at < end))
+    db.commit()
+    return count
+
+
+def run(keep_months: int, dry_run: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db) if not dry_run else []
+        for name in created:
+            print(f"Created partition {name}")
+        cutoff = add_months(month_of(datetime.now(timezone.utc)), -keep_months)
+        months = expired_months(db, cutoff)
+        if not months:
+            print(f"Nothing older than {cutoff[0]:04d}-{cutoff[1]:02d} to archive")
+        for month in months:
+            label = f"{month[0]:04d}-{month[1]:02d}"
+            if dry_run:
+                print(f"Would archive {label} to {archive.path('reports', month).parent}")
+                continue
+            started = time.perf_counter()
+            count = archive_month(db, month)
+            print(f"Archived {count} reports from {label} in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=settings.retention_months,
+                        help="whole months to keep in the database besides the current one")
+    parser.add_argument("--dry-run", action="store_true", help="list the months that would be archived")
+    args = parser.parse_args()
+    run(args.keep_months, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
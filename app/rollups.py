@@ -0,0 +1,177 @@
+"""Dashboard rollups: report counts per location x hour x tag x severity.
+
+Rows are kept current by ORM hooks on report insert/delete (bulk inserts call
+``count_reports`` themselves). ``python -m app.rollups`` recomputes them from scratch.
+"""
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+
+Rollup = models.ReportRollup
+ALL_TAGS = Rollup.ALL_TAGS
+# Rows written per statement when rebuilding
+CHUNK_SIZE = 10000
+
+# (location_id, hour, tag, severity)
+RollupKey = Tuple[int, datetime, str, str]
+
+
+def hour_of(value: datetime) -> datetime:
+    """Truncate to the hour, in UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def report_keys(location_id: int, created_at: datetime, tags: Optional[List[str]], severity) -> List[RollupKey]:
+    """Every rollup row one report counts towards."""
+    hour = hour_of(created_at)
+    severity = "" if severity is None else str(severity)
+    return [(location_id, hour, tag, severity) for tag in [ALL_TAGS, *sorted(set(tags or []))]]
+
+
+def apply(connection: Connection, reports: Iterable, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) reports from the rollups.
+
+    ``reports`` are objects with ``location_id``, ``created_at``, ``tags`` and
+    ``severity``. Runs on the caller's connection, inside its transaction.
+    """
+    deltas = Counter()
+    for report in reports:
+        if report.location_id is None or report.created_at is None:
+            continue
+        for key in report_keys(report.location_id, report.created_at, report.tags, report.severity):
+            deltas[key] += sign
+    if not deltas:
+        return
+
+    rows = [
+        {"location_id": location_id, "hour": hour, "tag": tag, "severity": severity, "count": count}
+        for (location_id, hour, tag, severity), count in deltas.items()
+    ]
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql if dialect == "postgresql" else sqlite).insert(Rollup.__table__)
+        connection.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["location_id", "hour", "tag", "severity"],
+                set_={"count": Rollup.__table__.c["count"] + upsert.excluded["count"]}
+            ),
+            rows
+        )
+    else:
+        table = Rollup.__table__
+        for row in rows:
+            key = and_(table.c.location_id == row["location_id"], table.c.hour == row["hour"],
+                       table.c.tag == row["tag"], table.c.severity == row["severity"])
+            if not connection.execute(update(table).where(key).values(count=table.c["count"] + row["count"])).rowcount:
+                connection.execute(insert(table).values(**row))
+
+    if sign < 0:
+        hours = {row["hour"] for row in rows}
+        locations = {row["location_id"] for row in rows}
+        connection.execute(
+            delete(Rollup.__table__)
+            .where(Rollup.__table__.c["count"] <= 0)
+            .where(Rollup.__table__.c.location_id.in_(locations))
+            .where(Rollup.__table__.c.hour.in_(hours))
+        )
+
+
+def count_reports(db: Session, reports: Iterable) -> None:
+    """Count reports written without the ORM flush hooks (bulk inserts)."""
+    apply(db.connection(), reports, 1)
+
+
+@event.listens_for(models.Report, "after_insert")
+def count_report(mapper, connection, target):
+    apply(connection, [target], 1)
+
+
+@event.listens_for(models.Report, "after_delete")
+def uncount_report(mapper, connection, target):
+    apply(connection, [target], -1)
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every rollup row from the reports table in one transaction.
+
+    Reports written while the rebuild runs may be counted twice or not at all;
+    pause ingestion for an exact result.
+    """
+    counts = Counter()
+    rows = db.execute(
+        select(models.Report.location_id, models.Report.created_at, models.Report.tags, models.Report.severity)
+        .where(models.Report.location_id.is_not(None))
+        .where(models.Report.created_at.is_not(None))
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    for location_id, created_at, tags, severity in rows:
+        for key in report_keys(location_id, created_at, tags, severity):
+            counts[key] += 1
+
+    db.execute(delete(Rollup))
+    values = [
+        {"location_id": location_id, "hour": hour, "tag": tag, "severity": severity, "count": count}
+        for (location_id, hour, tag, severity), count in counts.items()
+    ]
+    for i in range(0, len(values), CHUNK_SIZE):
+        db.execute(insert(Rollup), values[i:i + CHUNK_SIZE])
+    db.commit()
+    return len(values)
+
+
+def _filtered(stmt, since: Optional[datetime], until: Optional[datetime], location_id: Optional[int]):
+    if since is not None:
+        stmt = stmt.where(Rollup.hour >= hour_of(since))
+    if until is not None:
+        stmt = stmt.where(Rollup.hour < until)
+    if location_id is not None:
+        stmt = stmt.where(Rollup.location_id == location_id)
+    return stmt
+
+
+def location_counts(since=None, until=None, location_id=None, limit: int = 100):
+    total = func.sum(Rollup.count).label("reports")
+    stmt = select(Rollup.location_id, total).where(Rollup.tag == ALL_TAGS).group_by(Rollup.location_id)
+    return _filtered(stmt, since, until, location_id).order_by(total.desc(), Rollup.location_id).limit(limit)
+
+
+def severity_counts(since=None, until=None, location_id=None, tag: Optional[str] = None):
+    total = func.sum(Rollup.count).label("reports")
+    stmt = select(Rollup.severity, total).where(Rollup.tag == (tag or ALL_TAGS)).group_by(Rollup.severity)
+    return _filtered(stmt, since, until, location_id).order_by(Rollup.severity)
+
+
+def tag_counts(since=None, until=None, location_id=None, limit: int = 100):
+    total = func.sum(Rollup.count).label("reports")
+    stmt = select(Rollup.tag, total).where(Rollup.tag != ALL_TAGS).group_by(Rollup.tag)
+    return _filtered(stmt, since, until, location_id).order_by(total.desc(), Rollup.tag).limit(limit)
+
+
+def hourly_counts(since=None, until=None, location_id=None, tag: Optional[str] = None):
+    total = func.sum(Rollup.count).label("reports")
+    stmt = select(Rollup.hour, total).where(Rollup.tag == (tag or ALL_TAGS)).group_by(Rollup.hour)
+    return _filtered(stmt, since, until, location_id).order_by(Rollup.hour)
+
+
+def main():
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} rollup rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
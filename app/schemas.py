@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr, conint, Field
 from datetime import datetime
@@ -44,7 +45,6 @@ class LocationBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
-    alert_level: int = 0
 
 
 class LocationCreate(LocationBase):
@@ -53,6 +53,9 @@ class LocationCreate(LocationBase):
 
 class Location(LocationBase):
     id: int
+    # Computed from recent nearby reports, not set by clients
+    alert_level: int = 0
+    alert_score: float = 0.0
 
     class Config:
         from_attributes = True
@@ -99,15 +102,59 @@ class EventCreate(EventBase):
 # Simple Event response without nested objects
 class EventSimple(EventBase):
     id: int
+    corroboration_count: Optional[int] = 0
 
     class Config:
         from_attributes = True
 
 
+class ReportsMode(str, Enum):
+    none = "none"
+    ids = "ids"
+    full = "full"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class LocationAlert(BaseModel):
+    location_id: int
+    alert_level: int
+    alert_score: float
+
+
+class LocationStat(BaseModel):
+    location_id: int
+    reports: int
+
+
+class TagStat(BaseModel):
+    tag: str
+    reports: int
+
+
+class SeverityStat(BaseModel):
+    severity: str
+    reports: int
+
+
+class HourStat(BaseModel):
+    hour: datetime
+    reports: int
+
+
 # Full Event response with nested objects
 class Event(EventSimple):
     created_at: datetime
-    reports: List[ReportSimple]
+    reports: Optional[List[ReportSimple]] = None
+    report_ids: Optional[List[int]] = None
+    report_count: Optional[int] = None
+
+
+class NearbyEvent(Event):
+    distance_km: float
 
     class Config:
         from_attributes = True
\ No newline at end of file
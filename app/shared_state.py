@@ -0,0 +1,205 @@
+"""Keeps per-process correlation state in step across worker processes.
+
+Each worker holds its own active-event index, duplicate index and caches.
+When one worker changes any of them, it broadcasts a ``StateMessage``, and
+the other workers apply the change to their copies. The channel is chosen
+by ``state_backend``:
+
+- ``memory`` (default): a single worker, nothing to share.
+- ``postgres``: LISTEN/NOTIFY between workers on one database.
+
+``PeerBackend`` connects several ``SharedState`` objects within one
+process and stands in for other workers in local runs and experiments.
+
+Broadcasts arrive shortly after the commit they describe. Correlation does
+not rely on them: under the advisory lock it rereads the events around
+each report (see ``EventCorrelationService.sync_region``).
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from . import push
+from .config import get_settings
+from .database import asyncpg_dsn
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EVENT_INDEXED = "event.indexed"
+EVENT_REMOVED = "event.removed"
+REPORT_SEEN = "report.seen"
+DESCRIPTION_CHANGED = "description.changed"
+USER_CHANGED = "user.changed"
+INDEX_RESET = "index.reset"
+
+# Session.info key for broadcasts waiting on the session's commit
+PENDING = "shared_state.pending"
+
+
+class StateMessage:
+    __slots__ = ("kind", "origin", "fields", "data")
+
+    def __init__(self, kind: str, origin: str, fields: dict, data: Optional[str] = None):
+        self.kind = kind
+        self.origin = origin
+        self.fields = fields
+        self.data = data if data is not None else json.dumps({"kind": kind, "origin": origin, **fields})
+
+    @classmethod
+    def from_json(cls, data: str) -> "StateMessage":
+        fields = json.loads(data)
+        return cls(fields.pop("kind"), fields.pop("origin"), fields, data)
+
+
+class MemoryBackend(push.LocalBackend):
+    """Single worker: there is nobody to tell, so nothing is sent."""
+
+    name = "memory"
+    broadcasts = False
+
+
+class PeerBackend:
+    """Delivers every message to all backends created with the same ``peers`` list."""
+
+    name = "peer"
+
+    def __init__(self, peers: Optional[List["PeerBackend"]] = None):
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+        self._deliver: Optional[Callable[[StateMessage], None]] = None
+
+    async def start(self, deliver: Callable[[StateMessage], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    def send(self, message: StateMessage) -> None:
+        for peer in self.peers:
+            if peer._deliver is not None:
+                peer._deliver(StateMessage.from_json(message.data))
+
+
+class SharedState:
+    """Broadcasts local state changes and applies the ones made by other workers.
+
+    ``publish`` may be called from any thread. Handlers registered with
+    ``on`` run on the event loop that started this object.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.stats = {"published": 0, "applied": 0, "failed": 0}
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def on(self, kind: str, handler: Callable[[dict], None]) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.backend.start(self._apply)
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+        await self.backend.stop()
+
+    def publish(self, kind: str, **fields) -> bool:
+        """Tell the other workers about a change already applied here."""
+        loop = self._loop
+        if loop is None or not getattr(self.backend, "broadcasts", True):
+            return False
+        self.stats["published"] += 1
+        message = StateMessage(kind, self.origin, fields)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.backend.send(message)
+        else:
+            loop.call_soon_threadsafe(self.backend.send, message)
+        return True
+
+    def _apply(self, message: StateMessage) -> None:
+        # Backends echo our own messages back; those changes are already applied
+        if message.origin == self.origin:
+            return
+        handler = self._handlers.get(message.kind)
+        if handler is None:
+            return
+        try:
+            handler(message.fields)
+            self.stats["applied"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Failed to apply %s from %s", message.kind, message.origin)
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "backend": self.backend.name,
+            **self.stats,
+            **getattr(self.backend, "stats", {})
+        }
+
+
+def state_backend():
+    """Backend named by ``state_backend``."""
+    if settings.state_backend == "postgres":
+        return push.PostgresBackend(
+            asyncpg_dsn(settings.database_url),
+            channel=settings.state_channel,
+            decode=StateMessage.from_json
+        )
+    return MemoryBackend()
+
+
+shared_state = SharedState(backend=state_backend())
+
+
+def publish_on_commit(session: Session, kind: str, **fields) -> None:
+    """Broadcast once ``session`` commits, so other workers never reload uncommitted rows.
+
+    For changes seen in flush events; dropped if the transaction rolls back.
+    """
+    session.info.setdefault(PENDING, []).append((kind, fields))
+
+
+def publish_in_transaction(session: Session, kind: str, **fields) -> bool:
+    """Broadcast from a process that does not run ``shared_state`` (command-line jobs).
+
+    On the postgres backend the NOTIFY joins ``session``'s transaction, so
+    workers hear of the change when it commits. Other backends cannot reach
+    other processes; returns False there.
+    """
+    if settings.state_backend != "postgres":
+        return False
+    message = StateMessage(kind, shared_state.origin, fields)
+    session.execute(select(func.pg_notify(settings.state_channel, message.data)))
+    return True
+
+
+@event.listens_for(Session, "after_commit")
+def publish_pending(session):
+    for kind, fields in session.info.pop(PENDING, ()):
+        shared_state.publish(kind, **fields)
+
+
+@event.listens_for(Session, "after_rollback")
+def drop_pending(session):
+    session.info.pop(PENDING, None)
@@ -0,0 +1,173 @@
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+KM_PER_DEGREE = 111.32
+
+
+def to_epoch(value: datetime) -> float:
+    """Convert a datetime to epoch seconds, treating naive values as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class IndexEntry:
+    __slots__ = ("event_id", "latitude", "longitude", "created_at", "timestamp", "tags", "tag_bits",
+                 "bucket", "cell")
+
+    def __init__(self, event_id: int, latitude: float, longitude: float,
+                 created_at: datetime, tags: List[str]):
+        self.event_id = event_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.created_at = created_at
+        self.timestamp = to_epoch(created_at)
+        self.tags = list(tags or [])
+        self.tag_bits = None
+        self.bucket = None
+        self.cell = None
+
+
+class ActiveEventIndex:
+    """Grid index over the latest report of each active event, bucketed by time.
+
+    Events are stored under ``(time bucket, lat cell, lon cell)`` so a lookup only
+    visits the buckets inside the time window and the cells inside the search radius.
+    """
+
+    def __init__(self, cell_km: float = 5.0, bucket_seconds: int = 3600,
+                 max_age: timedelta = timedelta(hours=24)):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.bucket_seconds = bucket_seconds
+        self.max_age = max_age
+        self.built = False
+        self._grid: Dict[int, Dict[Tuple[int, int], Dict[int, IndexEntry]]] = {}
+        self._entries: Dict[int, IndexEntry] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg))
+
+    def _bucket(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.bucket_seconds)
+
+    def upsert(self, event_id: int, latitude: float, longitude: float,
+               created_at: datetime, tags: List[str]) -> None:
+        """Insert an event or move it to the position of its newest report."""
+        entry = IndexEntry(event_id, latitude, longitude, created_at, tags)
+        with self._lock:
+            current = self._entries.get(event_id)
+            if current is not None:
+                if current.timestamp > entry.timestamp:
+                    return
+                self._discard(current)
+            entry.bucket = self._bucket(entry.timestamp)
+            entry.cell = self._cell(latitude, longitude)
+            self._grid.setdefault(entry.bucket, {}).setdefault(entry.cell, {})[event_id] = entry
+            self._entries[event_id] = entry
+
+    def remove(self, event_id: int) -> None:
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if entry is not None:
+                self._discard(entry)
+
+    def _discard(self, entry: IndexEntry) -> None:
+        del self._entries[entry.event_id]
+        cells = self._grid.get(entry.bucket)
+        if cells is None:
+            return
+        events = cells.get(entry.cell)
+        if events is not None:
+            events.pop(entry.event_id, None)
+            if not events:
+                del cells[entry.cell]
+        if not cells:
+            del self._grid[entry.bucket]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._grid.clear()
+            self._entries.clear()
+            self.built = False
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop every bucket that lies entirely outside the time window."""
+        now = now or datetime.now(timezone.utc)
+        oldest = self._bucket(to_epoch(now) - self.max_age.total_seconds())
+        removed = 0
+        with self._lock:
+            for bucket in [b for b in self._grid if b < oldest]:
+                for events in self._grid.pop(bucket).values():
+                    for event_id in events:
+                        del self._entries[event_id]
+                        removed += 1
+        return removed
+
+    def cell_ranges(self, latitude: float, longitude: float, max_distance_km: float) -> Tuple[range, range]:
+        """Lat and lon cell ranges covering the circle around a point."""
+        dlat = max_distance_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        dlon = min(max_distance_km / (KM_PER_DEGREE * cos_lat), 180.0)
+        lat_cells = range(math.floor((latitude - dlat) / self.cell_deg),
+                          math.floor((latitude + dlat) / self.cell_deg) + 1)
+        lon_cells = range(math.floor((longitude - dlon) / self.cell_deg),
+                          math.floor((longitude + dlon) / self.cell_deg) + 1)
+        return lat_cells, lon_cells
+
+    def cell_bounds(self, cells: Iterable[Tuple[int, int]]) -> Tuple[float, float, float, float]:
+        """``(min_lon, min_lat, max_lon, max_lat)`` of a set of cells."""
+        lat_cells = [cell[0] for cell in cells]
+        lon_cells = [cell[1] for cell in cells]
+        return (min(lon_cells) * self.cell_deg, min(lat_cells) * self.cell_deg,
+                (max(lon_cells) + 1) * self.cell_deg, (max(lat_cells) + 1) * self.cell_deg)
+
+    def candidates(self, latitude: float, longitude: float, at: datetime,
+                   max_distance_km: float, max_age: timedelta) -> List[IndexEntry]:
+        """Return events whose latest report is within the radius and time window."""
+        timestamp = to_epoch(at)
+        window = max_age.total_seconds()
+        lat_cells, lon_cells = self.cell_ranges(latitude, longitude, max_distance_km)
+        buckets = range(self._bucket(timestamp - window), self._bucket(timestamp + window) + 1)
+
+        matches = []
+        with self._lock:
+            for bucket in buckets:
+                cells = self._grid.get(bucket)
+                if not cells:
+                    continue
+                if len(lat_cells) * len(lon_cells) > len(cells):
+                    groups = [events for (cx, cy), events in cells.items()
+                              if cx in lat_cells and cy in lon_cells]
+                else:
+                    groups = [cells[(cx, cy)] for cx in lat_cells for cy in lon_cells
+                              if (cx, cy) in cells]
+                for events in groups:
+                    for entry in events.values():
+                        if abs(entry.timestamp - timestamp) > window:
+                            continue
+                        if haversine_km(latitude, longitude, entry.latitude, entry.longitude) <= max_distance_km:
+                            matches.append(entry)
+        return matches
+
+    def rebuild(self, rows: Iterable[Tuple[int, float, float, datetime, List[str]]]) -> None:
+        """Replace the index contents with ``(event_id, lat, lon, created_at, tags)`` rows."""
+        with self._lock:
+            self._grid.clear()
+            self._entries.clear()
+            for event_id, latitude, longitude, created_at, tags in rows:
+                self.upsert(event_id, latitude, longitude, created_at, tags)
+            self.built = True
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371 * math.asin(math.sqrt(min(1.0, a)))
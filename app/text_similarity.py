@@ -0,0 +1,182 @@
+import math
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from . import models, shared_state
+from .config import get_settings
+
+settings = get_settings()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]{2,}")
+N_FEATURES = 2 ** 18
+STOP_WORDS = frozenset("""
+a about after all also an and any are as at be been but by can for from has have in into is it its
+near no not of on or our out over reported so than that the their there these this to under up was
+were will with
+""".split())
+
+# (sorted feature indices, L2-normalized weights)
+SparseVector = Tuple[np.ndarray, np.ndarray]
+
+
+class HashingVectorizer:
+    """Stateless bag-of-words vectorizer: tokens are hashed into a fixed feature space.
+
+    Nothing has to be fitted, so vectors computed in different processes or
+    before a restart stay comparable. Term weights are sublinear (1 + log tf).
+    """
+
+    def __init__(self, n_features: int = N_FEATURES, stop_words: Iterable[str] = STOP_WORDS):
+        self.n_features = n_features
+        self.stop_words = frozenset(stop_words)
+
+    def transform(self, text: Optional[str]) -> SparseVector:
+        counts = Counter(
+            zlib.crc32(token.encode()) % self.n_features
+            for token in TOKEN_PATTERN.findall((text or "").lower())
+            if token not in self.stop_words
+        )
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        indices = np.array(sorted(counts), dtype=np.int64)
+        values = np.array([1 + math.log(counts[i]) for i in indices.tolist()], dtype=np.float64)
+        return indices, values / np.linalg.norm(values)
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    return float(SparseRows.from_vectors([b]).dot(a)[0])
+
+
+class SparseRows:
+    """Row-compressed stack of sparse vectors (one row per candidate event)."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_vectors(cls, vectors: List[SparseVector]) -> "SparseRows":
+        lengths = [len(indices) for indices, _ in vectors]
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        if not vectors:
+            return cls(indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+        return cls(
+            indptr,
+            np.concatenate([indices for indices, _ in vectors]),
+            np.concatenate([values for _, values in vectors])
+        )
+
+    def dot(self, vector: SparseVector) -> np.ndarray:
+        """Sparse matrix-vector product; cosine similarities when rows and vector are normalized."""
+        query_indices, query_values = vector
+        if not len(query_indices) or not len(self.indices):
+            return np.zeros(len(self))
+        positions = np.minimum(np.searchsorted(query_indices, self.indices), len(query_indices) - 1)
+        products = np.where(query_indices[positions] == self.indices, self.values * query_values[positions], 0.0)
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return np.bincount(rows, weights=products, minlength=len(self))
+
+
+class DescriptionVectors:
+    """LRU cache of event description vectors.
+
+    ORM hooks keep it current as descriptions are written in this process;
+    events missing from it are loaded in one query when first scored.
+    """
+
+    def __init__(self, max_size: int = 50000, vectorizer: Optional[HashingVectorizer] = None):
+        self.max_size = max_size
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries: "OrderedDict[int, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, event_id: int, description: Optional[str]) -> None:
+        """Record a new description; its vector is computed when first needed."""
+        with self._lock:
+            self._entries[event_id] = [description, None]
+            self._entries.move_to_end(event_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, event_id: int) -> None:
+        with self._lock:
+            self._entries.pop(event_id, None)
+
+    def rows(self, db: Session, event_ids: List[int]) -> SparseRows:
+        """Description vectors for ``event_ids``, in order."""
+        with self._lock:
+            missing = [event_id for event_id in event_ids if event_id not in self._entries]
+            self.stats["misses"] += len(missing)
+            self.stats["hits"] += len(event_ids) - len(missing)
+        if missing:
+            for event_id, description in db.execute(
+                select(models.Event.id, models.Event.description).where(models.Event.id.in_(missing))
+            ):
+                self.put(event_id, description)
+
+        vectors = []
+        with self._lock:
+            for event_id in event_ids:
+                entry = self._entries.get(event_id)
+                if entry is None:
+                    vectors.append(self.vectorizer.transform(None))
+                    continue
+                if entry[1] is None:
+                    entry[1] = self.vectorizer.transform(entry[0])
+                self._entries.move_to_end(event_id)
+                vectors.append(entry[1])
+        return SparseRows.from_vectors(vectors)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            **self.stats
+        }
+
+
+description_vectors = DescriptionVectors(max_size=settings.text_vector_cache_size)
+
+
+@event.listens_for(models.Event, "after_insert")
+def remember_new_event_description(mapper, connection, target):
+    description_vectors.put(target.id, target.description)
+
+
+@event.listens_for(models.Event, "after_update")
+def remember_event_description(mapper, connection, target):
+    if inspect(target).attrs.description.history.has_changes():
+        description_vectors.put(target.id, target.description)
+        shared_state.publish_on_commit(object_session(target), shared_state.DESCRIPTION_CHANGED, event_id=target.id)
+
+
+@event.listens_for(models.Event, "after_delete")
+def forget_event_description(mapper, connection, target):
+    description_vectors.discard(target.id)
+    shared_state.publish_on_commit(object_session(target), shared_state.DESCRIPTION_CHANGED, event_id=target.id)
+
+
+def forget_shared_description(fields: dict) -> None:
+    """Another worker changed a description; reload it from the database when next needed."""
+    description_vectors.discard(fields["event_id"])
+
+
+shared_state.shared_state.on(shared_state.DESCRIPTION_CHANGED, forget_shared_description)
@@ -0,0 +1,106 @@
+"""Cold-start benchmark: how long ``import app.main`` takes in a fresh interpreter.
+
+Imports the app ``--runs`` times in new processes with ``-X importtime`` and
+prints the median total and the packages that take longest to import. Fails (exit 1) when:
+
+- the median exceeds ``--budget-ms``;
+- importing pulls in a module that must load lazily (``--forbid``);
+- importing touches the database (the SQLite file must not be created).
+
+Usage: python -m benchmarks.bench_import [--runs 5] [--budget-ms 3000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded on first use, never by the import itself
+LAZY_MODULES = ["openai", "alembic", "sklearn"]
+
+
+def import_once(env: dict) -> tuple:
+    """Import app.main in a new interpreter; returns (total ms, {package: ms}, loaded modules).
+
+    A package's time is the cumulative time of its slowest module import,
+    which includes everything that import pulled in.
+    """
+    code = "import sys, app.main; print('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import app.main failed:\n{result.stderr[-2000:]}")
+    total, packages = 0.0, defaultdict(float)
+    for line in result.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        ms = int(cumulative) / 1000
+        if not name.startswith("  "):  # top level: not nested in another import
+            total += ms
+        package = name.strip().split(".")[0]
+        packages[package] = max(packages[package], ms)
+    return total, packages, set(result.stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=3000)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--forbid", nargs="*", default=LAZY_MODULES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Path(tmp) / "untouched.db"
+        env = {
+            "SECRET_KEY": "benchmark",
+            "ALGORITHM": "HS256",
+            "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+            "OPENAI_API_KEY": "benchmark",
+            "ORGANIZATION_ID": "benchmark",
+            **os.environ,
+            # A database nothing else uses, so any connection at import shows up as a new file
+            "DATABASE_URL": f"sqlite:///{database}",
+        }
+        # Only the first run compiles bytecode; report warm-cache imports like a restarted worker sees
+        import_once(env)
+        totals, per_package, loaded = [], defaultdict(list), set()
+        for _ in range(args.runs):
+            total, packages, loaded = import_once(env)
+            totals.append(total)
+            for name, ms in packages.items():
+                per_package[name].append(ms)
+        touched = database.exists()
+
+    median = statistics.median(totals)
+    print(f"import app.main: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms")
+    slowest = sorted(per_package.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+    for name, times in slowest:
+        print(f"  {statistics.median(times):8.1f} ms  {name}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    eager = sorted(name for name in args.forbid if name in loaded)
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if touched:
+        failures.append("importing app.main opened the database")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Benchmark the hot report/event queries before and after the 0003 index migration.
+
+Seeds the configured database with ``--reports`` reports (10 per event) spread
+over ``--days`` days, on first run (reused afterwards). Then it times each query
+and prints its plan at revision 0002, upgrades to 0003, and does the same again.
+
+Usage: python -m benchmarks.bench_indexes [--reports 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("ORGANIZATION_ID", "benchmark")
+
+from alembic import command  # noqa: E402
+from alembic.runtime.migration import MigrationContext  # noqa: E402
+from sqlalchemy import event, func, insert, select, text  # noqa: E402
+
+from app import geohash, models, queries  # noqa: E402
+from app.database import SessionLocal, get_engine, migration_config  # noqa: E402
+
+BEFORE, AFTER = "0002", "0003"
+BATCH = 50_000
+LOCATIONS = 10_000
+REPORTS_PER_EVENT = 10
+TAGS = ["flood", "water", "rain", "fire", "smoke", "storm", "ice", "wind"]
+
+
+def current_revision():
+    with get_engine().connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def move_to(revision):
+    current = current_revision()
+    if current is None:
+        command.upgrade(migration_config(), revision)
+    elif current != revision:
+        # Upgrades are applied in order; moving back undoes everything after ``revision``
+        revisions = [BEFORE, AFTER]
+        if current in revisions and revisions.index(current) < revisions.index(revision):
+            command.upgrade(migration_config(), revision)
+        else:
+            command.downgrade(migration_config(), revision)
+
+
+def seed(db, count, days):
+    if not db.scalar(select(func.count()).select_from(models.Location)):
+        rows = []
+        for i in range(LOCATIONS):
+            latitude, longitude = random.uniform(25.0, 49.0), random.uniform(-124.0, -67.0)
+            rows.append({"id": i + 1, "name": f"bench-{i}", "latitude": latitude, "longitude": longitude,
+                         "geohash": geohash.encode(latitude, longitude)})
+        db.execute(insert(models.Location), rows)
+    existing = db.scalar(select(func.count()).select_from(models.Report))
+    now = datetime.now(timezone.utc)
+    for start in range(existing - existing % REPORTS_PER_EVENT, count, BATCH):
+        reports, events, links = [], [], []
+        for event_start in range(start, min(start + BATCH, count), REPORTS_PER_EVENT):
+            event_id = event_start // REPORTS_PER_EVENT + 1
+            location_id = random.randint(1, LOCATIONS)
+            tags = random.sample(TAGS, 2)
+            created_at = now - timedelta(days=random.uniform(0, days))
+            for report_id in range(event_start + 1, event_start + REPORTS_PER_EVENT + 1):
+                created_at += timedelta(minutes=random.uniform(0, 15))
+                reports.append({"id": report_id, "content": f"bench report {report_id}", "tags": tags,
+                                "severity": str(random.randint(1, 5)), "created_at": created_at,
+                                "location_id": location_id})
+                links.append({"event_id": event_id, "report_id": report_id})
+            events.append({"id": event_id, "description": f"bench event {event_id}", "tags": tags,
+                           "created_at": reports[-REPORTS_PER_EVENT]["created_at"], "location_id": location_id,
+                           "last_report_at": created_at, "last_lat": None, "last_lon": None, "last_tags": tags})
+        db.execute(insert(models.Event), events)
+        db.execute(insert(models.Report), reports)
+        db.execute(insert(models.event_reports), links)
+        db.commit()
+        print(f"  seeded {min(start + BATCH, count)}/{count} reports")
+    db.execute(
+        models.Event.__table__.update()
+        .where(models.Event.last_lat.is_(None))
+        .values(
+            last_lat=select(models.Location.latitude).where(models.Location.id == models.Event.location_id)
+            .scalar_subquery(),
+            last_lon=select(models.Location.longitude).where(models.Location.id == models.Event.location_id)
+            .scalar_subquery()
+        )
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Rows were inserted with explicit ids; move the sequences past them
+        for table in ("locations", "reports", "events"):
+            db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+    db.commit()
+    return max(existing, count)
+
+
+def hot_queries(db):
+    """Name -> callable running one query, with the ids it looks up drawn once.
+
+    The statements are written out here with the plain report_id join, so they
+    run at both revisions (report_created_at, added in 0004, joins on top).
+    """
+    event_reports = models.event_reports
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    events = db.scalar(select(func.max(models.Event.id)))
+    reports = db.scalar(select(func.max(models.Report.id)))
+    event_ids = random.sample(range(1, events + 1), 20)
+    report_ids = random.sample(range(1, reports + 1), 20)
+    window = (
+        select(models.Report.id, event_reports.c.event_id, models.Location.latitude, models.Location.longitude,
+               models.Report.created_at, models.Report.content)
+        .join(event_reports, event_reports.c.report_id == models.Report.id)
+        .join(models.Location, models.Location.id == models.Report.location_id)
+        .where(models.Report.created_at >= since)
+        .order_by(models.Report.created_at)
+    )
+    event_reports_stmt = (
+        select(event_reports.c.event_id, models.Report.id, models.Report.created_at)
+        .join(event_reports, event_reports.c.report_id == models.Report.id)
+        .where(event_reports.c.event_id.in_(event_ids))
+        .order_by(event_reports.c.event_id, models.Report.created_at.desc())
+    )
+    report_events = select(event_reports.c.event_id).where(event_reports.c.report_id.in_(report_ids))
+    return {
+        "24h report window": lambda: db.execute(window).all(),
+        "active events (recent_event_rows)": lambda: queries.recent_event_rows(db, since),
+        "event -> reports, 20 events": lambda: db.execute(event_reports_stmt).all(),
+        "report -> events, 20 reports": lambda: db.execute(report_events).all(),
+    }
+
+
+def explain(db, run):
+    """Plan of the last statement ``run`` sends to the database."""
+    connection = db.connection()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    statement, parameters = captured[-1]
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+
+
+def measure(db, repeat):
+    db.execute(text("ANALYZE"))
+    db.commit()
+    random.seed(1)
+    results = {}
+    for name, run in hot_queries(db).items():
+        run()  # warm the cache
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+        results[name] = statistics.median(latencies) * 1000
+        print(f"  {name:40s} p50 {results[name]:9.2f} ms")
+        for line in explain(db, run):
+            print(f"      {line}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=1_000_000)
+    parser.add_argument("--days", type=float, default=90)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    move_to(BEFORE)
+    db = SessionLocal()
+    try:
+        total = seed(db, args.reports, args.days)
+        print(f"{total} reports, {total // REPORTS_PER_EVENT} events ({get_engine().dialect.name})")
+        print(f"before (revision {BEFORE}):")
+        before = measure(db, args.repeat)
+    finally:
+        db.close()
+
+    move_to(AFTER)
+    db = SessionLocal()
+    try:
+        print(f"after (revision {AFTER}):")
+        after = measure(db, args.repeat)
+    finally:
+        db.close()
+
+    print(f"{'query':40s} {'before':>10s} {'after':>10s} {'speedup':>8s}")
+    for name in before:
+        print(f"{name:40s} {before[name]:8.2f}ms {after[name]:8.2f}ms {before[name] / after[name]:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
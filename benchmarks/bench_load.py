@@ -0,0 +1,83 @@
+"""Load benchmark: requests/sec and latency percentiles against a running server (needs httpx).
+
+Start the server once per database mode and run the benchmark against each:
+
+    DATABASE_MODE=sync  uvicorn app.main:app --port 8001
+    python -m benchmarks.bench_load --url http://localhost:8001
+
+    DATABASE_MODE=async uvicorn app.main:app --port 8001
+    python -m benchmarks.bench_load --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def setup(client: httpx.AsyncClient):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    await client.post("/users/", json={
+        "email": email, "name": "Bench", "phone": "0", "userType": "USER",
+        "password": "benchpass", "agreeTerms": True
+    })
+    response = await client.post("/token", data={"username": email, "password": "benchpass"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.post("/locations/", headers=headers, json={
+        "name": "Bench", "latitude": 40.7, "longitude": -74.0
+    })
+    return headers, response.json()["id"]
+
+
+async def run(url: str, scenario: str, requests: int, concurrency: int):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        headers, location_id = await setup(client)
+
+        async def one():
+            if scenario == "events":
+                response = await client.get("/events/", headers=headers)
+            else:
+                response = await client.post("/reports/", headers=headers, json={
+                    "content": f"Benchmark report {random.random()}",
+                    "tags": random.sample(["flood", "fire", "smoke", "water"], 2),
+                    "severity": random.randint(0, 3),
+                    "location_id": location_id
+                })
+            response.raise_for_status()
+
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                start = time.perf_counter()
+                await one()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{scenario}: {requests} requests, concurrency {concurrency}")
+    print(f"  requests/sec: {requests / elapsed:.1f}")
+    print(f"  p50: {statistics.median(latencies) * 1000:.1f} ms  p99: {p99 * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--scenario", choices=["events", "reports"], nargs="+", default=["reports", "events"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    for scenario in args.scenario:
+        asyncio.run(run(args.url, scenario, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark the geohash-indexed radius query against a naive full scan of locations.
+
+Seeds the configured database with ``--locations`` rows on first run (reused afterwards).
+
+Usage: python -m benchmarks.bench_nearby [--locations 1000000] [--radius-km 5]
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("ORGANIZATION_ID", "benchmark")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app import geohash, models, queries  # noqa: E402
+from app.database import SessionLocal, migrate  # noqa: E402
+
+BATCH = 50_000
+
+
+def seed(db, count):
+    existing = db.scalar(select(func.count()).select_from(models.Location))
+    for start in range(existing, count, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, count)):
+            latitude = random.uniform(25.0, 49.0)
+            longitude = random.uniform(-124.0, -67.0)
+            rows.append({
+                "name": f"bench-{i}",
+                "latitude": latitude,
+                "longitude": longitude,
+                "geohash": geohash.encode(latitude, longitude)
+            })
+        db.execute(insert(models.Location), rows)
+        db.commit()
+    return max(existing, count)
+
+
+def indexed(db, latitude, longitude, radius_km):
+    rows = db.execute(
+        select(models.Location.id, models.Location.latitude, models.Location.longitude)
+        .where(queries.within_geohash_cover(latitude, longitude, radius_km))
+    ).all()
+    return queries.refine_by_distance(rows, latitude, longitude, radius_km)
+
+
+def full_scan(db, latitude, longitude, radius_km):
+    rows = db.execute(select(models.Location.id, models.Location.latitude, models.Location.longitude)).all()
+    return queries.refine_by_distance(rows, latitude, longitude, radius_km)
+
+
+def timed(fn, points):
+    latencies = []
+    results = []
+    for point in points:
+        start = time.perf_counter()
+        results.append({item for item, _ in fn(*point)})
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=1_000_000)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--scan-queries", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    migrate()
+    db = SessionLocal()
+    try:
+        total = seed(db, args.locations)
+        points = [(random.uniform(26.0, 48.0), random.uniform(-123.0, -68.0)) for _ in range(args.queries)]
+
+        fast, fast_results = timed(lambda lat, lon: indexed(db, lat, lon, args.radius_km), points)
+        scan_points = points[:args.scan_queries]
+        slow, slow_results = timed(lambda lat, lon: full_scan(db, lat, lon, args.radius_km), scan_points)
+        assert fast_results[:len(slow_results)] == slow_results, "indexed query missed locations"
+
+        print(f"{total} locations, radius {args.radius_km} km")
+        print(f"  geohash index: p50 {fast[len(fast) // 2] * 1000:8.2f} ms  "
+              f"p99 {fast[min(len(fast) - 1, int(len(fast) * 0.99))] * 1000:8.2f} ms  ({len(fast)} queries)")
+        print(f"  full scan:     p50 {slow[len(slow) // 2] * 1000:8.2f} ms  ({len(slow)} queries)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
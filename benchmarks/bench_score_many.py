@@ -0,0 +1,81 @@
+"""Micro-benchmark for HybridCorrelator.score_many versus per-pair scoring.
+
+Usage: python -m benchmarks.bench_score_many
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("ORGANIZATION_ID", "benchmark")
+
+from app.correlation import CandidateBatch, HybridCorrelator  # noqa: E402
+from app.spatial_index import IndexEntry  # noqa: E402
+
+TAGS = ["flood", "water", "rain", "storm", "fire", "smoke", "burning", "heat",
+        "chemical", "spill", "toxic", "hazmat", "traffic", "accident", "collision", "roadblock"]
+SIZES = [10, 1_000, 100_000]
+
+
+def make_report(now):
+    location = SimpleNamespace(latitude=40.7, longitude=-74.0)
+    return SimpleNamespace(location=location, created_at=now, tags=random.sample(TAGS, 3))
+
+
+def make_entries(count, now):
+    return [
+        IndexEntry(
+            i,
+            40.7 + random.uniform(-0.05, 0.05),
+            -74.0 + random.uniform(-0.05, 0.05),
+            now - timedelta(hours=random.uniform(0, 24)),
+            random.sample(TAGS, random.randint(1, 4))
+        )
+        for i in range(count)
+    ]
+
+
+def scalar_scores(correlator, report, entries):
+    scores = []
+    for entry in entries:
+        other = SimpleNamespace(
+            location=SimpleNamespace(latitude=entry.latitude, longitude=entry.longitude),
+            created_at=entry.created_at,
+            tags=entry.tags
+        )
+        scores.append(correlator.get_correlation_score(report, other))
+    return scores
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    random.seed(0)
+    correlator = HybridCorrelator()
+    now = datetime.now(timezone.utc)
+    report = make_report(now)
+
+    print(f"{'candidates':>10} {'scalar ns/cand':>15} {'vector ns/cand':>15} {'speedup':>8}")
+    for size in SIZES:
+        entries = make_entries(size, now)
+        batch = CandidateBatch.from_entries(entries, correlator.vocabulary)
+        repeat = max(1, 100_000 // size)
+
+        scalar = timed(lambda: scalar_scores(correlator, report, entries), max(1, repeat // 10))
+        vector = timed(lambda: correlator.score_many(report, batch), repeat)
+        print(f"{size:>10} {scalar / size * 1e9:>15.0f} {vector / size * 1e9:>15.0f} {scalar / vector:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
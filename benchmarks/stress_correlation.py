@@ -0,0 +1,81 @@
+"""Concurrent-ingest stress test: simultaneous reports of one hazard must land in one event.
+
+Creates ``--sites`` locations far apart, fires ``--reports`` identical-hazard
+reports at each of them concurrently, and checks that every site ends up
+with exactly one event holding all of its reports. Exits non-zero otherwise.
+Run it against a server, e.g. several workers sharing Postgres:
+
+    uvicorn app.main:app --port 8001 --workers 4
+    python -m benchmarks.stress_correlation --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load import setup
+
+
+async def run(url: str, sites: int, reports: int, concurrency: int) -> bool:
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        headers, _ = await setup(client)
+        # Fresh coordinates per run, so events left by earlier runs cannot absorb these reports
+        base_lat, base_lon = random.uniform(-50, 50), random.uniform(-150, 150)
+        location_ids = []
+        for site in range(sites):
+            response = await client.post("/locations/", headers=headers, json={
+                "name": f"Stress {site}", "latitude": base_lat, "longitude": base_lon + site * 0.5
+            })
+            response.raise_for_status()
+            location_ids.append(response.json()["id"])
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def submit(location_id: int, n: int):
+            async with semaphore:
+                response = await client.post("/reports/", headers=headers, json={
+                    "content": f"Water over the road and rising, report {n} from site {location_id}",
+                    "tags": ["flood", "water"],
+                    "severity": 3,
+                    "location_id": location_id
+                })
+                response.raise_for_status()
+
+        jobs = [submit(location_id, n) for n in range(reports) for location_id in location_ids]
+        random.shuffle(jobs)
+        start = time.perf_counter()
+        await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - start
+        print(f"{len(jobs)} reports at {sites} sites in {elapsed:.1f}s ({len(jobs) / elapsed:.1f} reports/sec)")
+
+        ok = True
+        for location_id in location_ids:
+            response = await client.get("/events/", headers=headers, params={
+                "location_id": location_id, "reports": "ids", "limit": 500
+            })
+            response.raise_for_status()
+            events = response.json()
+            attached = sum(event["report_count"] for event in events)
+            if len(events) != 1 or attached != reports:
+                ok = False
+                print(f"  location {location_id}: {len(events)} events holding {attached}/{reports} reports")
+        print("OK: one event per site" if ok else "FAILED: reports of one hazard split across events")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--sites", type=int, default=10)
+    parser.add_argument("--reports", type=int, default=20, help="reports per site")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    if not asyncio.run(run(args.url, args.sites, args.reports, args.concurrency)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
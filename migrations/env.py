@@ -0,0 +1,75 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, inspect, pool, text
+
+from app import models
+from app.config import get_settings
+
+config = context.config
+
+# Skipped when migrating from inside the app (database.migrate), which has its own logging
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+database_url = get_settings().database_url
+
+# Databases created by the app before it had migrations hold at least the
+# baseline tables of this revision (and possibly some later ones, see 0002)
+CREATE_ALL_REVISION = "0001"
+BASELINE_TABLES = ("users", "locations", "reports", "events", "event_reports")
+
+# Held while migrating, so processes migrating at the same time take turns (Postgres)
+MIGRATION_LOCK = 7_260_001
+
+
+def stamp_create_all_database(connection, migration_context) -> None:
+    """Stamp a database created by create_all with CREATE_ALL_REVISION, so upgrades start after it."""
+    inspector = inspect(connection)
+    present = [table for table in BASELINE_TABLES if inspector.has_table(table)]
+    if not present:
+        return
+    if len(present) < len(BASELINE_TABLES):
+        missing = ", ".join(sorted(set(BASELINE_TABLES) - set(present)))
+        raise RuntimeError(f"Database has no alembic_version and only part of the baseline schema (missing {missing})")
+    migration_context.stamp(context.script, CREATE_ALL_REVISION)
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(database_url, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite cannot ALTER most things; batch mode recreates the table instead
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK})
+            migration_context = context.get_context()
+            if migration_context.get_current_revision() is None:
+                stamp_create_all_database(connection, migration_context)
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,223 @@
+"""columns, tables and indexes added while the app still used create_all
+
+Until migrations existed, the app only ran create_all at startup. That
+creates missing tables but never alters existing ones, so databases from
+that time hold the baseline schema (0001) plus whichever later tables
+happened to be created. This revision brings any of them to the same
+schema:
+
+- events.last_report_at, last_lat, last_lon, last_tags (the denormalized
+  latest report) and corroboration_count
+- locations.geohash, alert_score, alert_updated_at
+- the ai_cache and report_rollups tables
+- the list, filter and correlation indexes
+
+Every step is skipped when its column, table or index already exists.
+The latest-report columns, geohashes and rollups are backfilled from the
+existing rows. Alert scores start at 0 and build up from new reports.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:37.211846
+
+"""
+from collections import Counter
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import geohash
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Postgres stores tags as a native array; SQLite (local runs) falls back to JSON
+TAG_LIST = sa.ARRAY(sa.String()).with_variant(sa.JSON(), 'sqlite')
+
+# Rows read and written per statement when backfilling
+BATCH_SIZE = 10000
+
+
+def new_columns():
+    """The added columns, by table (new objects each call: a Column belongs to one table)."""
+    return {
+        'events': [
+            sa.Column('last_report_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('last_lat', sa.Float(), nullable=True),
+            sa.Column('last_lon', sa.Float(), nullable=True),
+            sa.Column('last_tags', TAG_LIST, nullable=True),
+            sa.Column('corroboration_count', sa.Integer(), server_default='0', nullable=True),
+        ],
+        'locations': [
+            sa.Column('alert_score', sa.Float(), server_default='0', nullable=True),
+            sa.Column('alert_updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('geohash', sa.String(length=9), nullable=True),
+        ],
+    }
+
+
+# (name, table, columns, postgres index method)
+INDEXES = [
+    ('ix_locations_geohash', 'locations', ['geohash'], None),
+    ('ix_locations_lat_lon', 'locations', ['latitude', 'longitude'], None),
+    ('ix_events_created_at_id', 'events', ['created_at', 'id'], None),
+    ('ix_events_last_report_at', 'events', ['last_report_at'], None),
+    ('ix_events_location_created_at', 'events', ['location_id', 'created_at'], None),
+    ('ix_events_tags', 'events', ['tags'], 'gin'),
+    ('ix_reports_created_at_id', 'reports', ['created_at', 'id'], None),
+    ('ix_reports_location_created_at', 'reports', ['location_id', 'created_at'], None),
+    ('ix_reports_tags', 'reports', ['tags'], 'gin'),
+]
+
+locations = sa.table(
+    'locations',
+    sa.column('id', sa.Integer()),
+    sa.column('latitude', sa.Float()),
+    sa.column('longitude', sa.Float()),
+    sa.column('geohash', sa.String()),
+)
+reports = sa.table(
+    'reports',
+    sa.column('location_id', sa.Integer()),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+    sa.column('tags', TAG_LIST),
+    sa.column('severity', sa.String()),
+)
+report_rollups = sa.table(
+    'report_rollups',
+    sa.column('location_id', sa.Integer()),
+    sa.column('hour', sa.DateTime(timezone=True)),
+    sa.column('tag', sa.String()),
+    sa.column('severity', sa.String()),
+    sa.column('count', sa.Integer()),
+)
+
+
+def create_missing_tables(inspector) -> None:
+    if not inspector.has_table('ai_cache'):
+        op.create_table('ai_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+    if not inspector.has_table('report_rollups'):
+        op.create_table('report_rollups',
+        sa.Column('location_id', sa.Integer(), nullable=False),
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('severity', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('location_id', 'hour', 'tag', 'severity')
+        )
+        op.create_index('ix_report_rollups_hour', 'report_rollups', ['hour'], unique=False)
+        op.create_index('ix_report_rollups_tag_hour', 'report_rollups', ['tag', 'hour'], unique=False)
+
+
+def add_missing_columns(inspector) -> None:
+    for table, columns in new_columns().items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+
+def create_missing_indexes(inspector) -> None:
+    for name, table, columns, method in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False, postgresql_using=method)
+
+
+def backfill_latest_reports() -> None:
+    # The same latest report per event as queries.latest_report_rows
+    op.execute(
+        "UPDATE events SET (last_report_at, last_lat, last_lon, last_tags) = ("
+        "SELECT r.created_at, loc.latitude, loc.longitude, r.tags "
+        "FROM event_reports l "
+        "JOIN reports r ON r.id = l.report_id "
+        "JOIN locations loc ON loc.id = r.location_id "
+        "WHERE l.event_id = events.id "
+        "ORDER BY r.created_at DESC, r.id DESC LIMIT 1"
+        ") WHERE last_report_at IS NULL"
+    )
+    if op.get_bind().dialect.name == "sqlite":
+        # Copied CURRENT_TIMESTAMP text has no fraction; SQLAlchemy writes and binds six digits
+        op.execute("UPDATE events SET last_report_at = last_report_at || '.000000' WHERE length(last_report_at) = 19")
+
+
+def backfill_geohashes() -> None:
+    connection = op.get_bind()
+    while True:
+        rows = connection.execute(
+            sa.select(locations.c.id, locations.c.latitude, locations.c.longitude)
+            .where(locations.c.geohash.is_(None))
+            .where(locations.c.latitude.is_not(None))
+            .where(locations.c.longitude.is_not(None))
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        connection.execute(
+            sa.text("UPDATE locations SET geohash = :geohash WHERE id = :id"),
+            [{"id": row_id, "geohash": geohash.encode(latitude, longitude)} for row_id, latitude, longitude in rows]
+        )
+
+
+def rebuild_rollups() -> None:
+    """Recount every report, like ``python -m app.rollups``.
+
+    Tables created by create_all after the reports were written only count
+    the reports since, so the rollups are rebuilt even if the table exists.
+    """
+    connection = op.get_bind()
+    counts = Counter()
+    rows = connection.execute(
+        sa.select(reports.c.location_id, reports.c.created_at, reports.c.tags, reports.c.severity)
+        .where(reports.c.location_id.is_not(None))
+        .where(reports.c.created_at.is_not(None))
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for location_id, created_at, tags, severity in rows:
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc)
+        hour = created_at.replace(minute=0, second=0, microsecond=0)
+        severity = "" if severity is None else str(severity)
+        # The "" tag counts every report once (ReportRollup.ALL_TAGS)
+        for tag in ["", *sorted(set(tags or []))]:
+            counts[location_id, hour, tag, severity] += 1
+
+    connection.execute(sa.delete(report_rollups))
+    values = [
+        {"location_id": location_id, "hour": hour, "tag": tag, "severity": severity, "count": count}
+        for (location_id, hour, tag, severity), count in counts.items()
+    ]
+    for i in range(0, len(values), BATCH_SIZE):
+        connection.execute(sa.insert(report_rollups), values[i:i + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    create_missing_tables(inspector)
+    add_missing_columns(inspector)
+    create_missing_indexes(inspector)
+    backfill_latest_reports()
+    backfill_geohashes()
+    rebuild_rollups()
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, columns in new_columns().items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in reversed(columns):
+                batch_op.drop_column(column.name)
+    op.drop_table('report_rollups')
+    op.drop_table('ai_cache')
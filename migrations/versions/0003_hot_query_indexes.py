@@ -0,0 +1,65 @@
+"""event_reports primary key and indexes for the hot queries
+
+- event_reports gets a primary key on (event_id, report_id), which serves
+  event -> reports (embedded reports, Event.reports), and an index on
+  (report_id, event_id) for report -> events (the 24h correlation window,
+  latest-report lookups, report deletion). Duplicate and half-empty links
+  are removed first.
+- ix_events_last_report_at covers the candidate columns of the active-event
+  window, so Postgres can answer it with an index-only scan.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:12:05.417336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def remove_duplicate_links() -> None:
+    op.execute("DELETE FROM event_reports WHERE event_id IS NULL OR report_id IS NULL")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "DELETE FROM event_reports a USING event_reports b "
+            "WHERE a.event_id = b.event_id AND a.report_id = b.report_id AND a.ctid > b.ctid"
+        )
+    else:
+        op.execute(
+            "DELETE FROM event_reports WHERE rowid NOT IN "
+            "(SELECT MIN(rowid) FROM event_reports GROUP BY event_id, report_id)"
+        )
+
+
+def upgrade() -> None:
+    remove_duplicate_links()
+    # SQLite cannot add a primary key in place; batch mode rebuilds the table there
+    with op.batch_alter_table('event_reports', schema=None) as batch_op:
+        batch_op.alter_column('event_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('report_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('event_reports_pkey', ['event_id', 'report_id'])
+    op.create_index('ix_event_reports_report_id_event_id', 'event_reports', ['report_id', 'event_id'], unique=False)
+
+    op.drop_index('ix_events_last_report_at', table_name='events')
+    op.create_index('ix_events_last_report_at', 'events', ['last_report_at'], unique=False,
+                    postgresql_include=['id', 'last_lat', 'last_lon', 'last_tags'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_last_report_at', table_name='events')
+    op.create_index('ix_events_last_report_at', 'events', ['last_report_at'], unique=False)
+
+    op.drop_index('ix_event_reports_report_id_event_id', table_name='event_reports')
+    with op.batch_alter_table('event_reports', schema=None) as batch_op:
+        batch_op.drop_constraint('event_reports_pkey', type_='primary')
+        batch_op.alter_column('report_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('event_id', existing_type=sa.Integer(), nullable=True)
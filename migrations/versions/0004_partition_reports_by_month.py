@@ -0,0 +1,183 @@
+"""partition reports and event_reports by created_at month
+
+event_reports gains report_created_at, a copy of its report's created_at.
+reports.created_at becomes NOT NULL.
+
+On Postgres, both tables are rebuilt as range-partitioned tables with one
+partition per month, named <table>_YYYY_MM. The partitions cover the
+months with data, up to PARTITION_MONTHS_AHEAD months past the current
+one; app.retention creates later ones and detaches old ones. The primary
+keys and the link -> report foreign key include the partition key.
+
+On SQLite (local runs), the tables stay unpartitioned. Its created_at
+values are rewritten in SQLAlchemy's text format, because link rows are
+matched on that text.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:40:52.902113
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_MONTHS_AHEAD = 3
+
+REPORT_COLUMNS = "id, content, tags, severity, created_at, user_id, location_id"
+
+
+def months(first: datetime, last: datetime):
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def create_partition(table: str, year: int, month: int) -> None:
+    start = f"{year:04d}-{month:02d}-01"
+    end = f"{year + 1:04d}-01-01" if month == 12 else f"{year:04d}-{month + 1:02d}-01"
+    op.execute(
+        f"CREATE TABLE {table}_{year:04d}_{month:02d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')"
+    )
+
+
+def create_report_indexes() -> None:
+    op.create_index('ix_reports_id', 'reports', ['id'], unique=False)
+    op.create_index('ix_reports_created_at_id', 'reports', ['created_at', 'id'], unique=False)
+    op.create_index('ix_reports_location_created_at', 'reports', ['location_id', 'created_at'], unique=False)
+    op.create_index('ix_reports_tags', 'reports', ['tags'], unique=False, postgresql_using='gin')
+    op.create_index('ix_event_reports_report_id_event_id', 'event_reports', ['report_id', 'event_id'], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        upgrade_unpartitioned()
+        return
+
+    op.execute("LOCK TABLE reports, event_reports IN ACCESS EXCLUSIVE MODE")
+    op.execute("UPDATE reports SET created_at = now() WHERE created_at IS NULL")
+    op.rename_table('event_reports', 'event_reports_unpartitioned')
+    op.rename_table('reports', 'reports_unpartitioned')
+    # The id sequence would be dropped with the old table
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY NONE")
+
+    op.execute(
+        "CREATE TABLE reports ("
+        "id INTEGER NOT NULL DEFAULT nextval('reports_id_seq'), "
+        "content VARCHAR, "
+        "tags VARCHAR[], "
+        "severity VARCHAR, "
+        "created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), "
+        "user_id INTEGER, "
+        "location_id INTEGER"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute(
+        "CREATE TABLE event_reports ("
+        "event_id INTEGER NOT NULL, "
+        "report_id INTEGER NOT NULL, "
+        "report_created_at TIMESTAMP WITH TIME ZONE NOT NULL"
+        ") PARTITION BY RANGE (report_created_at)"
+    )
+    first = op.get_bind().scalar(sa.text("SELECT min(created_at) FROM reports_unpartitioned"))
+    now = datetime.now(timezone.utc)
+    last_year, last_month = divmod(now.year * 12 + now.month - 1 + PARTITION_MONTHS_AHEAD, 12)
+    for year, month in months(first or now, datetime(last_year, last_month + 1, 1)):
+        create_partition('reports', year, month)
+        create_partition('event_reports', year, month)
+
+    op.execute(f"INSERT INTO reports ({REPORT_COLUMNS}) SELECT {REPORT_COLUMNS} FROM reports_unpartitioned")
+    op.execute(
+        "INSERT INTO event_reports (event_id, report_id, report_created_at) "
+        "SELECT l.event_id, l.report_id, r.created_at "
+        "FROM event_reports_unpartitioned l JOIN reports_unpartitioned r ON r.id = l.report_id"
+    )
+    op.drop_table('event_reports_unpartitioned')
+    op.drop_table('reports_unpartitioned')
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY reports.id")
+
+    # Keys and indexes go on the parents, which create them on every partition
+    op.create_primary_key('reports_pkey', 'reports', ['id', 'created_at'])
+    op.create_primary_key('event_reports_pkey', 'event_reports', ['event_id', 'report_id', 'report_created_at'])
+    op.create_foreign_key('reports_user_id_fkey', 'reports', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('reports_location_id_fkey', 'reports', 'locations', ['location_id'], ['id'])
+    op.create_foreign_key('event_reports_event_id_fkey', 'event_reports', 'events', ['event_id'], ['id'])
+    op.create_foreign_key('event_reports_report_id_fkey', 'event_reports', 'reports',
+                          ['report_id', 'report_created_at'], ['id', 'created_at'])
+    create_report_indexes()
+
+
+def upgrade_unpartitioned() -> None:
+    op.execute("UPDATE reports SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    # CURRENT_TIMESTAMP text has no fraction; SQLAlchemy writes and binds six digits
+    op.execute("UPDATE reports SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+    with op.batch_alter_table('event_reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('report_created_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE event_reports SET report_created_at = "
+        "(SELECT created_at FROM reports WHERE reports.id = event_reports.report_id)"
+    )
+    op.execute("DELETE FROM event_reports WHERE report_created_at IS NULL")
+    with op.batch_alter_table('event_reports', schema=None) as batch_op:
+        batch_op.alter_column('report_created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        with op.batch_alter_table('reports', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+        with op.batch_alter_table('event_reports', schema=None) as batch_op:
+            batch_op.drop_column('report_created_at')
+        return
+
+    op.execute("LOCK TABLE reports, event_reports IN ACCESS EXCLUSIVE MODE")
+    op.rename_table('event_reports', 'event_reports_partitioned')
+    op.rename_table('reports', 'reports_partitioned')
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY NONE")
+    for name in ('ix_reports_id', 'ix_reports_created_at_id', 'ix_reports_location_created_at',
+                 'ix_reports_tags', 'ix_event_reports_report_id_event_id'):
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_partitioned")
+    op.execute("ALTER TABLE event_reports_partitioned RENAME CONSTRAINT event_reports_pkey TO event_reports_partitioned_pkey")
+    op.execute("ALTER TABLE reports_partitioned RENAME CONSTRAINT reports_pkey TO reports_partitioned_pkey")
+
+    op.create_table('reports',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('reports_id_seq')"), nullable=False),
+    sa.Column('content', sa.String(), nullable=True),
+    sa.Column('tags', sa.ARRAY(sa.String()), nullable=True),
+    sa.Column('severity', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('location_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', name='reports_pkey')
+    )
+    op.create_table('event_reports',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.ForeignKeyConstraint(['report_id'], ['reports.id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'report_id', name='event_reports_pkey')
+    )
+    op.execute(f"INSERT INTO reports ({REPORT_COLUMNS}) SELECT {REPORT_COLUMNS} FROM reports_partitioned")
+    op.execute(
+        "INSERT INTO event_reports (event_id, report_id) "
+        "SELECT event_id, report_id FROM event_reports_partitioned"
+    )
+    op.execute("DROP TABLE event_reports_partitioned")
+    op.execute("DROP TABLE reports_partitioned")
+    op.execute("ALTER SEQUENCE reports_id_seq OWNED BY reports.id")
+    create_report_indexes()
@@ -0,0 +1,33 @@
+"""events.created_at in SQLAlchemy's text format on SQLite
+
+Event lists paginate on the stored (created_at, id) values. SQLite keeps
+timestamps as text, and rows filled in by the CURRENT_TIMESTAMP server
+default have no fractional seconds, so they would sort before every
+client-written timestamp of the same second. They get the six digits
+SQLAlchemy writes and binds. Nothing changes on Postgres.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:12:44.630127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE events SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def downgrade() -> None:
+    # The added zeros are harmless to the previous revision
+    pass
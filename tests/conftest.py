@@ -0,0 +1,77 @@
+"""Shared fixtures: a throwaway SQLite database and the offline AI backend.
+
+The settings are read when ``app`` is first imported, so the environment is
+set up here before any test module imports it.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+_directory = tempfile.mkdtemp(prefix="hazard-tests-")
+# Always a scratch database: the fixtures drop every table
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/test.db"
+os.environ["AI_BACKEND"] = "stub"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ORGANIZATION_ID", "test")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import auth, database, event_correlation  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def db_session():
+    """A freshly migrated, empty database; yields a sync session on it."""
+    database.drop_tables()
+    database.migrate()
+    auth.user_cache.clear()
+    session = database.SessionLocal()
+    event_correlation.correlation_service.rebuild_index(session)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db_session):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    user = {"email": "tester@example.com", "name": "Tester", "phone": "555-0100",
+            "userType": "USER", "password": "correct horse", "agreeTerms": True}
+    client.post("/users/", json=user).raise_for_status()
+    response = client.post("/token", data={"username": user["email"], "password": user["password"]})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@contextmanager
+def _counting_statements():
+    engine = database.get_async_engine().sync_engine if database.AsyncSessionLocal else database.get_engine()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def count_statements():
+    """``with count_statements() as statements``: the SQL the endpoints send inside the block."""
+    return _counting_statements
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app import alerts, models
+
+
+def scores(session):
+    session.expire_all()
+    return dict(session.execute(select(models.Location.id, models.Location.alert_score)).all())
+
+
+def test_bulk_apply_matches_reports_applied_one_at_a_time(db_session):
+    # Two clusters of sites, each site within alert range of its neighbours only
+    locations = [models.Location(name=f"Site {n}", latitude=35.0 + (n // 3) * 2.0, longitude=-100.0 + (n % 3) * 0.01)
+                 for n in range(6)]
+    db_session.add_all(locations)
+    db_session.commit()
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    reports = [SimpleNamespace(location_id=locations[n % 6].id, created_at=start + timedelta(minutes=n), severity=n % 4)
+               for n in range(12)]
+
+    for report in reports:
+        alerts.apply(db_session.connection(), [report])
+    db_session.commit()
+    expected = scores(db_session)
+
+    db_session.execute(models.Location.__table__.update().values(alert_score=0, alert_updated_at=None))
+    alerts.apply(db_session.connection(), reports)
+    db_session.commit()
+
+    assert all(score > 0 for score in expected.values())
+    assert scores(db_session) == pytest.approx(expected)
@@ -0,0 +1,65 @@
+from sqlalchemy import func, select
+
+from app import main, models
+
+
+def count(db, model):
+    return db.scalar(select(func.count()).select_from(model))
+
+
+def report(location_id, n, tags=("flood",)):
+    return {"content": f"Creek over its banks and rising, report {n}", "tags": list(tags), "severity": 3,
+            "location_id": location_id}
+
+
+def test_bulk_rejects_oversized_batches(client, auth_headers, db_session, monkeypatch):
+    monkeypatch.setattr(main.settings, "bulk_reports_max", 3)
+    location = client.post("/locations/", json={"name": "Creek", "latitude": 35.0, "longitude": -100.0},
+                           headers=auth_headers).json()
+
+    response = client.post("/reports/bulk", json=[report(location["id"], n) for n in range(4)], headers=auth_headers)
+
+    assert response.status_code == 413
+    assert count(db_session, models.Report) == 0
+
+
+def test_bulk_rejects_unknown_locations(client, auth_headers, db_session):
+    location = client.post("/locations/", json={"name": "Creek", "latitude": 35.0, "longitude": -100.0},
+                           headers=auth_headers).json()
+
+    response = client.post("/reports/bulk", json=[report(location["id"], 0), report(9999, 1)], headers=auth_headers)
+
+    assert response.status_code == 422
+    assert "9999" in response.json()["detail"]
+    assert count(db_session, models.Report) == 0
+
+
+def test_bulk_batch_joins_existing_events_and_clusters_the_rest(client, auth_headers, db_session):
+    # Sites half a degree apart: far outside each other's correlation distance
+    creek, bridge, field = [
+        client.post("/locations/", json={"name": name, "latitude": 35.0, "longitude": -100.0 + n * 0.5},
+                    headers=auth_headers).json()
+        for n, name in enumerate(("Creek", "Bridge", "Field"))
+    ]
+    existing = client.post("/reports/", json=report(creek["id"], 0), headers=auth_headers).json()
+    existing_event = db_session.scalar(select(models.event_reports.c.event_id)
+                                       .where(models.event_reports.c.report_id == existing["id"]))
+
+    batch = [report(creek["id"], 1), report(bridge["id"], 2), report(creek["id"], 3),
+             report(bridge["id"], 4), report(field["id"], 5, ("fire",)), report(creek["id"], 6)]
+    response = client.post("/reports/bulk", json=batch, headers=auth_headers)
+    response.raise_for_status()
+    created = response.json()
+    assert [r["location_id"] for r in created] == [r["location_id"] for r in batch]
+
+    db_session.expire_all()
+    # The creek reports join the existing event; the bridge and field each start one
+    assert count(db_session, models.Event) == 3
+    assert count(db_session, models.event_reports) == 1 + len(batch)
+    events = {event.location_id: event for event in db_session.scalars(select(models.Event))}
+    assert events[creek["id"]].id == existing_event
+    assert sorted(r.id for r in events[creek["id"]].reports) == sorted(
+        [existing["id"]] + [r["id"] for r in created if r["location_id"] == creek["id"]])
+    assert len(events[bridge["id"]].reports) == 2
+    assert len(events[field["id"]].reports) == 1
+    assert events[field["id"]].tags == ["fire"]
@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+from sqlalchemy import event, func, select
+
+from app import database, event_correlation, models
+from app.cell_locks import CellLocks
+
+SITES = 4
+REPORTS_PER_SITE = 12
+
+
+async def ingest(location_id: int, n: int, user_id: int) -> None:
+    """What POST /reports/ does: commit the report, then correlate it."""
+    async for db in database.get_session():
+        report = models.Report(content=f"Water over the road and rising, report {n} from site {location_id}",
+                               tags=["flood", "water"], severity="3", location_id=location_id, user_id=user_id)
+        db.add(report)
+        await db.commit()
+        await db.refresh(report)
+        await event_correlation.create_or_update_event(db, report)
+
+
+async def ingest_all(jobs) -> None:
+    try:
+        await asyncio.gather(*jobs)
+    finally:
+        # Pooled async connections belong to this event loop
+        if database.AsyncSessionLocal is not None:
+            await database.get_async_engine().dispose()
+
+
+def test_simultaneous_reports_of_one_hazard_share_one_event(db_session, monkeypatch):
+    # Fresh locks: asyncio locks stay bound to the first event loop that waits on them
+    monkeypatch.setattr(event_correlation, "correlation_locks", CellLocks())
+    user = models.User(email="reporter@example.com", name="Reporter", hashed_password="-", is_active=True)
+    # Sites half a degree apart: far outside each other's correlation distance
+    locations = [models.Location(name=f"Site {n}", latitude=35.0, longitude=-100.0 + n * 0.5) for n in range(SITES)]
+    db_session.add_all([user, *locations])
+    db_session.commit()
+
+    jobs = [ingest(location.id, n, user.id) for n in range(REPORTS_PER_SITE) for location in locations]
+    random.Random(0).shuffle(jobs)
+    asyncio.run(ingest_all(jobs))
+
+    db_session.expire_all()
+    assert db_session.scalar(select(func.count()).select_from(models.Event)) == SITES
+    for location in locations:
+        events = db_session.scalars(select(models.Event).where(models.Event.location_id == location.id)).all()
+        assert len(events) == 1
+        assert len(events[0].reports) == REPORTS_PER_SITE
+
+
+def test_index_rebuild_does_not_commit_while_correlation_holds_its_locks(db_session, monkeypatch):
+    service = event_correlation.correlation_service
+    user = models.User(email="reporter@example.com", name="Reporter", hashed_password="-", is_active=True)
+    location = models.Location(name="Dam", latitude=35.0, longitude=-100.0)
+    db_session.add_all([user, location])
+    db_session.commit()
+    # An event without its latest-report columns: the rebuild fills them in
+    db_session.add(models.Event(description="Spillway overflowing onto the road", tags=["flood"],
+                                location_id=location.id,
+                                reports=[models.Report(content="Spillway overflowing onto the road",
+                                                       tags=["flood"], severity="3", location_id=location.id,
+                                                       user_id=user.id)]))
+    db_session.commit()
+    report = models.Report(content="Water still rising below the dam spillway", tags=["flood"], severity="3",
+                           location_id=location.id, user_id=user.id)
+    db_session.add(report)
+    db_session.commit()
+
+    steps = []
+    lock = service.lock_in_database
+
+    def locking(db, reports):
+        steps.append("lock")
+        lock(db, reports)
+
+    def committed(session):
+        steps.append("commit")
+
+    monkeypatch.setattr(service, "lock_in_database", locking)
+    event.listen(db_session, "after_commit", committed)
+    try:
+        service.index.clear()
+        service.create_or_update_event(db_session, report)
+    finally:
+        event.remove(db_session, "after_commit", committed)
+
+    # Only the correlation's own commit ends the transaction that holds the locks
+    assert steps[steps.index("lock"):] == ["lock", "commit"]
+    assert service.index.built
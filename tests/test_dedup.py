@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import event_correlation, models
+from app.dedup import DuplicateIndex
+
+CONTENT = "Huge sinkhole opened on Elm Street, two cars stuck"
+NEAR_COPY = "Huge sinkhole opened on Elm street - two cars stuck!"
+START = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+
+
+def test_duplicate_index_matches_near_copies_only_within_radius_and_window():
+    index = DuplicateIndex(threshold=0.8, window=timedelta(hours=6), radius_km=1.0)
+    index.add(1, 10, 35.0, -100.0, START, CONTENT)
+
+    def find(latitude, longitude, at, text=NEAR_COPY):
+        return index.find(latitude, longitude, at, index.hasher.signature(text))
+
+    assert find(35.001, -100.0, START + timedelta(minutes=30)).event_id == 10
+    # About 5 km north
+    assert find(35.045, -100.0, START + timedelta(minutes=30)) is None
+    assert find(35.0, -100.0, START + timedelta(hours=7)) is None
+    assert find(35.0, -100.0, START, "Power lines down across the highway after the storm") is None
+
+
+@pytest.fixture
+def reporting(db_session, monkeypatch):
+    """Correlate reports straight through the service, recording refresh requests."""
+    service = event_correlation.correlation_service
+    assert service.deduplicator is not None
+    dirty = []
+    monkeypatch.setattr(service, "mark_dirty", lambda event_id, line: dirty.append(event_id))
+    user = models.User(email="reporter@example.com", name="Reporter", hashed_password="-", is_active=True)
+    db_session.add(user)
+    db_session.commit()
+
+    def report(latitude, longitude, at, content):
+        location = models.Location(name="Elm Street", latitude=latitude, longitude=longitude)
+        db_session.add(location)
+        db_session.commit()
+        row = models.Report(content=content, tags=["sinkhole"], severity="3", location_id=location.id,
+                            user_id=user.id, created_at=at)
+        db_session.add(row)
+        db_session.commit()
+        return service.create_or_update_event(db_session, row)
+
+    return report, dirty
+
+
+def test_near_duplicate_corroborates_the_existing_event(reporting):
+    report, dirty = reporting
+    first = report(35.0, -100.0, START, CONTENT)
+    second = report(35.001, -100.0, START + timedelta(minutes=20), NEAR_COPY)
+
+    assert second.id == first.id
+    assert second.corroboration_count == 1
+    assert len(second.reports) == 2
+    # Corroboration adds no new information to summarize
+    assert dirty == []
+
+
+@pytest.mark.parametrize("latitude, delay", [(35.045, timedelta(minutes=20)), (35.0, timedelta(hours=7))],
+                         ids=["outside radius", "outside window"])
+def test_same_text_farther_away_or_later_is_not_a_duplicate(reporting, latitude, delay):
+    report, dirty = reporting
+    first = report(35.0, -100.0, START, CONTENT)
+    duplicates = event_correlation.correlation_service.deduplicator.stats["duplicates"]
+    second = report(latitude, -100.0, START + delay, CONTENT)
+
+    assert event_correlation.correlation_service.deduplicator.stats["duplicates"] == duplicates
+    assert not second.corroboration_count
+    # Either correlated like any other report (and queued for a refresh), or a separate event
+    if second.id == first.id:
+        assert dirty == [first.id]
+    else:
+        assert dirty == []
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import ai, models
+
+PROMPT = "Location: Harbor\nTime: 2026-10-16 14:05:09\nTags: flood\nContent: Storm surge over the harbor road\n"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    backend = ai.StubBackend()
+    monkeypatch.setattr(ai, "backend", backend)
+    monkeypatch.setattr(ai, "description_cache", ai.DescriptionCache(max_size=8, ttl_seconds=60))
+    return backend
+
+
+def test_prompts_differing_in_timestamps_whitespace_and_case_share_an_entry(stub):
+    first = ai.generate_event_description(PROMPT)
+    variant = "  location: HARBOR\n\nTime: 2026-10-16T15:30\ntags:   flood\ncontent: storm surge over the harbor road"
+    assert ai.generate_event_description(variant) == first
+    assert stub.calls == 1
+    assert ai.description_cache.stats["hits"] == 1
+
+    ai.generate_event_description(PROMPT.replace("flood", "fire"))
+    assert stub.calls == 2
+
+
+def test_entries_expire_after_ttl(stub, clock):
+    ai.generate_event_description(PROMPT)
+    clock.now += 59
+    ai.generate_event_description(PROMPT)
+    assert stub.calls == 1
+
+    clock.now += 2
+    ai.generate_event_description(PROMPT)
+    assert stub.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ai.DescriptionCache(max_size=2, ttl_seconds=60)
+    cache.set("a", "model", "A")
+    cache.set("b", "model", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.set("c", "model", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.metrics()["size"] == 2
+
+
+def test_persistent_entries_survive_memory_and_expire_by_age(db_session, clock):
+    cache = ai.DescriptionCache(max_size=8, ttl_seconds=60, persistent=True)
+    cache.set("fresh", "model", "Fresh description")
+    cache.set("stale", "model", "Stale description")
+    db_session.get(models.AICacheEntry, "stale").created_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+    db_session.commit()
+    cache.clear()
+
+    assert cache.get("fresh") == "Fresh description"
+    assert cache.stats["persistent_hits"] == 1
+    assert cache.get("stale") is None
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from app import ai, models
+from app.description_worker import DescriptionWorker
+
+
+def test_new_event_gets_generated_description_from_stub_backend(client, auth_headers):
+    assert isinstance(ai.backend, ai.StubBackend)
+    location = client.post("/locations/", json={"name": "Harbor", "latitude": 40.7, "longitude": -74.0},
+                           headers=auth_headers).json()
+    content = "Storm surge flooding the harbor road"
+    client.post("/reports/", json={"content": content, "tags": ["flood"], "severity": 3,
+                                   "location_id": location["id"]}, headers=auth_headers).raise_for_status()
+
+    # The report content is the placeholder until the worker stores the generated text
+    deadline = time.monotonic() + 5
+    while True:
+        event = client.get("/events/", headers=auth_headers).json()[0]
+        if event["description"] != content or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert event["description"].startswith("Location: Harbor")
+
+
+def test_worker_retries_failed_generation(db_session):
+    event = models.Event(description="Placeholder description", tags=["fire"])
+    db_session.add(event)
+    db_session.commit()
+    attempts = []
+
+    def flaky(prompt: str) -> str:
+        attempts.append(prompt)
+        if len(attempts) < 3:
+            raise RuntimeError("backend unavailable")
+        return "Wildfire spreading east"
+
+    worker = DescriptionWorker(generate=flaky, workers=1, base_delay=0.01)
+
+    async def run():
+        await worker.start()
+        try:
+            assert worker.submit(event.id, "Fire near the ridge")
+            while worker.stats["completed"] + worker.stats["failed"] == 0:
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+    asyncio.run(run())
+    db_session.expire_all()
+    assert db_session.get(models.Event, event.id).description == "Wildfire spreading east"
+    assert worker.stats["retries"] == 2
+    assert len(attempts) == 3
+
+
+def test_full_queue_defers_jobs_instead_of_dropping_them(db_session):
+    events = [models.Event(description=f"Placeholder {n}", tags=["flood"]) for n in range(4)]
+    db_session.add_all(events)
+    db_session.commit()
+    event_ids = [event.id for event in events]
+
+    def slow(prompt: str) -> str:
+        time.sleep(0.02)
+        return f"Generated from {prompt}"
+
+    worker = DescriptionWorker(generate=slow, workers=1, max_queue=1,
+                               resummarize_interval=0.05, resummarize_max_reports=1)
+
+    def described() -> bool:
+        db_session.expire_all()
+        descriptions = [db_session.get(models.Event, event_id).description for event_id in event_ids]
+        return all(f"Summary {n}" in text and f"Update {n}" in text for n, text in enumerate(descriptions))
+
+    async def run():
+        await worker.start()
+        try:
+            # New-event jobs, then a refresh of each: far more than one queue slot holds
+            for n, event_id in enumerate(event_ids):
+                assert worker.submit(event_id, f"Summary {n}\n")
+            for n, event_id in enumerate(event_ids):
+                assert worker.mark_dirty(event_id, f"Update {n}")
+            deadline = time.monotonic() + 10
+            while not await asyncio.to_thread(described) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            await worker.stop()
+
+    asyncio.run(run())
+    assert described()
+    assert worker.stats["deferred"] > 0
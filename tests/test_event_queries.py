@@ -0,0 +1,85 @@
+import pytest
+
+from app import models, queries
+
+
+def add_events(db, location, count, reports_per_event=3):
+    user = db.query(models.User).first()
+    for n in range(count):
+        reports = [
+            models.Report(content=f"Flooded underpass, report {n}.{i}", tags=["flood"], severity="2",
+                          location_id=location.id, user_id=user.id)
+            for i in range(reports_per_event)
+        ]
+        db.add(models.Event(description=f"Flooding near the river, event {n}", tags=["flood"],
+                            location_id=location.id, reports=reports))
+    db.commit()
+
+
+@pytest.mark.parametrize("mode", ["full", "ids"])
+def test_event_list_query_count_does_not_grow_with_events(client, auth_headers, db_session, count_statements, mode):
+    location = models.Location(name="Riverside", latitude=40.7, longitude=-74.0)
+    db_session.add(location)
+    db_session.commit()
+    add_events(db_session, location, 2)
+    # Warm the per-user caches so both measured requests take the same path
+    client.get("/events/", headers=auth_headers).raise_for_status()
+
+    counts = []
+    for total in (2, 25):
+        add_events(db_session, location, total - sum(1 for _ in db_session.query(models.Event)))
+        with count_statements() as statements:
+            response = client.get("/events/", params={"reports": mode, "limit": 100}, headers=auth_headers)
+        response.raise_for_status()
+        events = response.json()
+        assert len(events) == total
+        assert all(event["report_count"] == 3 for event in events)
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_event_detail_query_count_does_not_grow_with_reports(client, auth_headers, db_session, count_statements):
+    location = models.Location(name="Hillside", latitude=41.0, longitude=-73.5)
+    db_session.add(location)
+    db_session.commit()
+    add_events(db_session, location, 1, reports_per_event=2)
+    add_events(db_session, location, 1, reports_per_event=40)
+    client.get("/events/1", headers=auth_headers).raise_for_status()
+
+    counts = []
+    for event_id, reports in ((1, 2), (2, 40)):
+        with count_statements() as statements:
+            response = client.get(f"/events/{event_id}", headers=auth_headers)
+        response.raise_for_status()
+        assert len(response.json()["reports"]) == reports
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_event_pages_cover_every_event_once_newest_first(client, auth_headers, db_session):
+    location = models.Location(name="Lowlands", latitude=40.0, longitude=-75.0)
+    db_session.add(location)
+    db_session.commit()
+    add_events(db_session, location, 7, reports_per_event=1)
+    db_session.add(models.Event(description="Downed power line on Main Street", tags=["power"],
+                                location_id=location.id))
+    db_session.commit()
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 3, "tags": "flood", **({"cursor": cursor} if cursor else {})}
+        response = client.get("/events/", params=params, headers=auth_headers)
+        response.raise_for_status()
+        pages.append([event["id"] for event in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_tag_filter_refuses_backends_without_a_fallback():
+    with pytest.raises(NotImplementedError):
+        queries.tags_overlap(models.Event.tags, ["flood"], "mysql")
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import PasswordHasher
+
+
+def test_cancelled_waiting_call_frees_its_queue_slot():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(hasher.run(release.wait))
+        while hasher.metrics()["active"] == 0:
+            await asyncio.sleep(0.01)
+
+        queued = asyncio.ensure_future(hasher.run(ran.append, "queued"))
+        await asyncio.sleep(0.01)
+        assert hasher.metrics()["waiting"] == 1
+        with pytest.raises(HTTPException):
+            await hasher.run(ran.append, "rejected")
+
+        # The client disconnects while its hash is still queued
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert hasher.metrics()["waiting"] == 0
+
+        after = asyncio.ensure_future(hasher.run(ran.append, "after"))
+        release.set()
+        await asyncio.gather(busy, after)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+    assert ran == ["after"]
+    assert hasher.metrics()["waiting"] == 0
+    assert hasher.metrics()["active"] == 0
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app import models, push
+
+
+def make_event(description: str, tags):
+    event = models.Event(id=7, description=description, tags=tags, location_id=1, last_lat=40.7, last_lon=-74.0,
+                         created_at=datetime(2026, 10, 16, tzinfo=timezone.utc), corroboration_count=0)
+    report = models.Report(id=9, content=description, tags=tags[:3], severity="3", location_id=1,
+                           created_at=datetime(2026, 10, 16, tzinfo=timezone.utc))
+    return event, report
+
+
+@pytest.mark.parametrize("description, tags", [
+    ("洪水" * 1000, ["flood"]),                        # 3 bytes a character in UTF-8
+    ("\U0001f30a" * 2000, ["flood", "water"]),          # 4 bytes, 12 as JSON escapes
+    ("Water rising", [f"tag-{n:04d}" for n in range(2000)]),
+])
+def test_messages_fit_in_a_notify_payload(description, tags):
+    event, report = make_event(description, tags)
+    message = push.event_message(push.REPORT_ADDED, event, report)
+
+    assert len(message.data.encode("utf-8")) <= push.MAX_PAYLOAD_BYTES
+    decoded = push.PushMessage.from_json(message.data)
+    assert decoded.kind == push.REPORT_ADDED
+    assert json.loads(message.data)["event"]["id"] == 7
+    # Filtering in this worker still sees every tag
+    assert message.tags == frozenset(tags)
+
+
+def test_small_messages_are_sent_whole():
+    event, report = make_event("Water rising over the embankment", ["flood", "water"])
+    payload = json.loads(push.event_message(push.REPORT_ADDED, event, report).data)
+
+    assert "truncated" not in payload
+    assert payload["event"]["description"] == "Water rising over the embankment"
+    assert payload["report"]["tags"] == ["flood", "water"]
@@ -0,0 +1,32 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+
+def test_websocket_with_malformed_bbox_is_closed_with_policy_violation(client, auth_headers):
+    token = auth_headers["Authorization"].split()[1]
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/events/ws?token={token}&bbox=1,2,3") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1008
+
+
+def test_websocket_with_bad_token_is_closed_with_policy_violation(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/events/ws?token=not-a-token") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1008
+
+
+def test_websocket_receives_matching_events(client, auth_headers):
+    token = auth_headers["Authorization"].split()[1]
+    location = client.post("/locations/", json={"name": "Dock", "latitude": 40.7, "longitude": -74.0},
+                           headers=auth_headers).json()
+    with client.websocket_connect(f"/events/ws?token={token}&tags=flood&bbox=-75,40,-73,41") as websocket:
+        client.post("/reports/", json={"content": "Flooding along the dock", "tags": ["flood"], "severity": 2,
+                                       "location_id": location["id"]}, headers=auth_headers).raise_for_status()
+        assert websocket.receive_json()["type"] == "event.created"
+
+
+def test_stream_with_malformed_bbox_is_rejected(client, auth_headers):
+    response = client.get("/events/stream", params={"bbox": "1,2,3"}, headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app import models, recluster
+
+
+def test_recluster_rewrites_events_and_links(db_session):
+    user = models.User(email="reporter@example.com", name="Reporter", hashed_password="-", is_active=True)
+    # Far apart: each site's reports form their own cluster
+    bridge = models.Location(name="Bridge", latitude=35.0, longitude=-100.0)
+    school = models.Location(name="School", latitude=36.0, longitude=-101.0)
+    farm = models.Location(name="Farm", latitude=38.0, longitude=-104.0)
+    db_session.add_all([user, bridge, school, farm])
+    db_session.commit()
+    start = datetime(2026, 10, 1, 8, tzinfo=timezone.utc)
+
+    def report(location, minutes, tags):
+        return models.Report(content=f"Water over the road at the {location.name.lower()}, {minutes} minutes in",
+                             tags=tags, severity="3", location_id=location.id, user_id=user.id,
+                             created_at=start + timedelta(minutes=minutes))
+
+    bridge_reports = [report(bridge, 0, ["flood"]), report(bridge, 10, ["flood", "road"]), report(bridge, 20, ["flood"])]
+    school_reports = [report(school, 5, ["flood"]), report(school, 15, ["flood", "school"])]
+    farm_report = report(farm, 30, ["fire"])
+    # Live correlation merged the bridge and school reports into one event
+    merged = models.Event(description="Flooding at the bridge and the school", tags=["flood"],
+                          location_id=bridge.id, reports=bridge_reports + school_reports)
+    lonely = models.Event(description="Grass fire near the farm", tags=["fire"], location_id=farm.id,
+                          reports=[farm_report])
+    db_session.add_all([merged, lonely])
+    db_session.commit()
+    merged_id, lonely_id = merged.id, lonely.id
+
+    recluster.recluster(workers=1)
+
+    db_session.expire_all()
+    events = {event.location_id: event for event in db_session.scalars(select(models.Event))}
+    assert set(events) == {bridge.id, school.id, farm.id}
+    # The larger cluster keeps the merged event and its description; the school gets a new event
+    assert events[bridge.id].id == merged_id
+    assert events[bridge.id].description == "Flooding at the bridge and the school"
+    assert events[farm.id].id == lonely_id
+    assert events[school.id].description == school_reports[0].content
+
+    assert sorted(report.id for report in events[bridge.id].reports) == sorted(r.id for r in bridge_reports)
+    assert sorted(report.id for report in events[school.id].reports) == sorted(r.id for r in school_reports)
+    assert events[bridge.id].tags == ["flood", "road"]
+    assert events[school.id].tags == ["flood", "school"]
+    assert events[school.id].last_tags == ["flood", "school"]
+    assert events[school.id].last_lat == school.latitude
+    assert events[farm.id].tags == ["fire"]
+    assert db_session.scalar(select(models.event_reports.c.report_id).where(
+        models.event_reports.c.report_id == farm_report.id)) == farm_report.id
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app import models, rollups
+
+
+def rollup_rows(db):
+    db.expire_all()
+    return sorted(db.execute(select(models.ReportRollup.location_id, models.ReportRollup.hour,
+                                    models.ReportRollup.tag, models.ReportRollup.severity,
+                                    models.ReportRollup.count)).all())
+
+
+def test_incremental_rollups_match_a_rebuild(client, auth_headers, db_session):
+    locations = [client.post("/locations/", json={"name": name, "latitude": latitude, "longitude": -100.0},
+                             headers=auth_headers).json()
+                 for name, latitude in (("North", 36.0), ("South", 34.0))]
+
+    def payload(n):
+        return {"content": f"Hail damage to roofs and cars, report {n}", "tags": [["hail"], ["hail", "wind"], ["flood"]][n % 3],
+                "severity": n % 4, "location_id": locations[n % 2]["id"]}
+
+    single = [client.post("/reports/", json=payload(n), headers=auth_headers).json()["id"] for n in range(6)]
+    bulk = client.post("/reports/bulk", json=[payload(n) for n in range(6, 18)], headers=auth_headers)
+    bulk.raise_for_status()
+    bulk = [report["id"] for report in bulk.json()]
+    # Older reports land in other hours
+    user_id = db_session.scalar(select(models.User.id))
+    now = datetime.now(timezone.utc)
+    older = [models.Report(content=f"Hail damage reported yesterday, report {n}", tags=["hail", "hail"],
+                           severity=str(n % 2), location_id=locations[0]["id"], user_id=user_id,
+                           created_at=now - timedelta(hours=n + 1)) for n in range(3)]
+    db_session.add_all(older)
+    db_session.commit()
+
+    for report_id in (single[0], single[3], bulk[0], bulk[5], bulk[-1]):
+        client.delete(f"/reports/{report_id}", headers=auth_headers).raise_for_status()
+    db_session.delete(older[1])
+    db_session.commit()
+
+    incremental = rollup_rows(db_session)
+    assert incremental
+    rollups.rebuild(db_session)
+    assert rollup_rows(db_session) == incremental
@@ -0,0 +1,22 @@
+from app import models, shared_state
+
+
+def test_changes_are_broadcast_only_after_commit(db_session, monkeypatch):
+    sent = []
+    monkeypatch.setattr(shared_state.shared_state, "publish", lambda kind, **fields: sent.append((kind, fields)))
+    user = models.User(email="old@example.com", name="Reporter", hashed_password="-", is_active=True)
+    db_session.add(user)
+    db_session.commit()
+
+    user.email = "rolled-back@example.com"
+    db_session.flush()
+    assert sent == []
+    db_session.rollback()
+    assert sent == []
+
+    db_session.refresh(user)
+    user.email = "new@example.com"
+    db_session.flush()
+    assert sent == []
+    db_session.commit()
+    assert sent == [(shared_state.USER_CHANGED, {"emails": ["new@example.com", "old@example.com"]})]
@@ -0,0 +1,18 @@
+import time
+
+from jose import jwt
+
+from app import main
+
+
+def test_token_lifetime_follows_settings(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "access_token_expire_minutes", 90)
+    user = {"email": "tester@example.com", "name": "Tester", "phone": "555-0100",
+            "userType": "USER", "password": "correct horse", "agreeTerms": True}
+    client.post("/users/", json=user).raise_for_status()
+    issued = time.time()
+    response = client.post("/token", data={"username": user["email"], "password": user["password"]})
+    response.raise_for_status()
+
+    claims = jwt.get_unverified_claims(response.json()["access_token"])
+    assert abs(claims["exp"] - (issued + 90 * 60)) < 60